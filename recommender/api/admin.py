@@ -0,0 +1,19 @@
+import hmac
+import os
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+# Shared secret for operator-only features (profiling, debug endpoints).
+# Unset => those features are disabled for everyone.
+ADMIN_TOKEN = os.getenv("RECOMMENDER_ADMIN_TOKEN", "")
+
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and bool(token) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """FastAPI dependency: 403 unless X-Admin-Token matches RECOMMENDER_ADMIN_TOKEN."""
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Access denied. Admins only.")
@@ -0,0 +1,50 @@
+import base64
+import secrets
+from typing import NamedTuple
+
+from fastapi import HTTPException
+
+CURSOR_VERSION = "1"
+# Largest page a recommendation request may ask for (the route's top_k limit)
+MAX_PAGE_SIZE = 100
+
+
+class RecommendationCursor(NamedTuple):
+    """
+    Where the next page starts in a user's ranked list. `seed` identifies the
+    list (it seeds the in-page shuffle, so a worker without the cached list can
+    rank the same one again) and `page_size` is the diversification window.
+    """
+
+    user_id: int
+    seed: int
+    offset: int
+    page_size: int
+
+
+def new_seed() -> int:
+    return secrets.randbits(32)
+
+
+def encode_cursor(cursor: RecommendationCursor) -> str:
+    raw = ":".join([CURSOR_VERSION, *(str(int(v)) for v in cursor)])
+    return base64.urlsafe_b64encode(raw.encode("ascii")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, user_id: int) -> RecommendationCursor:
+    """
+    Parse a cursor from a previous page; 400 if it is malformed or was issued
+    for another user. Cursors are only encoded, not signed, so page_size is
+    clamped to MAX_PAGE_SIZE like the query parameter.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode("ascii")
+        version, *fields = raw.split(":")
+        if version != CURSOR_VERSION:
+            raise ValueError(version)
+        cursor = RecommendationCursor(*(int(v) for v in fields))
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor.user_id != user_id or cursor.offset < 0 or cursor.page_size < 1:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return cursor._replace(page_size=min(cursor.page_size, MAX_PAGE_SIZE))
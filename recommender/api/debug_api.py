@@ -0,0 +1,127 @@
+import os
+import threading
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from api.admin import require_admin
+from api.events_api import (
+    RECOMMENDATION_BUDGET_MS, cpu_pool, engine, loaded_model, recommendation_flights, search_cache, search_flights,
+    suggester, user_vectors
+)
+from api.profiling import profiler
+from services.memory_accounting import memory_report, start_tracing, stop_tracing, top_allocators
+from services.worker_memory import process_memory, worker_report
+
+# Operator endpoints; every route requires X-Admin-Token
+router = APIRouter(prefix="/debug", dependencies=[Depends(require_admin)])
+
+
+# 🔬 Recent per-request profiles (?profile=1 / X-Profile: 1)
+@router.get("/profiles")
+def list_profiles():
+    return {"profiles": profiler.summaries()}
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str):
+    record = profiler.get(profile_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return record
+
+
+# 🧮 Per-worker RSS / PSS (PSS well below RSS => pages are shared across workers)
+@router.get("/workers")
+def workers_memory():
+    master_pid = os.getenv("SERVE_MASTER_PID")
+    if master_pid:
+        return worker_report(int(master_pid))
+    return {"master": None, "workers": [process_memory(os.getpid())]}
+
+
+# 🧠 What this worker's memory is spent on (sizes are approximate deep sizes)
+@router.get("/memory")
+def memory_usage(top: int = Query(20, ge=1, le=200)):
+    """
+    Structures are measured in order and shared objects are charged once, to
+    the first structure reaching them (cached ranked lists do not include the
+    catalog). `mapped_mb` is file-backed memory (similarity matrix, embedding
+    store) shared with the other workers. `tracemalloc` lists the top
+    allocation sites once tracing is on (POST /debug/memory/tracemalloc, or
+    PYTHONTRACEMALLOC=1 to trace from startup).
+    """
+    report = memory_report(
+        structures={
+            **engine.memory_structures(),
+            "suggest_index": suggester,
+            "embedding_model": loaded_model(),
+            "request_profiles": profiler,
+        },
+        caches={
+            "ranked_lists": engine.ranked_lists,
+            "search_results": search_cache,
+            "embeddings": user_vectors.event_vectors.cache if user_vectors is not None else None,
+        },
+    )
+    return {"process": process_memory(os.getpid()), **report, "tracemalloc": top_allocators(top)}
+
+
+@router.post("/memory/tracemalloc")
+def start_tracemalloc(frames: int = Query(1, ge=1, le=50)):
+    """Start tracing allocations (slows allocation down; only memory allocated from now on is attributed)."""
+    return {"tracing": True, "started": start_tracing(frames)}
+
+
+@router.delete("/memory/tracemalloc")
+def stop_tracemalloc():
+    return {"tracing": False, "stopped": stop_tracing()}
+
+
+# 🔁 Similarity model version / hot reload
+@router.get("/model")
+def model_status():
+    snapshot = engine.model.snapshot
+    return {
+        "path": engine.model.model_path,
+        "version": snapshot.version if snapshot else None,
+        "loaded_at": snapshot.loaded_at.isoformat() if snapshot else None,
+        "events": len(snapshot.event_ids) if snapshot else 0,
+        "watch_interval_s": engine.model.watch_interval,
+    }
+
+
+@router.post("/model/reload", status_code=202)
+def reload_model():
+    """Load the model file in the background; requests keep using the current one until the swap."""
+    threading.Thread(target=engine.model.reload, kwargs={"force": True}, daemon=True).start()
+    return {"accepted": True, "current_version": engine.model.version}
+
+
+# ⏱️ Latency budget: the per-stage cost estimates that decide when a request degrades,
+#    and how many requests were answered by another request's computation
+@router.get("/latency")
+def latency_budget():
+    popular = engine.popular_events(engine.popular_depth)
+    return {
+        "budget_ms": RECOMMENDATION_BUDGET_MS or None,
+        "stage_cost_ms": engine.stage_costs.snapshot(),
+        "popular_list_events": len(popular) if popular is not None else None,
+        "coalescing": {"recommendations": recommendation_flights.stats(), "search": search_flights.stats()},
+        "cpu_pool": cpu_pool.stats(),
+    }
+
+
+# 📡 LISTEN/NOTIFY change feed (REALTIME_CHANGES=true)
+@router.get("/changes")
+def change_feed_status():
+    listener = engine.change_listener
+    if listener is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "channel": listener.channel,
+        "connected": listener.connected,
+        "notifications": listener.notifications,
+        "last_change_at": listener.last_change_at,
+        "interactions_cached": len(engine.interaction_log) if engine.interaction_log is not None else None,
+    }
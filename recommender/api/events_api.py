@@ -1,29 +1,92 @@
-from fastapi import APIRouter, Query, HTTPException
-from typing import List, Optional, Dict
-from pydantic import BaseModel, field_validator
+from fastapi import APIRouter, Query, HTTPException, Header, Response
+from typing import List, Optional, Dict, TYPE_CHECKING
+from pydantic import BaseModel, Field, field_validator
 from datetime import date
 import os
-import pandas as pd
-import psycopg2
+import random
+import threading
+from contextlib import asynccontextmanager
 import traceback
-from difflib import SequenceMatcher
 
 # --- Search deps (OpenSearch + embeddings) ---
 from opensearchpy import OpenSearch  # type: ignore
 from opensearchpy.exceptions import TransportError  # type: ignore
-from sentence_transformers import SentenceTransformer  # type: ignore
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer  # type: ignore
 
 # --- OOP Recommender imports ---
 # adjust the import path if recommender_oop.py lives in a package, e.g.:
 # from services.recommender_oop import DatabaseConfig, RecommendationEngine
-from services.recommender import DatabaseConfig, RecommendationEngine
+from services.recommender import (
+    INTERACTION_WEIGHTS, DatabaseConfig, EventRepository, RecommendationEngine, UserInteractionRepository
+)
+from services.cpu_pool import STAGE_ENCODE, STAGE_FILTER, STAGES, CpuPool, query_match_scores
+from services.cpu_pool import encode_texts as pool_encode_texts
+from services.latency_budget import TIER_UNFILTERED, BudgetExceeded, LatencyBudget, degrade
+from services.search import fuse_hits, hydrate_rows
+from services.search_cache import SearchResultCache, normalize_query
+from services.index_generation import IndexGeneration
+from services.collaborative import ItemCooccurrenceModel
+from services.embedding_cache import EmbeddingCache
+from services.user_vectors import EventVectorIndex, UserVectorStore
+from services.realtime import ChangeListener, InteractionLog
+from services.suggest import SuggestIndex, Suggester, event_popularity
+from services.trending import TrendingEvents
+from api.admin import require_admin
+from api.coalescing import SingleFlight
+from api.cursors import MAX_PAGE_SIZE, RecommendationCursor, decode_cursor, encode_cursor, new_seed
+from api.profiling import profiler, wants_profile
+from api.serialization import FastJSONResponse
+from api.streaming import chunked, ndjson_response, wants_ndjson
 
 # Config (readable via env; defaults OK for local)
 ES_URL = os.getenv("ES_URL", "http://localhost:9200")
 ES_INDEX = os.getenv("ES_INDEX", "events")
-
-router = APIRouter()
+# Weight of item-item collaborative scores in the hybrid ranking (0 disables CF)
+CF_WEIGHT = float(os.getenv("CF_WEIGHT", "0"))
+# Serve users that have a profile vector from one kNN lookup (needs ingest.py's embedding cache)
+USER_VECTOR_KNN = os.getenv("USER_VECTOR_KNN", "false").lower() == "true"
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "5"))  # seconds; 0 = check per request
+USER_VECTOR_HALF_LIFE_DAYS = float(os.getenv("USER_VECTOR_HALF_LIFE_DAYS", "30"))
+CATALOG_REFRESH_INTERVAL = float(os.getenv("CATALOG_REFRESH_INTERVAL", "60"))  # seconds; 0 = never refresh; paused while REALTIME_CHANGES is connected
+# Push Event / User_Event changes in through LISTEN/NOTIFY (run sql/realtime_triggers.sql first)
+REALTIME_CHANGES = os.getenv("REALTIME_CHANGES", "false").lower() == "true"
+# Events ranked behind a paginated recommendation request (0 = no cursors), kept per user for the TTL
+RECOMMENDATION_DEPTH = int(os.getenv("RECOMMENDATION_DEPTH", "200"))
+RECOMMENDATION_CURSOR_TTL = float(os.getenv("RECOMMENDATION_CURSOR_TTL", "300"))  # seconds
+# Time one recommendation request may spend ranking before it degrades to a cheaper tier (0 = no limit)
+RECOMMENDATION_BUDGET_MS = float(os.getenv("RECOMMENDATION_BUDGET_MS", "0"))
+# Fused search rankings cached per (query, size) until indexer.py / ingest.py bump the index generation
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1024"))  # entries; 0 = off
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "600"))  # seconds, for writes that bypass the counter
+# Process pool for GIL-bound stages (score, filter, encode); 0 = run them in the request thread.
+# Every API worker process gets its own pool, and each pool process holding the embedding model has its own copy.
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", "0"))
+CPU_POOL_STAGES = [s.strip() for s in os.getenv("CPU_POOL_STAGES", ",".join(STAGES)).split(",") if s.strip()]
+# Concurrent identical recommendation / search requests share one computation
+REQUEST_COALESCING = os.getenv("REQUEST_COALESCING", "true").lower() == "true"
+# Half-life of the view / registration counts behind trending events (users with no history)
+TRENDING_HALF_LIFE_DAYS = float(os.getenv("TRENDING_HALF_LIFE_DAYS", "7"))
+EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+cpu_pool = CpuPool(CPU_POOL_WORKERS, CPU_POOL_STAGES, embed_model=EMBED_MODEL)
+
+
+@asynccontextmanager
+async def _lifespan(app):
+    # Runs in each serving process (after serve.py forks), where the pool has to live
+    if cpu_pool.stages:
+        threading.Thread(target=cpu_pool.warm_up, daemon=True).start()
+    yield
+    cpu_pool.shutdown()
+
+
+router = APIRouter(lifespan=_lifespan)
+recommendation_flights = SingleFlight(REQUEST_COALESCING)
+search_flights = SingleFlight(REQUEST_COALESCING)
 ES = OpenSearch(ES_URL, timeout=10)
+search_cache = SearchResultCache(IndexGeneration(), capacity=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
 
 # ---------- Recommender Engine (OOP) ----------
 db_conf = DatabaseConfig(
@@ -33,41 +96,140 @@ db_conf = DatabaseConfig(
     password=os.getenv("PGPASSWORD", "postgres"),
 )
 
-engine = RecommendationEngine(db_conf)
+def _knn_body(vector: List[float], k: int) -> Dict:
+    return {
+        "size": k,
+        "query": {
+            "knn": {
+                "field": "vector",
+                "query_vector": vector,
+                "k": k,
+                "num_candidates": max(200, k),
+            }
+        },
+    }
+
+
+user_vectors = (
+    UserVectorStore(
+        EventVectorIndex(EmbeddingCache(EMBED_MODEL)),
+        half_life_days=USER_VECTOR_HALF_LIFE_DAYS,
+    )
+    if USER_VECTOR_KNN
+    else None
+)
+
+
+def user_vector_search(vector, k: int):
+    """Personalized retrieval through the OpenSearch HNSW index; exact local kNN if it fails."""
+    try:
+        hits = ES.search(index=ES_INDEX, body=_knn_body(vector.tolist(), k))["hits"]["hits"]
+        return [(int(h["_id"]), float(h.get("_score", 0.0))) for h in hits]
+    except Exception as e:
+        print("⚠️ kNN user retrieval failed, using local vectors:", e)
+        return user_vectors.event_vectors.knn(vector, k)
+
+
+event_repo = EventRepository(db_conf)
+inter_repo = UserInteractionRepository(db_conf)
+change_listener = (
+    ChangeListener(db_conf, fetchers={"Event": event_repo.load_by_ids, "User_Event": inter_repo.load_by_ids})
+    if REALTIME_CHANGES
+    else None
+)
+
+engine = RecommendationEngine(
+    db_conf,
+    event_repo=event_repo,
+    inter_repo=inter_repo,
+    model_watch_interval=MODEL_WATCH_INTERVAL,
+    cf_model=ItemCooccurrenceModel() if CF_WEIGHT > 0 else None,
+    cf_weight=CF_WEIGHT,
+    user_vectors=user_vectors,
+    vector_search=user_vector_search if user_vectors is not None else None,
+    catalog_refresh_interval=CATALOG_REFRESH_INTERVAL,
+    interaction_log=InteractionLog(inter_repo) if REALTIME_CHANGES else None,
+    change_listener=change_listener,
+    ranked_list_ttl=RECOMMENDATION_CURSOR_TTL,
+    cpu_pool=cpu_pool,
+    trending=TrendingEvents(TRENDING_HALF_LIFE_DAYS),
+)
+
+
+def _drop_stale_results(table, rows) -> None:
+    """Change feed hook: drop the cached lists a batch of changed rows makes stale."""
+    if table == "User_Event":
+        # Ranked lists are keyed (user_id, seed, page_size, query)
+        users = {int(r["user_id"]) for r in rows if r.get("user_id") is not None}
+        dropped = engine.ranked_lists.discard(lambda key: key[0] in users)
+    else:
+        # Event edits and full resyncs: the lists hold rows of the old catalog
+        dropped = len(engine.ranked_lists) + len(search_cache)
+        engine.ranked_lists.clear()
+        search_cache.clear()
+    if dropped:
+        print(f"🧹 Dropped {dropped} cached result lists after changes to {table or 'all tables'}")
+
+
+engine.change_hooks.append(_drop_stale_results)
+
+
+def _build_suggest_index(catalog) -> SuggestIndex:
+    interactions = engine.load_interactions()
+    engine.tag_profiles.sync(interactions)
+    return SuggestIndex(catalog, event_popularity(interactions, INTERACTION_WEIGHTS), engine.tag_profiles.totals())
+
+
+# Autocomplete index, rebuilt whenever the engine swaps in a new catalog
+suggester = Suggester(lambda: engine.get_catalog(), _build_suggest_index)
 
 
 # ---------- Embedding model (lazy) ----------
-_model: Optional[SentenceTransformer] = None
-def get_model() -> SentenceTransformer:
+_model: Optional["SentenceTransformer"] = None
+def get_model() -> "SentenceTransformer":
     global _model
     if _model is None:
-        _model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+        # Imported here so the API (and the load-test harness) can start without torch
+        from sentence_transformers import SentenceTransformer  # type: ignore
+        _model = SentenceTransformer(EMBED_MODEL)
     return _model
 
 
-def get_connection():
-    return psycopg2.connect(
-        host=os.getenv("PGHOST", "localhost"),
-        database=os.getenv("PGDATABASE", "eventdb"),
-        user=os.getenv("PGUSER", "postgres"),
-        password=os.getenv("PGPASSWORD", "postgres"),
-    )
+def loaded_model() -> Optional["SentenceTransformer"]:
+    """The embedding model if it has been loaded (never loads it)."""
+    return _model
 
 
-def similarity(a: str, b: str) -> float:
-    return SequenceMatcher(None, (a or "").lower(), (b or "").lower()).ratio()
+def encode_texts(texts: List[str]):
+    """Normalized embeddings, from the CPU pool's preloaded model when encoding is offloaded."""
+    if cpu_pool.offloads(STAGE_ENCODE):
+        return cpu_pool.run(STAGE_ENCODE, pool_encode_texts, EMBED_MODEL, texts)
+    return get_model().encode(texts, normalize_embeddings=True)
 
 
-def _norm(hits) -> Dict[str, float]:
-    """Min–max normalize scores into {_id: score}."""
-    if not hits:
-        return {}
-    vals = [h.get("_score", 0.0) for h in hits]
-    lo, hi = min(vals), max(vals)
-    return {
-        h["_id"]: ((h.get("_score", 0.0) - lo) / (hi - lo) if hi > lo else 0.0)
-        for h in hits
-    }
+def preload() -> None:
+    """
+    Load the read-only serving state (similarity model, event catalog, popular
+    list, suggest index, event vectors, embedding model) once, so forked workers share it instead of
+    each building their own copy. See serve.py.
+    """
+    engine.model.load()
+    try:
+        engine.get_catalog()
+        if engine.interaction_log is not None:
+            engine.interaction_log.load()
+        engine.refresh_popular()
+        suggester.index()
+    except Exception as e:
+        print("⚠️ Event catalog / interactions not preloaded (first request will load them):", e)
+    if user_vectors is not None:
+        user_vectors.event_vectors.refresh()
+    if cpu_pool.offloads(STAGE_ENCODE):
+        return  # the CPU pool's processes load their own copy
+    try:
+        get_model()
+    except Exception as e:
+        print("⚠️ Embedding model not preloaded (search will load it lazily):", e)
 
 
 # ---------- Pydantic models ----------
@@ -114,6 +276,19 @@ class EventRecommendation(BaseModel):
 class RecommendationResponse(BaseModel):
     user_id: int
     recommendations: List[EventRecommendation]
+    next_cursor: Optional[str] = None
+    # How the list was produced: full, unfiltered, tag_only or popular (None if nothing could be served)
+    tier: Optional[str] = None
+
+
+# Keys of one recommendation in responses (the engine's dicts carry a few more)
+RECOMMENDATION_FIELDS = tuple(EventRecommendation.model_fields)
+
+
+class BulkRecommendationRequest(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1, max_length=1000)
+    top_k: int = Field(15, ge=1, le=MAX_PAGE_SIZE)
+    query: str = ""
 
 
 # ---------- Routes ----------
@@ -121,20 +296,11 @@ class RecommendationResponse(BaseModel):
 # 👁️ Get single event by ID
 @router.get("/api/events/{event_id:int}")
 def get_event_by_id(event_id: int):
-    conn = get_connection()
-    try:
-        df = pd.read_sql(
-            'SELECT * FROM public."Event" WHERE event_id = %s;',
-            conn,
-            params=(event_id,),
-        )
-    finally:
-        conn.close()
-
-    if df.empty:
+    rows = engine.event_repo.load_by_ids([event_id])
+    if not rows:
         raise HTTPException(status_code=404, detail="Event not found")
 
-    event = df.iloc[0].to_dict()
+    event = rows[0]
     tags_value = event.get("tags")
     if tags_value:
         if isinstance(tags_value, list):
@@ -150,97 +316,246 @@ def get_event_by_id(event_id: int):
 
 
 # 🤖 Personalized recommendations with optional (local) search filter
+#    (pass back next_cursor as ?cursor= for the next page of the same ranking;
+#     admins can add ?profile=1 or X-Profile: 1 to profile one request;
+#     Accept: application/x-ndjson streams one event per line instead, with
+#     the cursor in the X-Next-Cursor header and the tier in X-Recommendation-Tier)
 @router.get("/api/events/recommendations/{user_id:int}", response_model=RecommendationResponse)
 def get_recommendations(
     user_id: int,
-    top_k: int = Query(15, ge=1, le=100),
+    top_k: int = Query(15, ge=1, le=MAX_PAGE_SIZE),
     query: str = Query("", min_length=0),
+    cursor: Optional[str] = Query(None),
+    profile: bool = Query(False),
+    x_profile: Optional[str] = Header(None),
+    x_admin_token: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None),
 ):
-    try:
-        # ✅ Use OOP engine instead of functional recommend_events
-        recommendations = engine.recommend_events(
-            user_id=user_id,
-            top_k=top_k,
-            max_per_cluster=5,  # you can make this a query param if you like
-        ) or []
-
-        # Normalize to dicts
-        rec_dicts = []
-        for rec in recommendations:
-            if isinstance(rec, dict):
-                rec_dicts.append(rec)
-            elif hasattr(rec, "dict"):
-                rec_dicts.append(rec.dict())
-            else:
-                rec_dicts.append(rec)
-
-        # Optional local search filter
-        if query:
-            q = query.lower()
-
-            conn = get_connection()
-            try:
-                df = pd.read_sql('SELECT * FROM public."Event";', conn)
-            finally:
-                conn.close()
-
-            def parse_tags_local(x):
-                if isinstance(x, list):
-                    return x
-                if isinstance(x, str):
-                    return [t.strip() for t in x.strip("{}").split(",") if t.strip()]
-                return []
-
-            if "tags" in df.columns:
-                df["tags"] = df["tags"].apply(parse_tags_local)
-            event_lookup = {int(row["event_id"]): row for _, row in df.iterrows()}
-
-            filtered = []
-            for rec in rec_dicts:
-                eid = int(rec.get("event_id", 0) or 0)
-                ev = event_lookup.get(eid)
-                if not ev:
-                    continue
-
-                title = str(ev.get("title") or "").lower()
-                location = str(ev.get("location") or "").lower()
-                tags = [str(t).lower() for t in ev.get("tags", [])]
-
-                score = max(
-                    similarity(title, q),
-                    similarity(location, q),
-                    max((similarity(t, q) for t in tags), default=0.0),
-                )
-                if q in title or q in location or any(q in t for t in tags):
-                    score += 0.2
-
-                if score > 0.3:
-                    filtered.append((score, {**rec, "similarity_score": float(score)}))
-
-            filtered.sort(key=lambda x: x[0], reverse=True)
-            rec_dicts = [r for _, r in filtered]
-
-        # Cast to Pydantic models
-        events: List[EventRecommendation] = []
-        for rec in rec_dicts:
-            if "title" not in rec:
-                rec["title"] = f"Event {rec.get('event_id', 'Unknown')}"
-            events.append(EventRecommendation(**rec))
-
-        return RecommendationResponse(user_id=user_id, recommendations=events)
+    position = decode_cursor(cursor, user_id) if cursor else None
+    if wants_profile(profile, x_profile):
+        # Profiled requests are always materialized so the profile covers the whole request
+        require_admin(x_admin_token)
+        result, profile_id = profiler.run(
+            f"recommendations user={user_id} top_k={top_k}", _recommendations, user_id, top_k, query, position
+        )
+        return FastJSONResponse(result, headers={"X-Profile-Id": profile_id})
+    result = _coalesced_recommendations(user_id, top_k, query, position)
+    if wants_ndjson(accept):
+        headers = {"X-Recommendation-Tier": result["tier"] or "none"}
+        if result["next_cursor"]:
+            headers["X-Next-Cursor"] = result["next_cursor"]
+        return ndjson_response(result["recommendations"], headers=headers)
+    return FastJSONResponse(result)
+
+
+# 📦 Recommendations for many users, streamed as one NDJSON line per user
+@router.post("/api/events/recommendations/bulk")
+def bulk_recommendations(body: BulkRecommendationRequest):
+    def per_user():
+        for user_id in body.user_ids:
+            yield _coalesced_recommendations(user_id, body.top_k, body.query, paginate=False)
+
+    return ndjson_response(per_user())
+
+
+# The engine builds recommendations from the event catalog's clean, typed
+# columns, so responses are assembled straight from its dicts in the shape of
+# RecommendationResponse; EventRecommendation's validators are not re-run.
+def _response_item(rec: dict) -> dict:
+    return {field: rec.get(field) for field in RECOMMENDATION_FIELDS}
+
+
+def _coalesced_recommendations(
+    user_id: int, top_k: int, query: str, position: RecommendationCursor = None, paginate: bool = True
+) -> dict:
+    """
+    _recommendations(), shared by concurrent identical requests. Requests for
+    a first page then also share its cursor, i.e. one cached ranked list.
+    """
+    key = (user_id, top_k, query, position, paginate)
+    return recommendation_flights.do(key, _recommendations, user_id, top_k, query, position, paginate)
 
+
+def _recommendations(
+    user_id: int, top_k: int, query: str, position: RecommendationCursor = None, paginate: bool = True
+) -> dict:
+    budget = LatencyBudget(RECOMMENDATION_BUDGET_MS / 1000.0, engine.stage_costs)
+    try:
+        recs, next_cursor, tier = _recommendation_page(user_id, top_k, query, position, paginate, budget)
+        items = [_response_item(rec) for rec in recs]
+        return {"user_id": user_id, "recommendations": items, "next_cursor": next_cursor, "tier": tier}
+    except BudgetExceeded as e:
+        print(f"⏱️ {e} and no fallback list is ready yet")
     except Exception:
         traceback.print_exc()
-        return RecommendationResponse(user_id=user_id, recommendations=[])
+    return {"user_id": user_id, "recommendations": [], "next_cursor": None, "tier": None}
+
+
+def _recommendation_page(
+    user_id: int,
+    top_k: int,
+    query: str,
+    position: RecommendationCursor = None,
+    paginate: bool = True,
+    budget: LatencyBudget = None,
+):
+    """
+    One page of the user's ranking, the cursor of the page after it and the
+    tier the ranking came from.
+
+    A first page ranks RECOMMENDATION_DEPTH events, diversified top_k at a
+    time, and caches the list; later pages are slices of it. The cursor's
+    seed reproduces the same list if the cache no longer has it (expired, or
+    another worker served the first page).
+    """
+    if position is None:
+        if not paginate or RECOMMENDATION_DEPTH <= top_k:
+            ranked = _ranked_list(user_id, top_k, top_k, query, budget=budget)
+            return ranked.page(0, top_k), None, ranked.tier
+        position = RecommendationCursor(user_id, new_seed(), 0, top_k)
+
+    key = (user_id, position.seed, position.page_size, query)
+    ranked = engine.ranked_lists.get(key)
+    if ranked is None:
+        depth = max(RECOMMENDATION_DEPTH, position.page_size)
+        ranked = _ranked_list(user_id, depth, position.page_size, query, random.Random(position.seed), budget)
+        engine.ranked_lists.put(key, ranked)
+
+    recs = ranked.page(position.offset, top_k)
+    next_offset = position.offset + top_k
+    next_cursor = encode_cursor(position._replace(offset=next_offset)) if next_offset < len(ranked) else None
+    return recs, next_cursor, ranked.tier
+
+
+def _ranked_list(
+    user_id: int, depth: int, page_size: int, query: str, rng: random.Random = None, budget: LatencyBudget = None
+):
+    budget = budget or LatencyBudget(None, engine.stage_costs)
+    # ✅ Use OOP engine instead of functional recommend_events
+    ranked = engine.rank_events(
+        user_id=user_id,
+        depth=depth,
+        max_per_cluster=5,  # you can make this a query param if you like
+        page_size=page_size,
+        rng=rng,
+        budget=budget,
+    )
+    if not query:
+        return ranked
+
+    # The filter reads event rows from the database and fuzzy-matches each one; skip it when it does not fit
+    if not budget.affords("query_filter"):
+        print(f"⏱️ {budget.remaining() * 1000:.0f}ms left, skipping the query filter")
+        return ranked.with_tier(degrade(ranked.tier, TIER_UNFILTERED))
+    try:
+        return budget.call("query_filter", _filter_by_query, ranked, query)
+    except BudgetExceeded as e:
+        print(f"⏱️ {e}, serving the unfiltered ranking")
+        return ranked.with_tier(degrade(ranked.tier, TIER_UNFILTERED))
+
+
+def _filter_by_query(ranked, query: str):
+    """Optional local search filter: the ranked events matching `query`, best match first."""
+    rec_dicts = ranked.page(0, len(ranked))
+
+    # Only the recommended events need their details
+    rec_ids = [int(rec.get("event_id", 0) or 0) for rec in rec_dicts]
+    rows = engine.event_repo.load_by_ids(rec_ids)
+
+    def parse_tags_local(x):
+        if isinstance(x, list):
+            return x
+        if isinstance(x, str):
+            return [t.strip() for t in x.strip("{}").split(",") if t.strip()]
+        return []
+
+    for row in rows:
+        row["tags"] = parse_tags_local(row.get("tags"))
+    event_lookup = {int(row["event_id"]): row for row in rows}
+
+    positions, candidates = [], []
+    for i, rec in enumerate(rec_dicts):
+        ev = event_lookup.get(int(rec.get("event_id", 0) or 0))
+        if ev:
+            positions.append(i)
+            candidates.append((ev.get("title"), ev.get("location"), ev.get("tags", [])))
+
+    # SequenceMatcher is pure Python; with a CPU pool it runs outside this process's GIL
+    scores = cpu_pool.run(STAGE_FILTER, query_match_scores, query, candidates) if candidates else []
+    filtered = [(score, i) for score, i in zip(scores, positions) if score > 0.3]
+
+    filtered.sort(key=lambda x: x[0], reverse=True)
+    return ranked.select([i for _, i in filtered], {"similarity_score": [score for score, _ in filtered]})
+
+
+# ⌨️ Autocomplete over upcoming event titles and tags, by popularity
+#    (in-process prefix index, no OpenSearch or embedding call per keystroke)
+@router.get("/api/events/suggest")
+def suggest(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20),
+):
+    try:
+        index = suggester.index()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Suggestions unavailable: {e}")
+    return FastJSONResponse({"query": q, **index.suggest(q, limit)})
 
 
 # 🔎 Hybrid search (BM25 + vector kNN)
 @router.get("/api/events/search")
-def hybrid_search(q: str = Query(..., min_length=1), size: int = Query(10, ge=1, le=50)):
+def hybrid_search(
+    response: Response,
+    q: str = Query(..., min_length=1),
+    size: int = Query(10, ge=1, le=50),
+    profile: bool = Query(False),
+    x_profile: Optional[str] = Header(None),
+    x_admin_token: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None),
+):
     """
     Perform hybrid search (BM25 + vector cosine similarity) over event index.
     Returns hydrated event data from Postgres preserving ES ranking.
+    Admins can add ?profile=1 (or X-Profile: 1) to profile this one request.
+    With Accept: application/x-ndjson events are streamed one per line as
+    their rows arrive from Postgres.
     """
+    if wants_profile(profile, x_profile):
+        require_admin(x_admin_token)
+        result, profile_id = profiler.run(f"search q={q!r} size={size}", _hybrid_search, q, size)
+        response.headers["X-Profile-Id"] = profile_id
+        return result
+    if wants_ndjson(accept):
+        # Rank first so OpenSearch errors still surface as a 503 status
+        ids_ordered, scores_map = _search_ranking(q, size)
+        return ndjson_response(iter_hydrate(ids_ordered, scores_map))
+    return _hybrid_search(q, size)
+
+
+def _hybrid_search(q: str, size: int):
+    # Concurrent searches for the same normalized query share the ranking and the hydration
+    return search_flights.do(("search", normalize_query(q), size), lambda: hydrate(*_search_ranking(q, size)))
+
+
+def _search_ranking(q: str, size: int):
+    """(ids in rank order, {str(id): score}), from the cache while the index is unchanged."""
+    cached = search_cache.get(q, size)
+    if cached is not None:
+        return cached
+    return search_flights.do(("ranking", normalize_query(q), size), _uncached_search_ranking, q, size)
+
+
+def _uncached_search_ranking(q: str, size: int):
+    generation = search_cache.generation.current
+    ids_ordered, scores_map, fused = _opensearch_ranking(q, size)
+    # BM25-only rankings (kNN failed) are not cached, so a transient failure does not stick
+    if fused:
+        search_cache.put(q, size, generation, (ids_ordered, scores_map))
+    return ids_ordered, scores_map
+
+
+def _opensearch_ranking(q: str, size: int):
+    """(ids, scores, fused) from BM25, fused with kNN when it succeeds."""
     # Ensure index exists / OpenSearch reachable
     try:
         if not ES.indices.exists(index=ES_INDEX):
@@ -271,46 +586,28 @@ def hybrid_search(q: str = Query(..., min_length=1), size: int = Query(10, ge=1,
     # 2 Vector (semantic) search
     kn_hits = []
     try:
-        model = get_model()
-        qvec = model.encode([f"{q}. tags: {q}"], normalize_embeddings=True)[0].tolist()
+        qvec = encode_texts([f"{q}. tags: {q}"])[0].tolist()
         if len(qvec) != 384:
             raise HTTPException(status_code=500, detail=f"Embedding dimension {len(qvec)} != 384")
 
-        kn_body = {
-            "size": min(50, max(size, 10)),
-            "query": {
-                "knn": {
-                    "field": "vector",
-                    "query_vector": qvec,
-                    "k": min(50, max(size, 10)),
-                    "num_candidates": 200,
-                }
-            },
-        }
+        kn_body = _knn_body(qvec, min(50, max(size, 10)))
         kn_hits = ES.search(index=ES_INDEX, body=kn_body)["hits"]["hits"]
     except Exception as e:
         print("⚠️ kNN search failed, falling back to BM25-only:", e)
 
     # 3 Fuse results (if both succeed)
     if kn_hits:
-        bm_norm, kn_norm = _norm(bm_hits), _norm(kn_hits)
-        all_ids = set(bm_norm) | set(kn_norm)
-
-        fused = sorted(
-            ((i, 0.6 * kn_norm.get(i, 0.0) + 0.4 * bm_norm.get(i, 0.0)) for i in all_ids),
-            key=lambda x: x[1],
-            reverse=True,
-        )[:size]
+        fused = fuse_hits(bm_hits, kn_hits, size)
 
         ids_ordered = [int(i) for i, _ in fused]
         scores_map = {str(i): s for i, s in fused}
 
-        return hydrate(ids_ordered, scores_map)
+        return ids_ordered, scores_map, True
 
     # 4️⃣ BM25 fallback only
     ids_ordered = [int(h["_id"]) for h in bm_hits[:size]]
     scores_map = {str(h["_id"]): float(h.get("_score", 0.0)) for h in bm_hits[:size]}
-    return hydrate(ids_ordered, scores_map)
+    return ids_ordered, scores_map, False
 
 
 # ------------------------------
@@ -321,29 +618,12 @@ def hydrate(ids_in_order, scores_by_id):
     if not ids_in_order:
         return []
 
-    placeholders = ",".join(["%s"] * len(ids_in_order))
-    sql = f'SELECT * FROM public."Event" WHERE event_id IN ({placeholders})'
-
-    with get_connection() as conn:
-        df = pd.read_sql(sql, conn, params=ids_in_order)
-
-    by_id = {int(r["event_id"]): dict(r) for _, r in df.iterrows()}
-    results = []
-
-    for eid in ids_in_order:
-        row = by_id.get(int(eid))
-        if not row:
-            continue
-
-        tags_val = row.get("tags")
-        if isinstance(tags_val, str):
-            row["tags"] = [t.strip() for t in tags_val.strip("{} ").split(",") if t.strip()]
-        elif isinstance(tags_val, list):
-            row["tags"] = tags_val
-        else:
-            row["tags"] = []
+    rows = engine.event_repo.load_by_ids(ids_in_order)
+    return hydrate_rows(ids_in_order, rows, scores_by_id)
 
-        row["score"] = float(scores_by_id.get(str(eid), 0.0))
-        results.append(row)
 
-    return results
+def iter_hydrate(ids_in_order, scores_by_id):
+    """Like hydrate(), but fetches rows in growing chunks and yields each event as soon as it is ready."""
+    for chunk in chunked(list(ids_in_order)):
+        rows = engine.event_repo.load_by_ids(chunk)
+        yield from hydrate_rows(chunk, rows, scores_by_id)
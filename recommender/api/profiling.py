@@ -0,0 +1,103 @@
+import cProfile
+import os
+import pstats
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+# Optional: also dump raw .prof files here (open with snakeviz / pstats)
+PROFILE_DIR = os.getenv("PROFILE_DIR")
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "30"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+
+TRUTHY = {"1", "true", "yes", "on"}
+
+
+def wants_profile(flag: bool, header: Optional[str]) -> bool:
+    """True if the request asked for profiling via ?profile=1 or X-Profile: 1."""
+    return flag or (header is not None and header.strip().lower() in TRUTHY)
+
+
+class RequestProfiler:
+    """
+    Runs a single call under cProfile and keeps the top functions by cumulative
+    time for the last `keep` profiled requests. Nothing here runs unless a
+    request opts in, so normal requests pay no profiling overhead.
+    """
+
+    def __init__(self, top_n: int = PROFILE_TOP_N, keep: int = PROFILE_KEEP, profile_dir: Optional[str] = PROFILE_DIR):
+        self.top_n = top_n
+        self.keep = keep
+        self.profile_dir = profile_dir
+        self._records: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._records_lock = threading.Lock()
+        # cProfile cannot run twice at once in one interpreter (3.12+); profile one request at a time
+        self._run_lock = threading.Lock()
+
+    def _top_functions(self, prof: cProfile.Profile) -> List[Dict[str, Any]]:
+        stats = pstats.Stats(prof)
+        rows = []
+        for (filename, line, func), (_cc, nc, tt, ct, _callers) in stats.stats.items():
+            rows.append({
+                "function": f"{os.path.basename(filename)}:{line}({func})",
+                "calls": nc,
+                "tottime_ms": round(tt * 1000.0, 3),
+                "cumtime_ms": round(ct * 1000.0, 3),
+            })
+        rows.sort(key=lambda r: r["cumtime_ms"], reverse=True)
+        return rows[: self.top_n]
+
+    def run(self, label: str, fn: Callable[..., Any], *args, **kwargs) -> Tuple[Any, str]:
+        if not self._run_lock.acquire(timeout=30):
+            raise HTTPException(status_code=429, detail="Another profiled request is still running")
+        prof = cProfile.Profile()
+        try:
+            t0 = time.perf_counter()
+            prof.enable()
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                prof.disable()
+            wall_ms = (time.perf_counter() - t0) * 1000.0
+        finally:
+            self._run_lock.release()
+
+        profile_id = uuid.uuid4().hex[:12]
+        record = {
+            "id": profile_id,
+            "label": label,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "wall_ms": round(wall_ms, 3),
+            "top": self._top_functions(prof),
+        }
+        if self.profile_dir:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            path = os.path.join(self.profile_dir, f"{profile_id}.prof")
+            prof.dump_stats(path)
+            record["file"] = path
+
+        with self._records_lock:
+            self._records[profile_id] = record
+            while len(self._records) > self.keep:
+                self._records.popitem(last=False)
+
+        print(f"🔬 Profiled {label} in {wall_ms:.1f} ms (id={profile_id})")
+        return result, profile_id
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self._records_lock:
+            return self._records.get(profile_id)
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        with self._records_lock:
+            return [
+                {k: r[k] for k in ("id", "label", "created_at", "wall_ms")}
+                for r in reversed(self._records.values())
+            ]
+
+
+profiler = RequestProfiler()
@@ -0,0 +1,37 @@
+import json
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - falls back to the stdlib encoder
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Types neither encoder handles natively (Pydantic models, pandas Timestamps, Decimals...)."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    return jsonable_encoder(obj)
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response for data the service built itself. Returning it from a route
+    skips FastAPI's response_model validation and jsonable_encoder pass, so only
+    use it for payloads that are already in their final shape.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,43 @@
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from fastapi.responses import StreamingResponse
+
+from api.serialization import dumps
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Rows fetched per Postgres round trip while streaming: the first chunk is small
+# so the first event goes out quickly, later chunks grow to keep round trips few.
+FIRST_CHUNK = 5
+MAX_CHUNK = 50
+
+
+def wants_ndjson(accept: Optional[str]) -> bool:
+    """True if the client asked for newline-delimited JSON (Accept: application/x-ndjson)."""
+    return bool(accept) and NDJSON_MEDIA_TYPE in accept.lower()
+
+
+def ndjson_line(item: Any) -> bytes:
+    return dumps(item) + b"\n"
+
+
+def ndjson_response(items: Iterable[Any], headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    """
+    One JSON document per line, written as the iterator produces them. Sync
+    iterators run in Starlette's threadpool, so blocking DB calls are fine.
+    """
+
+    def lines() -> Iterator[bytes]:
+        for item in items:
+            yield ndjson_line(item)
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
+
+def chunked(ids: list, first: int = FIRST_CHUNK, largest: int = MAX_CHUNK) -> Iterator[list]:
+    """Split ids into geometrically growing chunks (5, 10, 20, 40, 50, 50, ...)."""
+    start, size = 0, first
+    while start < len(ids):
+        yield ids[start:start + size]
+        start += size
+        size = min(size * 2, largest)
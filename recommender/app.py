@@ -1,6 +1,7 @@
 from fastapi import FastAPI # type: ignore
 from fastapi.middleware.cors import CORSMiddleware # type: ignore
 from api.events_api import router as events_router
+from api.debug_api import router as debug_router
 
 app = FastAPI()  # ✅ This must exist
 
@@ -14,3 +15,4 @@ app.add_middleware(
 
 # Include router
 app.include_router(events_router)
+app.include_router(debug_router)
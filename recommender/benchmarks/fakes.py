@@ -0,0 +1,114 @@
+import hashlib
+import re
+import time
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from services.recommender import parse_tags_field
+
+_TOKEN = re.compile(r"\w+")
+
+
+class HashingEncoder:
+    """
+    Stand-in for SentenceTransformer: deterministic feature-hashed bag of words,
+    L2-normalized into the same 384-d space the API expects. Cheap and
+    repeatable, so load tests measure the service rather than torch.
+    """
+
+    def __init__(self, dim: int = 384) -> None:
+        self.dim = dim
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def _bucket(self, token: str):
+        h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+        return h % self.dim, 1.0 if (h >> 63) & 1 else -1.0
+
+    def encode(self, texts, batch_size: int = 32, normalize_embeddings: bool = False, **_) -> np.ndarray:
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for token in _TOKEN.findall((text or "").lower()):
+                idx, sign = self._bucket(token)
+                out[i, idx] += sign
+        if normalize_embeddings:
+            norms = np.linalg.norm(out, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            out /= norms
+        return out[0] if single else out
+
+
+class _FakeIndices:
+    def __init__(self, index: str) -> None:
+        self.index = index
+
+    def exists(self, index: str) -> bool:
+        return index == self.index
+
+
+class FakeOpenSearch:
+    """
+    In-memory responder for the two query shapes hybrid_search sends:
+    a bool/should `match` over title+tags (scored by token overlap, title
+    boosted like BM25 in the real query) and a `knn` query over event vectors
+    (exact cosine). `latency_ms` simulates the network round trip.
+    """
+
+    def __init__(self, events: pd.DataFrame, encoder: HashingEncoder, index: str = "events", latency_ms: float = 0.0) -> None:
+        self.indices = _FakeIndices(index)
+        self.latency_ms = latency_ms
+
+        self.ids: List[str] = [str(int(e)) for e in events["event_id"]]
+        tags = [parse_tags_field(t) for t in events["tags"]]
+        titles = [str(t or "") for t in events["title"]]
+
+        self.title_tokens = [set(_TOKEN.findall(t.lower())) for t in titles]
+        self.tag_tokens = [set(_TOKEN.findall(" ".join(ts).lower())) for ts in tags]
+        self.vectors = encoder.encode(
+            [f"{t}. tags: {', '.join(ts)}" for t, ts in zip(titles, tags)],
+            normalize_embeddings=True,
+        )
+
+    def _hits(self, scores: np.ndarray, size: int) -> Dict:
+        size = min(size, len(scores))
+        if size <= 0:
+            return {"hits": {"hits": []}}
+        top = sorted(np.argpartition(-scores, size - 1)[:size], key=lambda i: -scores[i])
+        hits = [{"_id": self.ids[i], "_score": float(scores[i])} for i in top if scores[i] > 0]
+        return {"hits": {"hits": hits}}
+
+    def search(self, index: str, body: Dict) -> Dict:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+
+        query = body.get("query", {})
+        size = int(body.get("size", 10))
+
+        if "knn" in query:
+            qvec = np.asarray(query["knn"]["query_vector"], dtype=np.float32)
+            return self._hits(self.vectors @ qvec, size)
+
+        terms = set()
+        for clause in query.get("bool", {}).get("should", []):
+            for field in clause.get("match", {}).values():
+                terms |= set(_TOKEN.findall(str(field.get("query", "")).lower()))
+        scores = np.array(
+            [2.0 * len(terms & t) + len(terms & g) for t, g in zip(self.title_tokens, self.tag_tokens)],
+            dtype=np.float32,
+        )
+        return self._hits(scores, size)
+
+
+def search_terms(events: pd.DataFrame, limit: int = 200) -> Sequence[str]:
+    """Realistic query strings: tag names and title words from the catalog."""
+    terms = set()
+    for tags in events["tags"]:
+        terms.update(parse_tags_field(tags))
+    for title in events["title"].head(limit):
+        terms.update(w for w in _TOKEN.findall(str(title)) if not w.isdigit())
+    return sorted(terms)[:limit]
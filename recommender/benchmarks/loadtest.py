@@ -0,0 +1,237 @@
+"""
+Local load test for the FastAPI app — boots app.py in-process against
+in-memory repositories, a fake OpenSearch and a hashing encoder, then drives
+concurrent request mixes over real HTTP.
+
+Run from the recommender/ directory:
+
+    python -m benchmarks.loadtest --events 10k --concurrency 32 --duration 30
+    python -m benchmarks.loadtest --mix recommend=3,recommend_filtered=1,search=4 --es-latency-ms 5
+    python -m benchmarks.loadtest --real-model      # use the SentenceTransformer for query encoding
+
+Reports p50/p95/p99 latency, throughput and error rate per endpoint.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import uvicorn  # type: ignore
+
+from benchmarks.fakes import FakeOpenSearch, HashingEncoder, search_terms
+from benchmarks.run import _engine, _percentile, _write_model
+from benchmarks.synthetic import SyntheticDataset, parse_size
+
+ENDPOINTS = ("recommend", "recommend_filtered", "search")
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """'recommend=3,search=1' -> {'recommend': 3.0, 'search': 1.0}"""
+    mix = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}', expected one of {ENDPOINTS}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def boot_app(dataset: SyntheticDataset, workdir: str, es_latency_ms: float, real_model: bool):
+    """Wire the API module to in-memory sources, then import app.py as-is."""
+    import api.events_api as events_api
+
+    model_path = os.path.join(workdir, "similarity_model.json")
+    _write_model(dataset, model_path)
+
+    encoder = HashingEncoder()
+    events_api.engine = _engine(dataset, model_path)
+    events_api.ES = FakeOpenSearch(dataset.events, encoder, index=events_api.ES_INDEX, latency_ms=es_latency_ms)
+    if not real_model:
+        events_api.get_model = lambda: encoder
+
+    from app import app
+    return app
+
+
+class Server:
+    def __init__(self, app, port: int, workers_hint: int) -> None:
+        config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                backlog=max(2048, workers_hint * 4))
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        deadline = time.time() + 30
+        while not self.server.started:
+            if time.time() > deadline:
+                raise RuntimeError("uvicorn did not start within 30s")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+class LoadDriver:
+    def __init__(self, base_url: str, dataset: SyntheticDataset, mix: Dict[str, float], top_k: int,
+                 size: int, timeout: float, seed: int) -> None:
+        self.base_url = base_url
+        self.users = dataset.warm_user_ids + dataset.cold_user_ids
+        self.terms = list(search_terms(dataset.events))
+        self.names = list(mix)
+        self.weights = [mix[n] for n in self.names]
+        self.top_k = top_k
+        self.size = size
+        self.timeout = timeout
+        self.seed = seed
+
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.empty: Dict[str, int] = defaultdict(int)
+
+    def _url(self, rng: random.Random, endpoint: str) -> str:
+        if endpoint == "search":
+            params = {"q": rng.choice(self.terms), "size": self.size}
+            return f"{self.base_url}/api/events/search?{urllib.parse.urlencode(params)}"
+        params = {"top_k": self.top_k}
+        if endpoint == "recommend_filtered":
+            params["query"] = rng.choice(self.terms)
+        return f"{self.base_url}/api/events/recommendations/{rng.choice(self.users)}?{urllib.parse.urlencode(params)}"
+
+    def _one(self, rng: random.Random) -> Tuple[str, float, bool, bool]:
+        endpoint = rng.choices(self.names, weights=self.weights)[0]
+        url = self._url(rng, endpoint)
+        t0 = time.perf_counter()
+        ok, empty = False, False
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as resp:
+                payload = json.loads(resp.read())
+                ok = resp.status == 200
+                items = payload.get("recommendations") if isinstance(payload, dict) else payload
+                empty = not items
+        except (urllib.error.URLError, OSError, ValueError):
+            ok = False
+        return endpoint, (time.perf_counter() - t0) * 1000.0, ok, empty
+
+    def _worker(self, worker_id: int, deadline: float, budget: Optional[int], counter: List[int]) -> None:
+        rng = random.Random(self.seed + worker_id)
+        while time.perf_counter() < deadline:
+            if budget is not None:
+                with self._lock:
+                    if counter[0] >= budget:
+                        return
+                    counter[0] += 1
+            endpoint, ms, ok, empty = self._one(rng)
+            with self._lock:
+                self.samples[endpoint].append(ms)
+                if not ok:
+                    self.errors[endpoint] += 1
+                elif empty:
+                    self.empty[endpoint] += 1
+
+    def run(self, concurrency: int, duration: float, requests: Optional[int]) -> float:
+        counter = [0]
+        t0 = time.perf_counter()
+        deadline = t0 + duration
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for w in range(concurrency):
+                pool.submit(self._worker, w, deadline, requests, counter)
+        return time.perf_counter() - t0
+
+    def report(self, elapsed: float) -> Dict[str, Dict[str, float]]:
+        out = {}
+        for endpoint in self.names:
+            lat = self.samples.get(endpoint, [])
+            n = len(lat)
+            out[endpoint] = {
+                "requests": n,
+                "errors": self.errors.get(endpoint, 0),
+                "error_rate": round(self.errors.get(endpoint, 0) / n, 4) if n else 0.0,
+                "empty_results": self.empty.get(endpoint, 0),
+                "throughput_per_s": round(n / elapsed, 2) if elapsed else 0.0,
+                "p50_ms": round(_percentile(lat, 50), 2) if lat else None,
+                "p95_ms": round(_percentile(lat, 95), 2) if lat else None,
+                "p99_ms": round(_percentile(lat, 99), 2) if lat else None,
+            }
+        return out
+
+
+def print_report(report: Dict[str, Dict[str, float]], elapsed: float) -> None:
+    print(f"⏱️ {elapsed:.1f}s")
+    print(f"{'endpoint':<20} {'reqs':>7} {'rps':>8} {'err%':>6} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for endpoint, r in report.items():
+        if not r["requests"]:
+            print(f"{endpoint:<20} {0:>7}")
+            continue
+        print(
+            f"{endpoint:<20} {r['requests']:>7} {r['throughput_per_s']:>8.1f} {r['error_rate'] * 100:>6.2f} "
+            f"{r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the recommender API in-process")
+    parser.add_argument("--events", default="1k", help="Catalog size, e.g. 1k, 10k")
+    parser.add_argument("--model-cap", type=int, default=2000)
+    parser.add_argument("--mix", default="recommend=3,recommend_filtered=1,search=4")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests in total")
+    parser.add_argument("--top-k", type=int, default=15)
+    parser.add_argument("--size", type=int, default=10, help="Search result size")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request client timeout (s)")
+    parser.add_argument("--es-latency-ms", type=float, default=0.0)
+    parser.add_argument("--real-model", action="store_true")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="Write the report JSON here")
+    parser.add_argument("--verbose", action="store_true", help="Keep the service's own logging")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    dataset = SyntheticDataset(n_events=parse_size(args.events), model_cap=args.model_cap, seed=args.seed)
+    print(f"📦 {len(dataset.events)} events, {dataset.n_users} users, {len(dataset.interactions)} interactions")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = boot_app(dataset, workdir, args.es_latency_ms, args.real_model)
+        port = args.port or _free_port()
+        driver = LoadDriver(f"http://127.0.0.1:{port}", dataset, mix, args.top_k, args.size, args.timeout, args.seed)
+
+        mute = contextlib.redirect_stdout(open(os.devnull, "w")) if not args.verbose else contextlib.nullcontext()
+        with Server(app, port, args.concurrency), mute:
+            elapsed = driver.run(args.concurrency, args.duration, args.requests)
+
+    report = driver.report(elapsed)
+    print_report(report, elapsed)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "elapsed_s": round(elapsed, 3), "endpoints": report}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+from typing import Any, List, Tuple
+
+import pandas as pd
+
+from services.recommender import EventRepository, UserInteractionRepository
+from build_model import SimilarityModelBuilder
+
+
+class InMemoryEventRepository(EventRepository):
+    """EventRepository backed by a DataFrame shaped like public."Event"."""
+
+    def __init__(self, events_df: pd.DataFrame):
+        super().__init__(db_config=None)
+        self._frame = events_df
+        self._by_id = events_df.set_index("event_id", drop=False)
+
+    def _fetch_all(self) -> pd.DataFrame:
+        return self._frame.copy()
+
+    def _fetch_by_ids(self, ids) -> pd.DataFrame:
+        present = [int(i) for i in ids if int(i) in self._by_id.index]
+        return self._by_id.loc[present].reset_index(drop=True)
+
+
+class InMemoryUserInteractionRepository(UserInteractionRepository):
+    """UserInteractionRepository backed by a DataFrame shaped like public."User_Event"."""
+
+    def __init__(self, interactions_df: pd.DataFrame):
+        super().__init__(db_config=None)
+        self._frame = interactions_df
+
+    def _fetch_all(self) -> pd.DataFrame:
+        return self._frame.copy()
+
+
+class InMemorySimilarityModelBuilder(SimilarityModelBuilder):
+    """SimilarityModelBuilder that reads prepared rows instead of Postgres."""
+
+    def __init__(self, rows: List[Tuple[Any, ...]], model_path: str) -> None:
+        super().__init__(db_config={}, model_path=model_path)
+        self._rows = rows
+
+    def fetch_rows(self) -> List[Tuple[Any, ...]]:
+        return list(self._rows)
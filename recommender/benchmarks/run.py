@@ -0,0 +1,266 @@
+"""
+Offline benchmarks for the recommender — no Postgres or OpenSearch required.
+
+Run from the recommender/ directory:
+
+    python -m benchmarks.run --sizes 1k,10k,100k
+    python -m benchmarks.run --sizes 1k,10k --repeat 30 --save-baseline  # refresh baseline.json
+    python -m benchmarks.run --sizes 1k,10k --check                      # fail on regressions
+
+Cases:
+    recommend  RecommendationEngine.recommend_events for users with history (hybrid path)
+    tag_only   RecommendationEngine.recommend_events for cold-start users (tag-only path)
+    build      SimilarityModelBuilder.build (load rows -> vocab -> blocked similarity -> .npy + manifest)
+    hydrate    BM25 + kNN fusion followed by hydration of the fused ids
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.memory_repos import (
+    InMemoryEventRepository,
+    InMemorySimilarityModelBuilder,
+    InMemoryUserInteractionRepository,
+)
+from benchmarks.synthetic import SyntheticDataset, parse_size
+from services.recommender import RecommendationEngine
+from services.search import fuse_hits, hydrate_rows
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+CASES = ["recommend", "tag_only", "build", "hydrate"]
+
+
+# --- Measurement ---
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def measure(fn: Callable[[], object], repeat: int, warmup: int, quiet: bool = True) -> Dict[str, float]:
+    """
+    Time `fn` `repeat` times after `warmup` untimed calls, then run it once more
+    under tracemalloc for peak memory (kept out of the timed runs).
+    """
+    sink = io.StringIO()
+    mute = contextlib.redirect_stdout(sink) if quiet else contextlib.nullcontext()
+
+    with mute:
+        for _ in range(warmup):
+            fn()
+
+        timings = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - t0) * 1000.0)
+            sink.seek(0)
+            sink.truncate()
+
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    mean = statistics.fmean(timings)
+    return {
+        "runs": repeat,
+        "p50_ms": round(_percentile(timings, 50), 3),
+        "p95_ms": round(_percentile(timings, 95), 3),
+        "mean_ms": round(mean, 3),
+        "throughput_per_s": round(1000.0 / mean, 3) if mean else 0.0,
+        "peak_mem_mb": round(peak / (1024 * 1024), 3),
+    }
+
+
+# --- Case setup ---
+
+def _write_model(dataset: SyntheticDataset, model_path: str) -> None:
+    event_ids, matrix = dataset.similarity_model()
+    builder = InMemorySimilarityModelBuilder(rows=[], model_path=model_path)
+    builder.save_model(event_ids, matrix.tolist())
+
+
+def _engine(dataset: SyntheticDataset, model_path: str) -> RecommendationEngine:
+    return RecommendationEngine(
+        db_config=None,
+        similarity_model_path=model_path,
+        event_repo=InMemoryEventRepository(dataset.events),
+        inter_repo=InMemoryUserInteractionRepository(dataset.interactions),
+    )
+
+
+def setup_case(case: str, dataset: SyntheticDataset, workdir: str, top_k: int) -> Callable[[], object]:
+    if case in ("recommend", "tag_only"):
+        model_path = os.path.join(workdir, "similarity_model.json")
+        if not os.path.exists(model_path):
+            _write_model(dataset, model_path)
+        engine = _engine(dataset, model_path)
+        users = itertools.cycle(dataset.warm_user_ids if case == "recommend" else dataset.cold_user_ids)
+        return lambda: engine.recommend_events(user_id=next(users), top_k=top_k, max_per_cluster=5)
+
+    if case == "build":
+        rows = dataset.builder_rows()
+        builder = InMemorySimilarityModelBuilder(rows, os.path.join(workdir, "built_model.json"))
+        return builder.build
+
+    if case == "hydrate":
+        rng = random.Random(dataset.seed)
+        repo = InMemoryEventRepository(dataset.events)
+        queries = []
+        for _ in range(32):
+            bm = [{"_id": str(rng.randint(1, dataset.n_events)), "_score": rng.uniform(1, 20)} for _ in range(50)]
+            kn = [{"_id": str(rng.randint(1, dataset.n_events)), "_score": rng.uniform(0.2, 1)} for _ in range(50)]
+            queries.append((bm, kn))
+        pending = itertools.cycle(queries)
+
+        def run_hydrate():
+            bm, kn = next(pending)
+            fused = fuse_hits(bm, kn, top_k)
+            ids = [int(i) for i, _ in fused]
+            return hydrate_rows(ids, repo.load_by_ids(ids), {str(i): s for i, s in fused})
+
+        return run_hydrate
+
+    raise ValueError(f"Unknown case: {case}")
+
+
+# --- Baseline ---
+
+def compare_to_baseline(results: Dict, baseline: Dict, tolerance: float, min_delta_ms: float = 0.0) -> List[str]:
+    """
+    Return human-readable regressions (p50 latency or peak memory beyond tolerance).
+    A p50 also has to be min_delta_ms over its baseline: for cases of a few
+    milliseconds, scheduler noise alone moves the p50 by more than the tolerance.
+    """
+    floors = {"p50_ms": min_delta_ms, "peak_mem_mb": 0.0}
+    regressions = []
+    for size, cases in results.items():
+        for case, stats in cases.items():
+            base = baseline.get(size, {}).get(case)
+            if not base or "skipped" in stats or "skipped" in base:
+                continue
+            for metric in ("p50_ms", "peak_mem_mb"):
+                limit = max(base[metric] * (1 + tolerance), base[metric] + floors[metric]) if base.get(metric) else None
+                if limit is not None and stats[metric] > limit:
+                    regressions.append(
+                        f"{size}/{case} {metric}: {stats[metric]} vs baseline {base[metric]} "
+                        f"(+{(stats[metric] / base[metric] - 1) * 100:.1f}%)"
+                    )
+    return regressions
+
+
+def print_table(results: Dict) -> None:
+    print(f"{'size':>6} {'case':<10} {'p50 ms':>10} {'p95 ms':>10} {'ops/s':>10} {'peak MB':>9}")
+    for size, cases in results.items():
+        for case, stats in cases.items():
+            if "skipped" in stats:
+                print(f"{size:>6} {case:<10} skipped: {stats['skipped']}")
+                continue
+            print(
+                f"{size:>6} {case:<10} {stats['p50_ms']:>10.2f} {stats['p95_ms']:>10.2f} "
+                f"{stats['throughput_per_s']:>10.2f} {stats['peak_mem_mb']:>9.2f}"
+            )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline recommender benchmarks")
+    parser.add_argument("--sizes", default="1k,10k", help="Comma-separated catalog sizes, e.g. 1k,10k,100k")
+    parser.add_argument("--cases", default=",".join(CASES))
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--top-k", type=int, default=15)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--model-cap", type=int, default=2000,
+                        help="Max events covered by the n×n similarity model")
+    parser.add_argument("--max-build-size", type=int, default=1000,
+                        help="Skip the build case above this many events")
+    parser.add_argument("--out", help="Write results JSON here")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if results regress past --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--min-delta-ms", type=float, default=2.0,
+                        help="Ignore p50 increases smaller than this many ms, whatever the percentage")
+    parser.add_argument("--verbose", action="store_true", help="Keep the engine's own logging")
+    args = parser.parse_args(argv)
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    results: Dict[str, Dict[str, Dict]] = {}
+
+    for label in [s.strip() for s in args.sizes.split(",") if s.strip()]:
+        n = parse_size(label)
+        random.seed(args.seed)
+        dataset = SyntheticDataset(n_events=n, model_cap=args.model_cap, seed=args.seed)
+        print(f"📦 {label}: {n} events, {dataset.n_users} users, {len(dataset.interactions)} interactions")
+        results[label] = {}
+
+        with tempfile.TemporaryDirectory() as workdir:
+            for case in cases:
+                if case == "build" and n > args.max_build_size:
+                    results[label][case] = {"skipped": f"n > --max-build-size ({args.max_build_size})"}
+                    continue
+                fn = setup_case(case, dataset, workdir, args.top_k)
+                repeat = min(args.repeat, 3) if case == "build" else args.repeat
+                warmup = 0 if case == "build" else args.warmup
+                random.seed(args.seed)
+                results[label][case] = measure(fn, repeat, warmup, quiet=not args.verbose)
+
+    print_table(results)
+
+    payload = {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "top_k": args.top_k,
+            "model_cap": args.model_cap,
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        print(f"✅ Baseline saved at: {args.baseline}")
+        return 0
+
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print(f"❌ No baseline at {args.baseline}; run with --save-baseline first")
+            return 1
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare_to_baseline(results, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print("❌ Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("✅ No regressions against baseline")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+import json
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.recommender import TAG_CLUSTER_MAP
+from build_model import SimilarityModelBuilder
+
+CLUSTER_TAGS: Dict[str, List[str]] = defaultdict(list)
+for _tag, _cluster in sorted(TAG_CLUSTER_MAP.items()):
+    CLUSTER_TAGS[_cluster].append(_tag)
+CLUSTERS = sorted(CLUSTER_TAGS)
+ALL_TAGS = sorted(TAG_CLUSTER_MAP)
+
+TITLE_WORDS = [
+    "Hackathon", "Bootcamp", "Summit", "Workshop", "Meetup", "Conference", "Fellowship",
+    "Challenge", "Session", "Series", "Festival", "Expo", "Training", "Talk", "Camp",
+]
+LOCATIONS = ["Kathmandu", "Lalitpur", "Bhaktapur", "Pokhara", "Online", "Biratnagar", "Chitwan", ""]
+PRICES = ["Free", "Free", "Free", "Rs. 500", "Rs 2000", None]
+
+
+def parse_size(label: str) -> int:
+    """'1k' -> 1000, '100k' -> 100000, '2m' -> 2000000, '500' -> 500."""
+    s = label.strip().lower()
+    mult = 1
+    if s.endswith("k"):
+        mult, s = 1_000, s[:-1]
+    elif s.endswith("m"):
+        mult, s = 1_000_000, s[:-1]
+    return int(float(s) * mult)
+
+
+class SyntheticDataset:
+    """
+    Deterministic fake catalog shaped like the Postgres tables.
+
+    `events` mirrors public."Event" (tags as a Postgres array string, cluster set
+    from the primary cluster the tags were drawn from); `interactions` mirrors
+    public."User_Event" (meta as a JSON string). A fraction of users has no
+    interactions at all, to exercise the cold-start / tag-only path.
+    """
+
+    def __init__(
+        self,
+        n_events: int,
+        n_users: int = None,
+        interactions_per_user: int = 8,
+        cold_user_ratio: float = 0.2,
+        model_cap: int = 2000,
+        seed: int = 42,
+    ) -> None:
+        self.n_events = n_events
+        self.n_users = n_users or max(50, n_events // 10)
+        self.interactions_per_user = interactions_per_user
+        self.cold_user_ratio = cold_user_ratio
+        self.model_cap = min(model_cap, n_events)
+        self.seed = seed
+        self.today = datetime.today().replace(hour=0, minute=0, second=0, microsecond=0)
+
+        self.rng = random.Random(seed)
+        self.event_clusters: List[str] = []
+        self.events = self._generate_events()
+        self.interactions, self.warm_user_ids, self.cold_user_ids = self._generate_interactions()
+
+    # --- Events ---
+
+    def _generate_events(self) -> pd.DataFrame:
+        rng = self.rng
+        rows = []
+        for eid in range(1, self.n_events + 1):
+            cluster = rng.choice(CLUSTERS)
+            own = CLUSTER_TAGS[cluster]
+            tags = rng.sample(own, k=min(len(own), rng.randint(1, 3)))
+            tags += [t for t in rng.sample(ALL_TAGS, k=rng.randint(0, 3)) if t not in tags]
+
+            start = self.today + timedelta(days=rng.randint(-180, 180))
+            end = start + timedelta(days=rng.randint(0, 14)) if rng.random() > 0.2 else None
+
+            self.event_clusters.append(cluster)
+            rows.append({
+                "event_id": eid,
+                "title": f"{tags[0]} {rng.choice(TITLE_WORDS)} {eid}",
+                "image": f"https://img.example.com/{eid}.png" if rng.random() > 0.1 else None,
+                "start_date": start,
+                "end_date": end,
+                "location": rng.choice(LOCATIONS),
+                "tags": "{" + ",".join(tags) + "}",
+                "price": rng.choice(PRICES),
+                "url": f"https://events.example.com/{eid}",
+                "cluster": cluster if rng.random() > 0.1 else None,
+            })
+        return pd.DataFrame(rows)
+
+    def model_event_ids(self) -> List[int]:
+        """Events covered by the similarity model (the model cannot hold an n×n matrix at 100k)."""
+        return list(range(1, self.model_cap + 1))
+
+    # --- Interactions ---
+
+    def _generate_interactions(self) -> Tuple[pd.DataFrame, List[int], List[int]]:
+        rng = self.rng
+        by_cluster: Dict[str, List[int]] = defaultdict(list)
+        for eid, cluster in enumerate(self.event_clusters, start=1):
+            by_cluster[cluster].append(eid)
+        in_model = set(self.model_event_ids())
+
+        rows = []
+        warm, cold = [], []
+        row_id = 1
+        for uid in range(1, self.n_users + 1):
+            if rng.random() < self.cold_user_ratio:
+                cold.append(uid)
+                continue
+            warm.append(uid)
+            cluster = rng.choice(CLUSTERS)
+            ts = self.today - timedelta(days=rng.randint(0, 90))
+
+            # Onboarding tag selections (no event attached)
+            for _ in range(rng.randint(1, 3)):
+                tags = rng.sample(CLUSTER_TAGS[cluster], k=min(2, len(CLUSTER_TAGS[cluster])))
+                rows.append((row_id, uid, None, "tag_click", json.dumps({"tags": tags}), ts))
+                row_id += 1
+
+            candidates = [e for e in by_cluster[cluster] if e in in_model] or by_cluster[cluster]
+            for _ in range(self.interactions_per_user):
+                if rng.random() < 0.75 and candidates:
+                    eid = rng.choice(candidates)
+                else:
+                    eid = rng.randint(1, self.n_events)
+                itype = "register" if rng.random() < 0.2 else "view"
+                ts += timedelta(minutes=rng.randint(1, 600))
+                tags = self._event_tags(eid)
+                rows.append((row_id, uid, eid, itype, json.dumps({"tags": tags}), ts))
+                row_id += 1
+
+        df = pd.DataFrame(rows, columns=["id", "user_id", "event_id", "interaction_type", "meta", "interaction_time"])
+        return df, warm, cold
+
+    def _event_tags(self, event_id: int) -> List[str]:
+        raw = self.events.at[event_id - 1, "tags"]
+        return [t for t in raw[1:-1].split(",") if t]
+
+    # --- Similarity model ---
+
+    def similarity_model(self) -> Tuple[List[int], np.ndarray]:
+        """Bag-of-words cosine model built the same way as build_model.py, vectorized."""
+        ids = self.model_event_ids()
+        docs = [
+            SimilarityModelBuilder.tokenize(" ".join(self._event_tags(eid)))
+            for eid in ids
+        ]
+        vocab: Dict[str, int] = {}
+        for tokens in docs:
+            for w in tokens:
+                vocab.setdefault(w, len(vocab))
+
+        x = np.zeros((len(ids), max(1, len(vocab))), dtype=np.float64)
+        for i, tokens in enumerate(docs):
+            for w in tokens:
+                x[i, vocab[w]] += 1
+        norms = np.linalg.norm(x, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        x /= norms
+        return ids, np.round(x @ x.T, 4)
+
+    def builder_rows(self) -> List[Tuple]:
+        """Rows in the shape SimilarityModelBuilder.fetch_rows() returns."""
+        ev = self.events
+        return list(zip(ev["event_id"], ev["title"], ev["tags"], ev["location"]))
@@ -1,22 +1,63 @@
 import os
-import math
 import json
+import uuid
+import tempfile
 import psycopg2
-from typing import List, Dict, Any, Tuple
+import scipy.sparse as sp
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
+
+from services.dedupe import load_duplicates
+from services.similarity_builder import BlockedSimilarityBuilder, binary_paths
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = os.path.join(BASE_DIR, "models", "similarity_model.json")
+# Leave out events that ended more than this many days ago (unset = keep every event)
+PRUNE_EXPIRED_DAYS = os.getenv("MODEL_PRUNE_EXPIRED_DAYS")
+# Similarity build: worker processes (0 = one per CPU), rows/columns per tile,
+# and, when set, keep only each event's N most similar events instead of the n x n matrix
+BUILD_WORKERS = int(os.getenv("MODEL_BUILD_WORKERS", "0"))
+TILE_SIZE = int(os.getenv("MODEL_TILE_SIZE", "2048"))
+TOP_N = os.getenv("MODEL_TOP_N")
 
 
 class SimilarityModelBuilder:
     """
     Builds a simple similarity model for events using bag-of-words and cosine similarity.
-    Loads events from PostgreSQL, computes a similarity matrix, and saves it as JSON.
+    Loads events from PostgreSQL, computes the similarities out of core with
+    BlockedSimilarityBuilder (float32 .npy files the server memory-maps as is)
+    and publishes them under a small JSON manifest at model_path. With top_n
+    set, only each event's top_n most similar events are kept.
+
+    An interrupted build leaves its work directory next to the model; running
+    it again over the same events picks up from the last finished row block.
+
+    With prune_expired_days set, events that ended more than that many days
+    ago are left out, so the n x n matrix tracks the live catalog instead of
+    growing with every event ever listed. Interactions with pruned events then
+    no longer contribute similarity (they still feed the tag profile).
+
+    Events listed in `duplicates` (written by dedupe_events.py) are left out
+    too, so a scraped-twice event cannot be recommended next to itself.
     """
 
-    def __init__(self, db_config: Dict[str, Any], model_path: str) -> None:
+    def __init__(
+        self,
+        db_config: Dict[str, Any],
+        model_path: str,
+        prune_expired_days: Optional[int] = None,
+        duplicates: Optional[Dict[int, int]] = None,
+        workers: int = 0,
+        tile_size: int = 2048,
+        top_n: Optional[int] = None,
+    ) -> None:
         self.db_config = db_config
         self.model_path = model_path
+        self.prune_expired_days = prune_expired_days
+        self.duplicates = duplicates or {}
+        self.workers = workers
+        self.tile_size = tile_size
+        self.top_n = top_n
 
     # --- Database connection ---
 
@@ -59,6 +100,24 @@ class SimilarityModelBuilder:
 
     # --- Data loading ---
 
+    def fetch_rows(self) -> List[Tuple[Any, ...]]:
+        """Fetch raw (event_id, title, tags, location) rows from the database."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        if self.prune_expired_days is None:
+            cursor.execute('SELECT "event_id", title, tags, location FROM public."Event";')
+        else:
+            cursor.execute(
+                'SELECT "event_id", title, tags, location FROM public."Event" '
+                "WHERE end_date IS NULL OR end_date >= CURRENT_DATE - %s * INTERVAL '1 day';",
+                (int(self.prune_expired_days),),
+            )
+        rows = cursor.fetchall()
+
+        conn.close()
+        return rows
+
     def load_events(self) -> List[Dict[str, Any]]:
         """
         Load events from the database and return a list of dicts:
@@ -67,15 +126,10 @@ class SimilarityModelBuilder:
           ...
         ]
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute('SELECT "event_id", title, tags, location FROM public."Event";')
-        rows = cursor.fetchall()
-
-        conn.close()
+        rows = self.fetch_rows()
 
         events = []
+        skipped = 0
         for row in rows:
             event_id, title, tags, location = row
 
@@ -85,6 +139,10 @@ class SimilarityModelBuilder:
             except (ValueError, TypeError):
                 continue  # skip invalid IDs
 
+            if event_id in self.duplicates:
+                skipped += 1
+                continue
+
             tags_list = self.parse_tags(tags)
 
             # Use tags as the main text; if tags are empty, fall back to title
@@ -96,6 +154,8 @@ class SimilarityModelBuilder:
                 "tokens": tokens
             })
 
+        if skipped:
+            print(f"🧬 Skipped {skipped} duplicate events")
         return events
 
     # --- Vectorization ---
@@ -111,65 +171,88 @@ class SimilarityModelBuilder:
                     vocab[word] = len(vocab)
         return vocab
 
-    def vectorize_events(self, events: List[Dict[str, Any]], vocab: Dict[str, int]) -> List[List[int]]:
-        """
-        Convert event tokens into count vectors using the vocabulary.
-        """
-        vectors: List[List[int]] = []
-        vocab_size = len(vocab)
-
+    def count_matrix(self, events: List[Dict[str, Any]], vocab: Dict[str, int]) -> sp.csr_matrix:
+        """Sparse (events x vocab) token counts, one row per event."""
+        indptr, indices = [0], []
         for ev in events:
-            vec = [0] * vocab_size
-            for word in ev["tokens"]:
-                idx = vocab[word]
-                vec[idx] += 1
-            vectors.append(vec)
-
-        return vectors
+            indices.extend(vocab[word] for word in ev["tokens"])
+            indptr.append(len(indices))
+        data = [1.0] * len(indices)
+        counts = sp.csr_matrix((data, indices, indptr), shape=(len(events), len(vocab)))
+        counts.sum_duplicates()
+        return counts
 
-    # --- Similarity computation ---
+    # --- Persistence ---
 
     @staticmethod
-    def cosine_similarity(v1: List[float], v2: List[float]) -> float:
-        """Compute cosine similarity between two vectors."""
-        dot = sum(a * b for a, b in zip(v1, v2))
-        norm1 = math.sqrt(sum(a * a for a in v1))
-        norm2 = math.sqrt(sum(b * b for b in v2))
-        if not norm1 or not norm2:
-            return 0.0
-        return dot / (norm1 * norm2)
-
-    def compute_similarity_matrix(self, vectors: List[List[int]]) -> List[List[float]]:
+    def new_version() -> str:
+        return f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{uuid.uuid4().hex[:8]}"
+
+    def write_model_file(self, data: Dict[str, Any], indent: Optional[int] = 2) -> None:
         """
-        Compute a full cosine similarity matrix for the given vectors.
+        Write `data` to model_path through a temp file in the same directory
+        renamed into place, so readers see either the old model or the new
+        one, never a partial file.
         """
-        n = len(vectors)
-        similarity_matrix: List[List[float]] = []
-
-        for i in range(n):
-            row: List[float] = []
-            for j in range(n):
-                sim = self.cosine_similarity(vectors[i], vectors[j])
-                row.append(round(sim, 4))  # Round for smaller file size
-            similarity_matrix.append(row)
-
-        return similarity_matrix
-
-    # --- Persistence ---
-
-    def save_model(self, event_ids: List[int], similarity_matrix: List[List[float]]) -> None:
+        model_dir = os.path.dirname(self.model_path)
+        os.makedirs(model_dir, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(prefix=".similarity_model.", suffix=".tmp", dir=model_dir)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=indent)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.model_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def save_model(self, event_ids: List[int], similarity_matrix: List[List[float]]) -> str:
         """
-        Save the model (event IDs + similarity matrix) as JSON.
+        Save the model (version + event IDs + similarity matrix) as one JSON
+        file; the server compiles it to .npy on first load. Kept for small
+        models and fixtures, build() publishes with publish_model instead.
+        Returns the new version id.
         """
-        os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
-
-        data = {
+        version = self.new_version()
+        # "version" goes first so servers can read it without parsing the matrix
+        self.write_model_file({
+            "version": version,
             "event_ids": event_ids,
             "similarity_matrix": similarity_matrix,
-        }
+        })
+        return version
 
-        with open(self.model_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+    def publish_model(self, version: str, files: Dict[str, str], fmt: str, n_events: int) -> None:
+        """
+        Move a finished blocked build's files to their versioned names next to
+        the model, then point the model JSON at them. The JSON is replaced
+        last, so servers never see a version whose files are not in place.
+        Files of older versions are removed afterwards (servers that still
+        map them keep their mapping until they reload).
+        """
+        targets = binary_paths(self.model_path, version, fmt)
+        for name, path in files.items():
+            os.chmod(path, 0o644)
+            os.replace(path, targets[name])
+
+        manifest: Dict[str, Any] = {"version": version, "format": fmt, "events": n_events}
+        if self.top_n is not None:
+            manifest["top_n"] = self.top_n
+        self.write_model_file(manifest)
+
+        stem = os.path.basename(os.path.splitext(self.model_path)[0])
+        folder = os.path.dirname(self.model_path) or "."
+        keep = {os.path.basename(p) for p in targets.values()}
+        for name in os.listdir(folder):
+            if name.startswith(f"{stem}.") and name.endswith(".npy") and name not in keep:
+                try:
+                    os.remove(os.path.join(folder, name))
+                except OSError:
+                    pass
 
     # --- High-level entry point ---
 
@@ -178,9 +261,9 @@ class SimilarityModelBuilder:
         Full pipeline:
         1. Load events
         2. Build vocabulary
-        3. Vectorize events
-        4. Compute similarity matrix
-        5. Save model
+        3. Vectorize events (sparse counts)
+        4. Compute similarities block by block
+        5. Publish model
         """
         events = self.load_events()
         if not events:
@@ -188,13 +271,22 @@ class SimilarityModelBuilder:
             return
 
         vocab = self.build_vocab(events)
-        vectors = self.vectorize_events(events, vocab)
-        similarity_matrix = self.compute_similarity_matrix(vectors)
-
+        counts = self.count_matrix(events, vocab)
         event_ids = [int(ev["id"]) for ev in events]
-        self.save_model(event_ids, similarity_matrix)
 
-        print(f"✅ Model built from {len(events)} events and saved at: {self.model_path}")
+        model_dir = os.path.dirname(self.model_path) or "."
+        stem = os.path.basename(os.path.splitext(self.model_path)[0])
+        blocked = BlockedSimilarityBuilder(
+            work_dir=os.path.join(model_dir, f".{stem}.build"),
+            tile_size=self.tile_size,
+            top_n=self.top_n,
+            workers=self.workers,
+        )
+        version, files = blocked.build(event_ids, counts)
+        self.publish_model(version, files, blocked.fmt, len(event_ids))
+        blocked.cleanup()
+
+        print(f"✅ Model {version} built from {len(events)} events and saved at: {self.model_path}")
 
 
 if __name__ == "__main__":
@@ -205,5 +297,13 @@ if __name__ == "__main__":
         "password": "postgres",
     }
 
-    builder = SimilarityModelBuilder(db_config=db_config, model_path=MODEL_PATH)
+    builder = SimilarityModelBuilder(
+        db_config=db_config,
+        model_path=MODEL_PATH,
+        prune_expired_days=int(PRUNE_EXPIRED_DAYS) if PRUNE_EXPIRED_DAYS else None,
+        duplicates=load_duplicates(),
+        workers=BUILD_WORKERS,
+        tile_size=TILE_SIZE,
+        top_n=int(TOP_N) if TOP_N else None,
+    )
     builder.build()
@@ -0,0 +1,80 @@
+"""
+Near-duplicate detection for public."Event" (run before build_model.py and ingest.py).
+
+    python dedupe_events.py                 # write models/event_duplicates.json
+    python dedupe_events.py --dry-run       # print the duplicate groups only
+    python dedupe_events.py --threshold 0.8
+
+Scrapers insert the same event several times with slightly different
+titles. This finds them with MinHash LSH over title and tag shingles and
+writes a {duplicate event_id: canonical event_id} mapping
+(EVENT_DUPLICATES_PATH). build_model.py leaves duplicates out of the
+similarity matrix and ingest.py leaves them out of (and removes them from)
+the search index. The Event rows themselves are not modified.
+"""
+import argparse
+import os
+from collections import defaultdict
+
+import pandas as pd
+import psycopg2
+
+from services.dedupe import DEFAULT_DUPLICATES_PATH, EventDeduplicator, save_duplicates
+from services.recommender import parse_tags_field
+
+DB = dict(
+    host=os.getenv("PGHOST", "localhost"),
+    dbname=os.getenv("PGDATABASE", "eventdb"),
+    user=os.getenv("PGUSER", "postgres"),
+    password=os.getenv("PGPASSWORD", "postgres"),
+)
+
+
+def fetch_events(db_config) -> pd.DataFrame:
+    with psycopg2.connect(**db_config) as conn, conn.cursor() as cur:
+        cur.execute('SELECT event_id, title, tags, start_date FROM public."Event" ORDER BY event_id')
+        rows = cur.fetchall()
+    df = pd.DataFrame(rows, columns=["event_id", "title", "tags", "start_date"])
+    df["tags"] = df["tags"].map(parse_tags_field)
+    return df
+
+
+def print_groups(events: pd.DataFrame, mapping) -> None:
+    titles = dict(zip(events["event_id"].astype(int), events["title"]))
+    groups = defaultdict(list)
+    for dup, canonical in mapping.items():
+        groups[canonical].append(dup)
+    for canonical, dups in sorted(groups.items()):
+        print(f"  {canonical}: {titles.get(canonical)!r}")
+        for dup in sorted(dups):
+            print(f"    ↳ {dup}: {titles.get(dup)!r}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Map near-duplicate events to a canonical event id")
+    parser.add_argument("--threshold", type=float, default=0.7, help="Jaccard similarity of title/tag shingles")
+    parser.add_argument("--bands", type=int, default=16)
+    parser.add_argument("--rows", type=int, default=8, help="Rows per band (bands x rows <= 128)")
+    parser.add_argument("--max-date-gap-days", type=int, default=30, help="Events starting further apart are never duplicates")
+    parser.add_argument("--output", default=DEFAULT_DUPLICATES_PATH)
+    parser.add_argument("--dry-run", action="store_true", help="Print the groups without writing the mapping")
+    args = parser.parse_args()
+
+    events = fetch_events(DB)
+    print(f"📥 Loaded {len(events)} events")
+    dedupe = EventDeduplicator(
+        threshold=args.threshold, bands=args.bands, rows=args.rows, max_date_gap_days=args.max_date_gap_days
+    )
+    mapping = dedupe.find(events)
+    print_groups(events, mapping)
+
+    if args.dry_run:
+        print(f"✅ {len(mapping)} duplicates found (dry run, mapping not written)")
+        return 0
+    save_duplicates(mapping, args.output, threshold=args.threshold, events=len(events))
+    print(f"✅ Canonical-id mapping for {len(mapping)} duplicates saved at: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
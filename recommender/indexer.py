@@ -7,6 +7,9 @@ from pydantic import BaseModel
 from sentence_transformers import SentenceTransformer # type: ignore
 from opensearchpy import OpenSearch, helpers # type: ignore
 
+from services.embedding_cache import EmbeddingCache
+from services.index_generation import IndexGeneration
+
 APP_NAME = "EventIndexer"
 app = FastAPI(title=APP_NAME)
 
@@ -36,6 +39,9 @@ os_client = OpenSearch(
 # -----------------------------
 model = SentenceTransformer(MODEL_NAME)
 EMBED_DIM = model.get_sentence_embedding_dimension()
+embedding_cache = EmbeddingCache(MODEL_NAME, dim=EMBED_DIM)
+# Bumped after every write so the API drops search results cached before it
+index_generation = IndexGeneration()
 
 # -----------------------------
 # Mapping helper (ensure index)
@@ -84,16 +90,21 @@ class EventIn(BaseModel):
 # -----------------------------
 # Embedding
 # -----------------------------
-def embed_event(ev: EventIn) -> list[float]:
+def event_text(ev: EventIn) -> str:
     # Build a compact text for embedding (tune as you like)
     text_parts = [ev.title]
     if ev.tags:
         text_parts.append(" ".join([t for t in ev.tags if t]))
     if ev.location:
         text_parts.append(ev.location)
-    text = " ".join(text_parts)
-    vec = model.encode(text, normalize_embeddings=True)
-    return vec.tolist()
+    return " ".join(text_parts)
+
+def embed_events(events: List[EventIn]) -> list[list[float]]:
+    # Unchanged events are served from the on-disk cache, not the model
+    return embedding_cache.encode(model, [event_text(ev) for ev in events]).tolist()
+
+def embed_event(ev: EventIn) -> list[float]:
+    return embed_events([ev])[0]
 
 # -----------------------------
 # Upsert / Delete
@@ -108,6 +119,7 @@ def index_event(ev: EventIn):
         vec = embed_event(ev)
         body = ev.model_dump() | {"vector": vec}
         os_client.index(index=OS_INDEX, id=ev.event_id, body=body, refresh=False)
+        index_generation.bump()
         return {"ok": True}
     except Exception as e:
         raise HTTPException(500, f"Index error: {e}")
@@ -116,6 +128,7 @@ def index_event(ev: EventIn):
 def delete_event(event_id: int):
     try:
         os_client.delete(index=OS_INDEX, id=event_id, ignore=[404], refresh=False)
+        index_generation.bump()
         return {"ok": True}
     except Exception as e:
         raise HTTPException(500, f"Delete error: {e}")
@@ -130,8 +143,8 @@ class EventsPayload(BaseModel):
 @app.post("/index/reindex")
 def reindex_events(payload: EventsPayload):
     actions = []
-    for ev in payload.events:
-        vec = embed_event(ev)
+    vectors = embed_events(payload.events)
+    for ev, vec in zip(payload.events, vectors):
         body = ev.model_dump() | {"vector": vec}
         actions.append({
             "_op_type": "index",
@@ -141,4 +154,5 @@ def reindex_events(payload: EventsPayload):
         })
 
     success, fail = helpers.bulk(os_client, actions, refresh=True, raise_on_error=False)
+    index_generation.bump()
     return {"ok": True, "indexed": success, "failed": len(fail)}
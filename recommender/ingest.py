@@ -4,6 +4,10 @@ import psycopg2, psycopg2.extras
 import requests  # type: ignore
 from sentence_transformers import SentenceTransformer  # type: ignore
 
+from services.embedding_cache import EmbeddingCache
+from services.dedupe import load_duplicates
+from services.index_generation import IndexGeneration
+
 
 ES = os.getenv("ES_URL", "http://localhost:9200")
 INDEX = os.getenv("ES_INDEX", "events")
@@ -38,6 +42,13 @@ class EventIndexer:
 
         # Same model as before, just stored on the instance
         self.model = SentenceTransformer(self.model_name)
+        self.embedding_cache = EmbeddingCache(
+            self.model_name, dim=self.model.get_sentence_embedding_dimension()
+        )
+        # Bumped after every bulk write so the API drops search results cached before it
+        self.index_generation = IndexGeneration()
+        # {duplicate event_id: canonical event_id} from dedupe_events.py; duplicates stay out of the index
+        self.duplicates = load_duplicates()
 
     def get_conn(self):
         return psycopg2.connect(**self.db_config)
@@ -92,9 +103,10 @@ class EventIndexer:
         if j.get("errors"):
             first_err = next(
                 (
-                    it.get("index", {}).get("error")
+                    result["error"]
                     for it in j.get("items", [])
-                    if it.get("index", {}).get("error")
+                    for result in it.values()
+                    if result.get("error")
                 ),
                 None,
             )
@@ -110,11 +122,13 @@ class EventIndexer:
             f"{r['title']}. tags: {', '.join(r['tags'])}"
             for r in rows
         ]
-        vecs = self.model.encode(
+        vecs = self.embedding_cache.encode(
+            self.model,
             texts,
             batch_size=self.enc_batch,
-            normalize_embeddings=True,
         ).tolist()
+        # Lets the API look up event vectors by id (user profile vectors live in this space)
+        self.embedding_cache.label_many("events", [r["id"] for r in rows], texts)
 
         actions = []
         for r, v in zip(rows, vecs):
@@ -131,6 +145,7 @@ class EventIndexer:
             ]
 
         self.bulk_post(actions)
+        self.index_generation.bump()
 
     def run(self):
         """
@@ -138,14 +153,33 @@ class EventIndexer:
         """
         buffer = []
         for row in self.fetch_rows():
+            if int(row["id"]) in self.duplicates:
+                continue
             buffer.append(row)
             if len(buffer) >= self.batch_db:
                 self.flush(buffer)
                 buffer = []
         if buffer:
             self.flush(buffer)
+        self.delete_duplicates()
         print("✅ Indexed all events to Elasticsearch.")
 
+    def delete_duplicates(self):
+        """
+        Removes duplicates indexed before they were detected (deleting an id
+        that is not in the index is a no-op).
+        """
+        if not self.duplicates:
+            return
+        ids = sorted(self.duplicates)
+        for start in range(0, len(ids), self.batch_db):
+            self.bulk_post([
+                {"delete": {"_index": self.index, "_id": str(event_id)}}
+                for event_id in ids[start:start + self.batch_db]
+            ])
+        self.index_generation.bump()
+        print(f"🧬 Removed {len(ids)} duplicate events from the index.")
+
 
 def main():
     indexer = EventIndexer(
@@ -0,0 +1,333 @@
+"""
+Bulk loader for scraped event files (CSV, JSON array or JSON lines) into public."Event".
+
+    python load_events.py ../backend/lib/events.csv
+    python load_events.py ../backend/lib/events_devpost.json --key title,start_date
+    python load_events.py events.csv --dry-run            # normalize and print, no database
+
+The file is read in chunks and each chunk is normalized (column names,
+dates, tags, prices, URLs), COPYed into a temporary staging table and
+upserted into "Event" by the --key columns (default: url). Existing events
+are only updated when a column actually changed. The whole load is one
+transaction, and client memory stays at one chunk whatever the file size.
+
+Run ingest.py afterwards to index the new events for search.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import pandas as pd
+import psycopg2
+
+from services.recommender import TAG_CLUSTER_MAP
+
+DB = dict(
+    host=os.getenv("PGHOST", "localhost"),
+    dbname=os.getenv("PGDATABASE", "eventdb"),
+    user=os.getenv("PGUSER", "postgres"),
+    password=os.getenv("PGPASSWORD", "postgres"),
+)
+
+EVENT_COLUMNS = ["title", "image", "start_date", "end_date", "location", "tags", "price", "url"]
+# Scraper column names (after snake-casing) -> Event columns
+COLUMN_ALIASES = {
+    "register_link": "url",
+    "registration_link": "url",
+    "link": "url",
+    "external_url": "url",
+    "source_url": "url",
+    "image_url": "image",
+    "thumbnail": "image",
+    "start": "start_date",
+    "end": "end_date",
+    "venue": "location",
+}
+# Canonical spelling of known tags ('ai' / 'AI' -> 'Ai'), so they match the recommender's clusters
+CANONICAL_TAGS = {tag.casefold(): tag for tag in TAG_CLUSTER_MAP}
+CHUNK_SIZE = 5000
+
+
+# --- Reading ---
+
+def iter_json_records(path: str, bufsize: int = 1 << 16) -> Iterator[dict]:
+    """Objects of a top-level JSON array (decoded incrementally) or of a JSON-lines file."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf = f.read(bufsize)
+        pos = len(buf) - len(buf.lstrip())
+        if not buf[pos:pos + 1] == "[":
+            # JSON lines
+            f.seek(0)
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        pos += 1
+        eof = False
+        while True:
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] == ","):
+                pos += 1
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            try:
+                if pos >= len(buf):
+                    raise ValueError("need more input")
+                record, pos = decoder.raw_decode(buf, pos)
+                yield record
+            except ValueError:
+                if eof:
+                    raise ValueError(f"{path}: truncated or malformed JSON array")
+                more = f.read(bufsize)
+                eof = not more
+                buf, pos = buf[pos:] + more, 0
+
+
+def read_chunks(path: str, fmt: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """The file as DataFrames of at most chunk_size rows, every value a string."""
+    if fmt == "csv":
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False)
+        return
+    chunk: List[dict] = []
+    for record in iter_json_records(path):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield pd.DataFrame(chunk)
+            chunk = []
+    if chunk:
+        yield pd.DataFrame(chunk)
+
+
+# --- Normalization ---
+
+def snake_case(name: str) -> str:
+    """'Register Link' -> 'register_link'."""
+    return re.sub(r"[^0-9a-z]+", "_", str(name).strip().lower()).strip("_")
+
+
+def _blank(value) -> bool:
+    return value is None or (isinstance(value, float) and pd.isna(value)) or str(value).strip() == ""
+
+
+def split_date_range(value) -> tuple:
+    """'Jul 14 - Aug 25, 2025' -> ('Jul 14 2025', 'Aug 25, 2025'); a single date has no end."""
+    if _blank(value):
+        return None, None
+    parts = [p.strip() for p in re.split(r"\s+[-–]\s+", str(value), maxsplit=1)]
+    if len(parts) == 1:
+        return parts[0], None
+    start, end = parts
+    year = re.search(r"\b\d{4}\b", end)
+    if year and not re.search(r"\b\d{4}\b", start):
+        start = f"{start} {year.group(0)}"
+    month = re.match(r"[A-Za-z]+", start)
+    if month and not re.search(r"[A-Za-z]", end):
+        # 'Aug 1 - 5, 2025'
+        end = f"{month.group(0)} {end}"
+    return start, end
+
+
+def normalize_dates(values: pd.Series) -> pd.Series:
+    """Any parseable date -> 'YYYY-MM-DD'; blanks and text like 'Postponed' -> None."""
+    stamps = pd.to_datetime(values.replace("", None), errors="coerce", dayfirst=True, format="mixed", utc=True)
+    text = stamps.dt.strftime("%Y-%m-%d").astype(object)
+    text[stamps.isna()] = None
+    return text
+
+
+def normalize_tags(value) -> str:
+    """Tags (list, '{a, b}' or 'a, b') as a Postgres array literal of canonical, de-duplicated tags."""
+    if isinstance(value, (list, tuple)):
+        items = [str(t) for t in value]
+    elif _blank(value):
+        items = []
+    else:
+        text = str(value).strip()
+        if text.startswith("[") and text.endswith("]"):
+            try:
+                items = [str(t) for t in json.loads(text)]
+            except ValueError:
+                items = text[1:-1].split(",")
+        else:
+            items = text.strip("{}").split(",")
+
+    tags, seen = [], set()
+    for item in items:
+        tag = re.sub(r'["{}\\]', "", item).strip()
+        if not tag:
+            continue
+        tag = CANONICAL_TAGS.get(tag.casefold(), tag)
+        if tag.casefold() not in seen:
+            seen.add(tag.casefold())
+            tags.append(tag)
+    return "{" + ",".join(tags) + "}"
+
+
+def normalize_price(value) -> Optional[str]:
+    """Same rule as the backend's createEvent: 'Free' -> 0, a number -> that number, else NULL."""
+    if _blank(value):
+        return None
+    text = str(value).strip()
+    if text.casefold() == "free":
+        return "0"
+    number = re.search(r"\d[\d,]*(?:\.\d+)?", text)
+    return number.group(0).replace(",", "") if number else None
+
+
+def normalize_url(value) -> Optional[str]:
+    if _blank(value):
+        return None
+    text = str(value).strip()
+    return f"https:{text}" if text.startswith("//") else text
+
+
+def normalize_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """A scraped chunk as Event columns, ready for COPY (None = NULL). Rows without a title are dropped."""
+    df = df.rename(columns=lambda c: COLUMN_ALIASES.get(snake_case(c), snake_case(c)))
+    df = df.loc[:, ~df.columns.duplicated()]
+    if "date" in df.columns and "start_date" not in df.columns:
+        ranges = df["date"].map(split_date_range)
+        df["start_date"] = ranges.map(lambda r: r[0])
+        df["end_date"] = ranges.map(lambda r: r[1])
+    for col in EVENT_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+
+    out = pd.DataFrame(index=df.index)
+    out["title"] = df["title"].map(lambda v: None if _blank(v) else " ".join(str(v).split()))
+    out["image"] = df["image"].map(normalize_url)
+    out["start_date"] = normalize_dates(df["start_date"].astype(object))
+    out["end_date"] = normalize_dates(df["end_date"].astype(object))
+    out["location"] = df["location"].map(lambda v: None if _blank(v) else str(v).strip())
+    out["tags"] = df["tags"].map(normalize_tags)
+    out["price"] = df["price"].map(normalize_price)
+    out["url"] = df["url"].map(normalize_url)
+    return out[out["title"].notna()][EVENT_COLUMNS]
+
+
+# --- Loading ---
+
+class EventBulkLoader:
+    """
+    COPY chunks into a temporary staging table shaped like public."Event",
+    then upsert them by the key columns: changed events are updated, new ones
+    inserted. Within the file, the last row for a key wins.
+    """
+
+    STAGING = "event_staging"
+
+    def __init__(self, db_config: Dict, key: Sequence[str] = ("url",)) -> None:
+        unknown = [k for k in key if k not in EVENT_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown key column(s): {unknown}")
+        self.db_config = db_config
+        self.key = list(key)
+        self.counts = {"rows": 0, "skipped_no_key": 0, "inserted": 0, "updated": 0}
+
+    def get_connection(self):
+        return psycopg2.connect(**self.db_config)
+
+    def _create_staging(self, cur) -> None:
+        # LIKE copies Event's column types, so COPY parses values exactly as an INSERT would
+        cur.execute(f'CREATE TEMP TABLE {self.STAGING} (LIKE public."Event") ON COMMIT DROP')
+        cur.execute(f"ALTER TABLE {self.STAGING} DROP COLUMN IF EXISTS event_id, ADD COLUMN _line bigint")
+
+    def _copy(self, cur, chunk: pd.DataFrame, first_line: int) -> None:
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for line, row in enumerate(chunk.itertuples(index=False, name=None), start=first_line):
+            # An unquoted empty field is NULL in COPY's csv format
+            writer.writerow(["" if _blank(v) else v for v in row] + [line])
+        buf.seek(0)
+        columns = ", ".join(EVENT_COLUMNS + ["_line"])
+        cur.copy_expert(f"COPY {self.STAGING} ({columns}) FROM STDIN WITH (FORMAT csv)", buf)
+
+    def _upsert(self, cur) -> None:
+        key_list = ", ".join(self.key)
+        key_match = " AND ".join(f"e.{k} = s.{k}" for k in self.key)
+        values = [c for c in EVENT_COLUMNS if c not in self.key]
+        latest = (
+            f"SELECT DISTINCT ON ({key_list}) * FROM {self.STAGING} "
+            f"ORDER BY {key_list}, _line DESC"
+        )
+
+        cur.execute(
+            f'UPDATE public."Event" e SET {", ".join(f"{c} = s.{c}" for c in values)} '
+            f"FROM ({latest}) s WHERE {key_match} "
+            f"AND ({', '.join(f'e.{c}' for c in values)}) IS DISTINCT FROM ({', '.join(f's.{c}' for c in values)})"
+        )
+        self.counts["updated"] += cur.rowcount
+        columns = ", ".join(EVENT_COLUMNS)
+        cur.execute(
+            f'INSERT INTO public."Event" ({columns}) '
+            f"SELECT {columns} FROM ({latest}) s "
+            f'WHERE NOT EXISTS (SELECT 1 FROM public."Event" e WHERE {key_match})'
+        )
+        self.counts["inserted"] += cur.rowcount
+        cur.execute(f"TRUNCATE {self.STAGING}")
+
+    def load(self, chunks: Iterable[pd.DataFrame]) -> Dict[str, int]:
+        line = 0
+        with self.get_connection() as conn, conn.cursor() as cur:
+            self._create_staging(cur)
+            for chunk in chunks:
+                has_key = chunk[self.key].notna().all(axis=1)
+                self.counts["skipped_no_key"] += int((~has_key).sum())
+                chunk = chunk[has_key]
+                if chunk.empty:
+                    continue
+                self._copy(cur, chunk, line)
+                line += len(chunk)
+                self._upsert(cur)
+                self.counts["rows"] += len(chunk)
+                print(f"📥 {self.counts['rows']} rows loaded ({self.counts['inserted']} new, {self.counts['updated']} updated)")
+        return self.counts
+
+
+def detect_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".json", ".jsonl", ".ndjson"):
+        return "json"
+    raise ValueError(f"Cannot tell the format of {path}; pass --format csv|json")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load a scraped CSV/JSON event file into public.\"Event\"")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "json"], help="Default: from the file extension")
+    parser.add_argument("--key", default="url", help="Comma-separated columns identifying an event (default: url)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="Normalize and print the rows without loading them")
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.path)
+    chunks = (normalize_chunk(chunk) for chunk in read_chunks(args.path, fmt, args.chunk_size))
+
+    if args.dry_run:
+        total = 0
+        for chunk in chunks:
+            if total == 0:
+                print(chunk.head(10).to_string())
+            total += len(chunk)
+        print(f"✅ {total} events normalized (dry run, nothing loaded)")
+        return 0
+
+    loader = EventBulkLoader(DB, key=[k.strip() for k in args.key.split(",") if k.strip()])
+    counts = loader.load(chunks)
+    print(
+        f"✅ Loaded {counts['rows']} events: {counts['inserted']} new, {counts['updated']} updated, "
+        f"{counts['rows'] - counts['inserted'] - counts['updated']} unchanged, "
+        f"{counts['skipped_no_key']} skipped without {args.key}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,99 @@
+"""
+Preload-and-fork launcher for the recommender API.
+
+    python serve.py --workers 4 --port 8001
+    python serve.py --workers 4 --no-preload     # every worker loads its own state
+
+With preload (default) the master imports app.py, memory-maps the similarity
+model and event vectors, builds the event catalog and loads the
+SentenceTransformer *before* forking, so all workers share those pages
+copy-on-write instead of each holding a copy. gc.freeze() keeps the
+collector from touching (and so un-sharing) the preloaded objects. The master
+prints a per-worker RSS/PSS report once workers are up and again on SIGUSR1;
+admins can also read it from /debug/workers.
+"""
+import argparse
+import gc
+import os
+import signal
+import sys
+
+import uvicorn  # type: ignore
+
+from services.worker_memory import print_worker_report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Serve app.py with preloaded shared state")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8001")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "2")))
+    parser.add_argument("--no-preload", dest="preload", action="store_false")
+    parser.add_argument("--report-after", type=int, default=15, help="Seconds before the first memory report (0 = off)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    os.environ["SERVE_MASTER_PID"] = str(os.getpid())
+
+    if args.preload:
+        from app import app
+        import api.events_api as events_api
+
+        print("📦 Preloading model, event catalog, event vectors and embedding model in the master")
+        events_api.preload()
+        gc.collect()
+        gc.freeze()
+    else:
+        app = "app:app"
+
+    config = uvicorn.Config(app, host=args.host, port=args.port, log_level=args.log_level)
+    sock = config.bind_socket()
+
+    children = set()
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGUSR1, signal.SIGALRM):
+                signal.signal(sig, signal.SIG_DFL)
+            uvicorn.Server(config).run(sockets=[sock])
+            os._exit(0)
+        children.add(pid)
+
+    def stop(signum, _frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGUSR1, lambda *_: print_worker_report(os.getpid()))
+    signal.signal(signal.SIGALRM, lambda *_: print_worker_report(os.getpid()))
+
+    for _ in range(args.workers):
+        spawn()
+    print(f"🚀 Master {os.getpid()} serving on {args.host}:{args.port} with {args.workers} workers")
+    if args.report_after:
+        signal.alarm(args.report_after)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            print(f"⚠️ Worker {pid} exited with status {status}, restarting")
+            spawn()
+
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
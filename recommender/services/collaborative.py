@@ -0,0 +1,265 @@
+import math
+import threading
+from collections import defaultdict
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+from scipy import sparse  # type: ignore
+
+from services.recommender import INTERACTION_WEIGHTS, InteractionWatermark
+
+
+class ItemCooccurrenceModel:
+    """
+    Item-item collaborative filtering from public."User_Event".
+
+    X is the sparse user×event matrix of summed interaction weights
+    (view=1, tag_click=2, register=5). Co-occurrence C = XᵀX is computed in
+    blocks of `block_size` items and pruned to the `top_n` strongest neighbours
+    per item, stored CSR-style (indptr / idx / val). New interactions are
+    folded in incrementally through an overlay that is merged back into the
+    pruned arrays once it grows past `compact_threshold` entries.
+
+    The overlay holds the exact current C[i, j] of every pair an update
+    touched, not a delta: a neighbour pruned from the arrays has no stored
+    count to add to, so its C[i, j] is computed from the item's users
+    (item_users) the first time it changes. Untouched pairs keep their
+    values and co-occurrences only grow, so compact() keeps the same top_n
+    neighbours a refit would (up to ties).
+
+    Similarity is cosine: C[i, j] / sqrt(C[i, i] * C[j, j]).
+
+    Requests sync and score concurrently, so reading the watermark, folding
+    rows in and scoring all hold one (re-entrant) lock.
+    """
+
+    def __init__(
+        self,
+        weights: Dict[str, float] = None,
+        top_n: int = 50,
+        block_size: int = 2048,
+        compact_threshold: int = 200_000,
+    ) -> None:
+        self.weights = dict(weights or INTERACTION_WEIGHTS)
+        self.top_n = top_n
+        self.block_size = block_size
+        self.compact_threshold = compact_threshold
+
+        self.event_ids: List[int] = []
+        self.event_index: Dict[int, int] = {}
+        self.user_items: Dict[int, Dict[int, float]] = {}
+        self.item_users: List[Dict[int, float]] = []
+        self.norm_sq = np.zeros(0, dtype=np.float64)
+
+        self.nbr_indptr = np.zeros(1, dtype=np.int64)
+        self.nbr_idx = np.zeros(0, dtype=np.int32)
+        self.nbr_val = np.zeros(0, dtype=np.float32)
+        self._overlay: Dict[int, Dict[int, float]] = defaultdict(dict)
+        self._overlay_size = 0
+
+        self.fitted = False
+        self.watermark = InteractionWatermark()
+        self._lock = threading.RLock()
+
+    # --- Input normalization ---
+
+    def _weighted_rows(self, interactions_df: pd.DataFrame) -> pd.DataFrame:
+        """(user_id, event_id, weight) rows for interactions that name an event."""
+        if interactions_df.empty:
+            return pd.DataFrame(columns=["user_id", "event_id", "weight"])
+        df = interactions_df[["user_id", "event_id", "interaction_type"]].dropna(subset=["user_id", "event_id"])
+        df = df[df["interaction_type"].isin(list(self.weights))]
+        return pd.DataFrame({
+            "user_id": df["user_id"].astype(int).to_numpy(),
+            "event_id": df["event_id"].astype(int).to_numpy(),
+            "weight": df["interaction_type"].map(self.weights).astype(float).to_numpy(),
+        })
+
+    def _item(self, event_id: int) -> int:
+        idx = self.event_index.get(event_id)
+        if idx is None:
+            idx = len(self.event_ids)
+            self.event_ids.append(event_id)
+            self.event_index[event_id] = idx
+            self.item_users.append({})
+            self.norm_sq = np.append(self.norm_sq, 0.0)
+            self.nbr_indptr = np.append(self.nbr_indptr, self.nbr_indptr[-1])
+        return idx
+
+    # --- Full build ---
+
+    def fit(self, interactions_df: pd.DataFrame) -> "ItemCooccurrenceModel":
+        with self._lock:
+            self.watermark.reset()
+            self.watermark.new_rows(interactions_df)
+            rows = self._weighted_rows(interactions_df)
+
+            self.event_ids = sorted(set(rows["event_id"].tolist()))
+            self.event_index = {eid: i for i, eid in enumerate(self.event_ids)}
+            user_ids = sorted(set(rows["user_id"].tolist()))
+            user_index = {uid: i for i, uid in enumerate(user_ids)}
+            n_users, n_items = len(user_ids), len(self.event_ids)
+
+            x = sparse.csr_matrix(
+                (
+                    rows["weight"].to_numpy(dtype=np.float64),
+                    (rows["user_id"].map(user_index).to_numpy(), rows["event_id"].map(self.event_index).to_numpy()),
+                ),
+                shape=(n_users, n_items),
+            )
+            x.sum_duplicates()
+
+            self.user_items = {}
+            for uid, u in user_index.items():
+                start, end = x.indptr[u], x.indptr[u + 1]
+                self.user_items[uid] = dict(zip(x.indices[start:end].tolist(), x.data[start:end].tolist()))
+            xc = x.tocsc()
+            self.item_users = []
+            for i in range(n_items):
+                start, end = xc.indptr[i], xc.indptr[i + 1]
+                self.item_users.append(
+                    {user_ids[u]: w for u, w in zip(xc.indices[start:end].tolist(), xc.data[start:end].tolist())}
+                )
+
+            self.norm_sq = np.asarray(x.multiply(x).sum(axis=0), dtype=np.float64).ravel()
+
+            xt = x.T.tocsr()
+            indptr = [0]
+            idx_parts, val_parts = [], []
+            for start in range(0, n_items, self.block_size):
+                block = (xt[start:start + self.block_size] @ x).tocsr()
+                for r in range(block.shape[0]):
+                    cols = block.indices[block.indptr[r]:block.indptr[r + 1]]
+                    vals = block.data[block.indptr[r]:block.indptr[r + 1]]
+                    keep = cols != start + r
+                    cols, vals = self._prune(cols[keep], vals[keep])
+                    idx_parts.append(cols.astype(np.int32))
+                    val_parts.append(vals.astype(np.float32))
+                    indptr.append(indptr[-1] + len(cols))
+
+            self.nbr_indptr = np.asarray(indptr, dtype=np.int64)
+            self.nbr_idx = np.concatenate(idx_parts) if idx_parts else np.zeros(0, dtype=np.int32)
+            self.nbr_val = np.concatenate(val_parts) if val_parts else np.zeros(0, dtype=np.float32)
+            self._overlay = defaultdict(dict)
+            self._overlay_size = 0
+            self.fitted = True
+
+            print(f"✅ Co-occurrence model: {n_users} users, {n_items} events, {len(self.nbr_idx)} neighbour links")
+            return self
+
+    def _prune(self, cols: np.ndarray, vals: np.ndarray):
+        if len(cols) <= self.top_n:
+            order = np.argsort(-vals)
+        else:
+            part = np.argpartition(-vals, self.top_n - 1)[: self.top_n]
+            order = part[np.argsort(-vals[part])]
+        return cols[order], vals[order]
+
+    # --- Incremental updates ---
+
+    def update(self, interactions_df: pd.DataFrame) -> int:
+        """Fold new interaction rows into the model; returns how many were applied."""
+        with self._lock:
+            rows = self._weighted_rows(interactions_df)
+            for uid, eid, w in rows.itertuples(index=False):
+                self._add(int(uid), int(eid), float(w))
+            if self._overlay_size > self.compact_threshold:
+                self.compact()
+            return len(rows)
+
+    def _cooccurrence(self, i: int, j: int) -> float:
+        """Exact C[i, j] from the smaller of the two items' user lists."""
+        a, b = self.item_users[i], self.item_users[j]
+        if len(a) > len(b):
+            a, b = b, a
+        return sum(w * b[u] for u, w in a.items() if u in b)
+
+    def _add(self, user_id: int, event_id: int, delta: float) -> None:
+        i = self._item(event_id)
+        hist = self.user_items.setdefault(user_id, {})
+        old = hist.get(i, 0.0)
+
+        # C = XᵀX, so bumping X[u, i] by delta adds delta·X[u, j] to C[i, j] and C[j, i]
+        for j, wj in hist.items():
+            if j == i:
+                continue
+            inc = delta * wj
+            base = None
+            for a, b in ((i, j), (j, i)):
+                row = self._overlay[a]
+                if b not in row:
+                    if base is None:
+                        base = self._cooccurrence(i, j)  # before this update
+                    row[b] = base
+                    self._overlay_size += 1
+                row[b] += inc
+
+        self.norm_sq[i] += (old + delta) ** 2 - old ** 2
+        hist[i] = old + delta
+        self.item_users[i][user_id] = old + delta
+
+    def compact(self) -> None:
+        """Merge the overlay into the pruned neighbour arrays."""
+        with self._lock:
+            indptr = [0]
+            idx_parts, val_parts = [], []
+            for i in range(len(self.event_ids)):
+                merged = self._neighbours(i)
+                cols = np.fromiter(merged.keys(), dtype=np.int64, count=len(merged))
+                vals = np.fromiter(merged.values(), dtype=np.float64, count=len(merged))
+                cols, vals = self._prune(cols, vals)
+                idx_parts.append(cols.astype(np.int32))
+                val_parts.append(vals.astype(np.float32))
+                indptr.append(indptr[-1] + len(cols))
+            self.nbr_indptr = np.asarray(indptr, dtype=np.int64)
+            self.nbr_idx = np.concatenate(idx_parts) if idx_parts else np.zeros(0, dtype=np.int32)
+            self.nbr_val = np.concatenate(val_parts) if val_parts else np.zeros(0, dtype=np.float32)
+            self._overlay = defaultdict(dict)
+            self._overlay_size = 0
+
+    def sync(self, interactions_df: pd.DataFrame) -> None:
+        """Fit on first use, then only apply rows past the watermark."""
+        with self._lock:
+            if not self.fitted:
+                self.fit(interactions_df)
+                return
+            new_rows = self.watermark.new_rows(interactions_df)
+            if len(new_rows):
+                applied = self.update(new_rows)
+                print(f"🔁 Co-occurrence model updated with {applied} new interactions")
+
+    # --- Scoring ---
+
+    def _neighbours(self, i: int) -> Dict[int, float]:
+        start, end = self.nbr_indptr[i], self.nbr_indptr[i + 1]
+        merged = dict(zip(self.nbr_idx[start:end].tolist(), self.nbr_val[start:end].tolist()))
+        merged.update(self._overlay.get(i, {}))
+        return merged
+
+    def score_user(self, user_id: int) -> Dict[int, float]:
+        """
+        {event_id: score in [0, 1]} from the user's interacted events'
+        neighbours, excluding events the user already interacted with.
+        """
+        with self._lock:
+            hist = self.user_items.get(user_id)
+            if not hist:
+                return {}
+
+            scores: Dict[int, float] = defaultdict(float)
+            for i, w in hist.items():
+                ni = self.norm_sq[i]
+                if ni <= 0:
+                    continue
+                for j, c in self._neighbours(i).items():
+                    if j in hist:
+                        continue
+                    nj = self.norm_sq[j]
+                    if nj > 0:
+                        scores[j] += w * c / math.sqrt(ni * nj)
+
+            if not scores:
+                return {}
+            top = max(scores.values()) or 1.0
+            return {self.event_ids[j]: s / top for j, s in scores.items()}
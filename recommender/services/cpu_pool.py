@@ -0,0 +1,187 @@
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from difflib import SequenceMatcher
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+# Stages that can be offloaded; CpuPool(stages=...) picks which are
+STAGE_SCORE = "score"    # similarity aggregation over the memory-mapped model
+STAGE_FILTER = "filter"  # fuzzy query filter over ranked events
+STAGE_ENCODE = "encode"  # SentenceTransformer encoding
+STAGES = (STAGE_SCORE, STAGE_FILTER, STAGE_ENCODE)
+
+
+# ---------- Worker-side state and tasks ----------
+#
+# These run in the pool's processes (or inline when the pool is off). Each
+# worker keeps what it loaded for the life of the process: embedding models
+# by name, and the last few similarity matrices by file, memory-mapped so the
+# pages are the same page-cache pages the API workers map.
+
+_embedders = {}
+_matrices: "OrderedDict[str, np.ndarray]" = OrderedDict()
+_MATRICES_KEPT = 2
+
+
+def _init_worker(embed_model: Optional[str]) -> None:
+    if embed_model:
+        _embedder(embed_model)
+
+
+def _embedder(model_name: str):
+    model = _embedders.get(model_name)
+    if model is None:
+        from sentence_transformers import SentenceTransformer  # type: ignore
+        model = _embedders[model_name] = SentenceTransformer(model_name)
+    return model
+
+
+def _matrix(path: str) -> np.ndarray:
+    matrix = _matrices.get(path)
+    if matrix is None:
+        matrix = _matrices[path] = np.load(path, mmap_mode="r")
+        while len(_matrices) > _MATRICES_KEPT:
+            _matrices.popitem(last=False)
+    _matrices.move_to_end(path)
+    return matrix
+
+
+def similarity(a: str, b: str) -> float:
+    return SequenceMatcher(None, (a or "").lower(), (b or "").lower()).ratio()
+
+
+def query_match_scores(query: str, candidates: Sequence[Tuple[str, str, Sequence[str]]]) -> List[float]:
+    """
+    Fuzzy match of `query` against each (title, location, tags): the best
+    SequenceMatcher ratio of the three, plus 0.2 when one of them contains
+    the query verbatim.
+    """
+    q = query.lower()
+    scores = []
+    for title, location, tags in candidates:
+        title = str(title or "").lower()
+        location = str(location or "").lower()
+        tags = [str(t).lower() for t in tags or ()]
+        score = max(
+            similarity(title, q),
+            similarity(location, q),
+            max((similarity(t, q) for t in tags), default=0.0),
+        )
+        if q in title or q in location or any(q in t for t in tags):
+            score += 0.2
+        scores.append(score)
+    return scores
+
+
+def encode_texts(model_name: str, texts: List[str], batch_size: int = 32) -> np.ndarray:
+    """Normalized embeddings of `texts` (float32, one row per text)."""
+    vectors = _embedder(model_name).encode(texts, batch_size=batch_size, normalize_embeddings=True)
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def weighted_similarity(matrix_path: str, rows: Sequence[int], weights: Sequence[float]) -> np.ndarray:
+    """Weighted average of the given rows of the similarity matrix stored at `matrix_path`."""
+    return np.average(_matrix(matrix_path)[list(rows)], axis=0, weights=weights)
+
+
+# ---------- Pool ----------
+
+class CpuPool:
+    """
+    Process pool for GIL-bound stages of a request (fuzzy filtering,
+    embedding, large similarity aggregations), so they run in parallel
+    across cores instead of taking turns on one interpreter.
+
+    The pool is created on first use in the process that uses it: serve.py
+    forks the API workers after preload, and a pool created before the fork
+    would not work in the children. Processes come from a forkserver (no
+    locks or threads inherited from the API process) and are initialized with
+    the embedding model when encoding is offloaded. With workers=0, or for a
+    stage not in `stages`, run() calls the task inline; if the pool breaks
+    (a worker was killed), the call is retried inline and the pool is
+    recreated on the next use.
+    """
+
+    def __init__(
+        self,
+        workers: int = 0,
+        stages: Iterable[str] = STAGES,
+        embed_model: Optional[str] = None,
+        min_score_cells: int = 5_000_000,
+    ) -> None:
+        self.workers = max(0, int(workers))
+        self.stages = frozenset(stages) if self.workers else frozenset()
+        unknown = self.stages - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown CPU pool stages {sorted(unknown)}; expected some of {STAGES}")
+        self.embed_model = embed_model if STAGE_ENCODE in self.stages else None
+        # Smaller aggregations are cheaper inline than the round trip of their result
+        self.min_score_cells = min_score_cells
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.inline = 0
+
+    def offloads(self, stage: str) -> bool:
+        return stage in self.stages
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    methods = multiprocessing.get_all_start_methods()
+                    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=context,
+                        initializer=_init_worker,
+                        initargs=(self.embed_model,),
+                    )
+                    self._pid = os.getpid()
+                    print(f"🧵 Started CPU pool: {self.workers} processes for {', '.join(sorted(self.stages))}")
+        return self._executor
+
+    def run(self, stage: str, fn: Callable[..., T], *args) -> T:
+        """fn(*args) in a pool process if `stage` is offloaded, else inline."""
+        if stage not in self.stages:
+            self.inline += 1
+            return fn(*args)
+        try:
+            self.submitted += 1
+            return self._pool().submit(fn, *args).result()
+        except BrokenProcessPool as e:
+            print(f"⚠️ CPU pool broke ({e}), running {stage} inline")
+            with self._lock:
+                self._executor = None
+            self.inline += 1
+            return fn(*args)
+
+    def warm_up(self) -> None:
+        """Start the processes (and load their models) now instead of on the first request."""
+        if self.stages:
+            pool = self._pool()
+            for future in [pool.submit(os.getpid) for _ in range(self.workers)]:
+                future.result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "stages": sorted(self.stages),
+            "started": self._executor is not None and self._pid == os.getpid(),
+            "submitted": self.submitted,
+            "inline": self.inline,
+        }
@@ -0,0 +1,217 @@
+import json
+import os
+import re
+import tempfile
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Sequence, Set
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DUPLICATES_PATH = os.getenv(
+    "EVENT_DUPLICATES_PATH", os.path.join(BASE_DIR, "models", "event_duplicates.json")
+)
+
+_WORD = re.compile(r"\w+")
+# Tokens that tell instances of a series apart ('Ep 7' / 'Ep 8', 'Talk Show IV' / 'Talk Show V')
+_ORDINAL = re.compile(r"^(\d+|i{1,3}|iv|vi{0,3}|ix|x{1,3})$")
+
+
+def event_shingles(title: str, tags: Iterable[str], k: int = 4) -> Set[str]:
+    """
+    Character k-grams of the normalized title plus one shingle per tag.
+    Character shingles keep short titles comparable when a scraper adds or
+    drops a word ('Hack for Impact 2025' / 'Hack For Impact 2025 | Kathmandu').
+    """
+    text = " ".join(_WORD.findall(str(title or "").casefold()))
+    shingles = {text[i:i + k] for i in range(max(len(text) - k + 1, 1))} if text else set()
+    shingles.update(f"#tag:{str(t).strip().casefold()}" for t in tags or () if str(t).strip())
+    return shingles
+
+
+def title_ordinals(title: str) -> frozenset:
+    """Numbers and roman numerals in a title ('QTalk Series 2025 E8' -> {'2025'})."""
+    return frozenset(w for w in _WORD.findall(str(title or "").casefold()) if _ORDINAL.match(w))
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """
+    MinHash signatures with multiply-shift hashing: shingles are hashed to
+    32 bits once (crc32, stable across runs), then h_i(x) = (a_i*x + b_i) >> 32
+    in wrapping uint64 arithmetic gives num_perm independent permutations.
+    """
+
+    def __init__(self, num_perm: int = 128, seed: int = 1) -> None:
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+    def signatures(self, shingle_sets: Sequence[Set[str]], block: int = 16) -> np.ndarray:
+        """(n_docs, num_perm) uint32 signatures; a document without shingles gets all-max."""
+        n = len(shingle_sets)
+        sizes = np.fromiter((len(s) for s in shingle_sets), dtype=np.int64, count=n)
+        values = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for shingles in shingle_sets for s in shingles),
+            dtype=np.uint64, count=int(sizes.sum()),
+        )
+        out = np.full((n, self.num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+        nonempty = np.flatnonzero(sizes)
+        if len(values) == 0:
+            return out
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))[nonempty]
+
+        # All documents at once, a block of permutations at a time to bound memory
+        for lo in range(0, self.num_perm, block):
+            a, b = self.a[lo:lo + block, None], self.b[lo:lo + block, None]
+            with np.errstate(over="ignore"):
+                hashed = ((a * values[None, :] + b) >> np.uint64(32)).astype(np.uint32)
+            out[nonempty, lo:lo + block] = np.minimum.reduceat(hashed, starts, axis=1).T
+        return out
+
+
+class LSHIndex:
+    """
+    Banded LSH over MinHash signatures: documents whose signatures agree on
+    every row of at least one band become candidate pairs. With b bands of r
+    rows, pairs of Jaccard s are found with probability 1 - (1 - s^r)^b, a
+    step around (1/b)^(1/r) (~0.71 for the default 16 x 8).
+    """
+
+    def __init__(self, bands: int = 16, rows: int = 8) -> None:
+        self.bands = bands
+        self.rows = rows
+
+    def candidate_pairs(self, signatures: np.ndarray, max_bucket: int = 500) -> Set[tuple]:
+        n, num_perm = signatures.shape
+        if self.bands * self.rows > num_perm:
+            raise ValueError(f"{self.bands} bands x {self.rows} rows needs {self.bands * self.rows} permutations, have {num_perm}")
+        pairs: Set[tuple] = set()
+        for band in range(self.bands):
+            cols = np.ascontiguousarray(signatures[:, band * self.rows:(band + 1) * self.rows])
+            keys = cols.view(np.dtype((np.void, cols.dtype.itemsize * self.rows))).ravel()
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            bounds = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1], True])
+            for lo, hi in zip(bounds[:-1], bounds[1:]):
+                # Oversized buckets are degenerate (e.g. empty documents); skip them
+                if 1 < hi - lo <= max_bucket:
+                    members = np.sort(order[lo:hi]).tolist()
+                    pairs.update((members[i], members[j]) for i in range(len(members)) for j in range(i + 1, len(members)))
+        return pairs
+
+
+class EventDeduplicator:
+    """
+    Finds near-duplicate events (same event scraped twice with slightly
+    different titles) and maps every duplicate to one canonical event id.
+
+    Candidates come from MinHash LSH, so the work grows roughly linearly with
+    the number of events instead of comparing all pairs. Each candidate pair
+    is confirmed by the exact Jaccard similarity of its shingles, by the
+    numbers in both titles agreeing (episodes of a series are distinct
+    events) and, when both have a start date, by those dates being close (a
+    yearly event is not a duplicate of last year's). Confirmed pairs are merged
+    transitively; the lowest event_id of a group is its canonical id, so the
+    mapping stays stable as new duplicates are scraped.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.7,
+        num_perm: int = 128,
+        bands: int = 16,
+        rows: int = 8,
+        max_date_gap_days: Optional[int] = 30,
+    ) -> None:
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm)
+        self.lsh = LSHIndex(bands, rows)
+        self.max_date_gap_days = max_date_gap_days
+
+    def find(self, events: pd.DataFrame) -> Dict[int, int]:
+        """{duplicate event_id: canonical event_id} for an event_id/title/tags[/start_date] frame."""
+        if events.empty:
+            return {}
+        ids = events["event_id"].astype(np.int64).to_numpy()
+        shingles = [event_shingles(t, tags) for t, tags in zip(events["title"], events["tags"])]
+        ordinals = [title_ordinals(t) for t in events["title"]]
+        starts = (
+            pd.to_datetime(events["start_date"], errors="coerce", utc=True).to_numpy()
+            if "start_date" in events.columns else None
+        )
+
+        signatures = self.hasher.signatures(shingles)
+        candidates = self.lsh.candidate_pairs(signatures)
+
+        parent = list(range(len(ids)))
+
+        def root(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        confirmed = 0
+        for i, j in candidates:
+            if not shingles[i] or jaccard(shingles[i], shingles[j]) < self.threshold:
+                continue
+            if ordinals[i] and ordinals[j] and ordinals[i] != ordinals[j]:
+                continue
+            if self.max_date_gap_days is not None and starts is not None:
+                a, b = starts[i], starts[j]
+                if not pd.isna(a) and not pd.isna(b) and abs(a - b) > np.timedelta64(self.max_date_gap_days, "D"):
+                    continue
+            confirmed += 1
+            ri, rj = root(i), root(j)
+            if ri != rj:
+                # Keep the lowest event_id as the root
+                if ids[ri] < ids[rj]:
+                    parent[rj] = ri
+                else:
+                    parent[ri] = rj
+
+        mapping = {int(ids[i]): int(ids[root(i)]) for i in range(len(ids)) if root(i) != i}
+        print(f"🧬 {len(candidates)} LSH candidate pairs, {confirmed} confirmed, {len(mapping)} duplicates of {len(ids)} events")
+        return mapping
+
+
+# --- Canonical-id mapping file ---
+
+def save_duplicates(mapping: Dict[int, int], path: str = DEFAULT_DUPLICATES_PATH, **meta) -> None:
+    """Write {"generated_at", ..., "canonical": {duplicate_id: canonical_id}} atomically."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    data = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        **meta,
+        "canonical": {str(k): int(v) for k, v in sorted(mapping.items())},
+    }
+    fd, tmp_path = tempfile.mkstemp(prefix=".event_duplicates.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_duplicates(path: str = DEFAULT_DUPLICATES_PATH) -> Dict[int, int]:
+    """{duplicate event_id: canonical event_id}; empty if dedupe_events.py has not been run."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {int(k): int(v) for k, v in data.get("canonical", {}).items()}
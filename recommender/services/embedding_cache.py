@@ -0,0 +1,326 @@
+import os
+import json
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl  # POSIX only; used to serialize writers across processes
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", os.path.join(BASE_DIR, "models", "embedding_cache"))
+# A metadata log is folded into its JSON snapshot once it is larger than the snapshot and this many bytes
+LOG_COMPACT_BYTES = 1 << 20
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _read_log(path: str, offset: int = 0) -> Tuple[List[Tuple[str, Any]], int]:
+    """
+    (key, value) entries of a JSON-lines log from byte `offset` on, and the
+    offset after the last complete line (a line still being written is left).
+    """
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except OSError:
+        return [], offset
+    end = data.rfind(b"\n") + 1
+    entries = []
+    for line in data[:end].splitlines():
+        try:
+            key, value = json.loads(line)
+        except ValueError:
+            continue  # torn by a crashed writer, or read across a compaction
+        entries.append((key, value))
+    return entries, offset + end
+
+
+def _append_log(path: str, entries: Sequence[Tuple[str, Any]]) -> int:
+    """Append entries as JSON lines (dropping a crashed writer's partial line first); returns the new size."""
+    with open(path, "a+b") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size:
+            f.seek(size - 1)
+            if f.read(1) != b"\n":
+                f.seek(0)
+                f.truncate(f.read().rfind(b"\n") + 1)
+        f.write("".join(json.dumps([k, v]) + "\n" for k, v in entries).encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+        return f.tell()
+
+
+def _write_json(path: str, data: Any) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class EmbeddingCache:
+    """
+    Content-addressed on-disk store of sentence embeddings.
+
+    Vectors are appended to a raw float32 file (`vectors.f32`) that is read back
+    through a read-only memory map; `index.json` maps
+    sha256(model name + canonical text) -> row in that file. Embeddings are
+    stored exactly as the model returned them (callers encode with
+    normalize_embeddings=True), so a hit can be used in place of model.encode().
+
+    New keys and labels are appended to a JSON-lines log next to their
+    snapshot (`index.log`, `labels-{namespace}.log`) and only folded into the
+    snapshot once the log outgrows it, so a batch costs O(batch) to record and
+    an ingest of N texts rewrites O(N) bytes of metadata in total.
+    """
+
+    VECTORS_FILE = "vectors.f32"
+    INDEX_FILE = "index.json"
+    INDEX_LOG_FILE = "index.log"
+    LOCK_FILE = ".lock"
+
+    def __init__(self, model_name: str, cache_dir: str = DEFAULT_CACHE_DIR, dim: Optional[int] = None) -> None:
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.dim = dim
+        self.vectors_path = os.path.join(cache_dir, self.VECTORS_FILE)
+        self.index_path = os.path.join(cache_dir, self.INDEX_FILE)
+        self.index_log_path = os.path.join(cache_dir, self.INDEX_LOG_FILE)
+        self.lock_path = os.path.join(cache_dir, self.LOCK_FILE)
+
+        self._keys: Dict[str, int] = {}
+        self._index_mtime: Optional[float] = None
+        self._log_offset = 0
+        self._mmap: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._reload_index()
+
+    # --- Keys ---
+
+    @staticmethod
+    def canonical_text(text: str) -> str:
+        """Collapse whitespace so cosmetic differences do not miss the cache."""
+        return " ".join((text or "").split())
+
+    def key(self, text: str) -> str:
+        payload = f"{self.model_name}\n{self.canonical_text(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    # --- Index / mmap bookkeeping ---
+
+    def _reload_index(self) -> None:
+        """Re-read index.json if another process rewrote it, then any keys appended to index.log since."""
+        try:
+            mtime = os.path.getmtime(self.index_path)
+        except OSError:
+            return
+        log_size = _file_size(self.index_log_path)
+        if mtime == self._index_mtime and log_size == self._log_offset:
+            return
+        if mtime != self._index_mtime or log_size < self._log_offset:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if self.dim is None:
+                self.dim = int(data["dim"])
+            elif int(data["dim"]) != self.dim:
+                raise ValueError(f"Embedding cache at {self.cache_dir} has dim {data['dim']}, expected {self.dim}")
+            self._keys = data.get("keys", {})
+            self._index_mtime = mtime
+            self._log_offset = 0
+            self._mmap = None
+        entries, self._log_offset = _read_log(self.index_log_path, self._log_offset)
+        self._keys.update(entries)
+
+    def _record_keys(self, entries: List[Tuple[str, int]]) -> None:
+        """Log new key -> row entries; rewrite index.json instead when the log has outgrown it (or it is missing)."""
+        self._keys.update(entries)
+        if os.path.exists(self.index_path):
+            self._log_offset = _append_log(self.index_log_path, entries)
+            if self._log_offset < max(LOG_COMPACT_BYTES, _file_size(self.index_path)):
+                return
+        _write_json(self.index_path, {"dim": self.dim, "keys": self._keys})
+        self._index_mtime = os.path.getmtime(self.index_path)
+        # A reader that saw the new index.json before this truncation re-reads the log from 0
+        with open(self.index_log_path, "wb"):
+            pass
+        self._log_offset = 0
+
+    def _row_bytes(self) -> int:
+        return 4 * int(self.dim)
+
+    def _rows_on_disk(self) -> int:
+        try:
+            return os.path.getsize(self.vectors_path) // self._row_bytes()
+        except OSError:
+            return 0
+
+    def _vectors(self) -> Optional[np.memmap]:
+        rows = self._rows_on_disk() if self.dim else 0
+        if rows == 0:
+            return None
+        if self._mmap is None or self._mmap.shape[0] < rows:
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+        return self._mmap
+
+    @contextmanager
+    def _write_lock(self):
+        with self._lock, open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    # --- Lookup / store ---
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def lookup(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Return the cached vector for each text, or None on a miss."""
+        self._reload_index()
+        vectors = self._vectors()
+        found: List[Optional[np.ndarray]] = []
+        for text in texts:
+            row = self._keys.get(self.key(text))
+            if row is None or vectors is None or row >= vectors.shape[0]:
+                found.append(None)
+            else:
+                found.append(np.array(vectors[row]))
+        hits = sum(v is not None for v in found)
+        self.hits += hits
+        self.misses += len(found) - hits
+        return found
+
+    def put_many(self, texts: Sequence[str], vectors: np.ndarray) -> None:
+        """Append vectors for texts that are not cached yet."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(texts) == 0:
+            return
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Vector dim {vectors.shape[1]} != cache dim {self.dim}")
+
+        with self._write_lock():
+            self._reload_index()
+            new_rows: List[np.ndarray] = []
+            new_keys: List[str] = []
+            seen = set()
+            for text, vec in zip(texts, vectors):
+                k = self.key(text)
+                if k in self._keys or k in seen:
+                    continue
+                seen.add(k)
+                new_keys.append(k)
+                new_rows.append(vec)
+            if not new_rows:
+                return
+
+            # Drop a partial trailing row left behind by a crashed writer.
+            start = self._rows_on_disk()
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(start * self._row_bytes())
+                f.write(np.vstack(new_rows).astype(np.float32).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._record_keys([(k, start + offset) for offset, k in enumerate(new_keys)])
+
+    # --- Labels (e.g. event_id -> cached vector) ---
+
+    def _labels_path(self, namespace: str) -> str:
+        return os.path.join(self.cache_dir, f"labels-{namespace}.json")
+
+    def _labels_log_path(self, namespace: str) -> str:
+        return os.path.join(self.cache_dir, f"labels-{namespace}.log")
+
+    def _read_labels(self, namespace: str) -> Dict[str, str]:
+        try:
+            with open(self._labels_path(namespace), "r", encoding="utf-8") as f:
+                current = json.load(f)
+        except (OSError, ValueError):
+            current = {}
+        current.update(_read_log(self._labels_log_path(namespace))[0])
+        return current
+
+    def label_many(self, namespace: str, labels: Sequence[Any], texts: Sequence[str]) -> None:
+        """Point each label at the cached vector for its text (texts must already be cached)."""
+        entries = [(str(label), self.key(text)) for label, text in zip(labels, texts)]
+        if not entries:
+            return
+        path, log_path = self._labels_path(namespace), self._labels_log_path(namespace)
+        with self._write_lock():
+            if _append_log(log_path, entries) < max(LOG_COMPACT_BYTES, _file_size(path)):
+                return
+            _write_json(path, self._read_labels(namespace))
+            with open(log_path, "wb"):
+                pass
+
+    def labels_mtime(self, namespace: str) -> Optional[float]:
+        """Last change to a namespace's labels (its snapshot or log), None if it has none."""
+        mtimes = []
+        for path in (self._labels_path(namespace), self._labels_log_path(namespace)):
+            try:
+                mtimes.append(os.path.getmtime(path))
+            except OSError:
+                pass
+        return max(mtimes) if mtimes else None
+
+    def labelled_rows(self, namespace: str) -> Tuple[List[str], np.ndarray, Optional[np.memmap]]:
+        """
+        (labels, rows, vectors): rows index into the shared read-only memmap, so
+        callers can use vectors[rows[i]] without copying the store into memory.
+        """
+        self._reload_index()
+        vectors = self._vectors()
+        labels, rows = [], []
+        for label, key in self._read_labels(namespace).items():
+            row = self._keys.get(key)
+            if row is not None and vectors is not None and row < vectors.shape[0]:
+                labels.append(label)
+                rows.append(row)
+        return labels, np.asarray(rows, dtype=np.int64), vectors
+
+    def encode(self, model, texts: Sequence[str], batch_size: int = 32) -> np.ndarray:
+        """
+        Drop-in for model.encode(texts, normalize_embeddings=True): cached texts
+        are served from disk and only misses go through the model.
+        """
+        texts = list(texts)
+        cached = self.lookup(texts)
+        missing = [i for i, vec in enumerate(cached) if vec is None]
+
+        if missing:
+            miss_texts = [texts[i] for i in missing]
+            fresh = np.asarray(
+                model.encode(miss_texts, batch_size=batch_size, normalize_embeddings=True),
+                dtype=np.float32,
+            )
+            self.put_many(miss_texts, fresh)
+            for i, vec in zip(missing, fresh):
+                cached[i] = vec
+
+        print(f"🧠 Embeddings: {len(texts) - len(missing)} cached, {len(missing)} encoded")
+        if not cached:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return np.vstack(cached)
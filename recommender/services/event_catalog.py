@@ -0,0 +1,237 @@
+import sys
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from services.event_dates import EventDateIndex
+
+# Event columns handed out as strings in recommendation records
+STRING_COLUMNS = ("title", "image", "location", "price", "url")
+# What a missing value becomes in a record (missing price = free, other strings = "")
+STRING_DEFAULTS = {"price": "Free"}
+
+
+def _intern(values: Iterable, default: str = "") -> np.ndarray:
+    """Object array of interned strings, so repeated values share one object; missing values become `default`."""
+    return np.array(
+        [sys.intern(v) if isinstance(v, str) else (default if v is None or pd.isna(v) else sys.intern(str(v)))
+         for v in values],
+        dtype=object,
+    )
+
+
+def _date_strings(stamps: np.ndarray) -> np.ndarray:
+    """datetime64 -> interned 'YYYY-MM-DD' strings (None for NaT)."""
+    days = stamps.astype("datetime64[D]")
+    text = np.datetime_as_string(days)
+    return np.array([None if np.isnat(d) else sys.intern(str(t)) for d, t in zip(days, text)], dtype=object)
+
+
+def _naive_datetimes(values) -> np.ndarray:
+    stamps = pd.to_datetime(pd.Series(values), errors="coerce")
+    if getattr(stamps.dt, "tz", None) is not None:
+        stamps = stamps.dt.tz_localize(None)
+    return stamps.to_numpy(dtype="datetime64[ns]")
+
+
+class EventCatalog:
+    """
+    Read-only, columnar view of public."Event" for the ranking paths.
+
+    Every column is a numpy array aligned by row: int64 ids, int32 cluster
+    codes, datetime64 dates and interned strings. Tags are kept as CSR (row
+    offsets into one int32 array of tag codes), so a user's tag score for the
+    whole catalog is a single bincount. Rows are only turned into dicts by
+    records(), for the handful of events a request actually returns.
+    """
+
+    def __init__(
+        self,
+        event_ids: Sequence[int],
+        clusters: Sequence[str],
+        start_dates,
+        end_dates,
+        tags: Sequence[Sequence[str]],
+        strings: Dict[str, Sequence],
+    ) -> None:
+        self.event_ids = np.asarray(event_ids, dtype=np.int64)
+        n = len(self.event_ids)
+
+        codes, names = pd.factorize(pd.Series(list(clusters), dtype=object).fillna("Other"))
+        self.cluster_codes = codes.astype(np.int32)
+        self.cluster_names: List[str] = [sys.intern(str(c)) for c in names]
+
+        self.start_dates = _naive_datetimes(start_dates)
+        self.end_dates = _naive_datetimes(end_dates)
+        self.start_date_strings = _date_strings(self.start_dates)
+        self.end_date_strings = _date_strings(self.end_dates)
+        self.strings = {
+            col: _intern(strings.get(col, [None] * n), STRING_DEFAULTS.get(col, "")) for col in STRING_COLUMNS
+        }
+
+        # Tags as CSR over a shared vocabulary
+        vocab: Dict[str, int] = {}
+        counts = np.zeros(n, dtype=np.int64)
+        flat: List[int] = []
+        for i, event_tags in enumerate(tags):
+            event_tags = event_tags if isinstance(event_tags, (list, tuple)) else []
+            counts[i] = len(event_tags)
+            flat.extend(vocab.setdefault(sys.intern(str(t)), len(vocab)) for t in event_tags)
+        self.tag_names: List[str] = list(vocab)
+        self.tag_index = vocab
+        self.tag_codes = np.asarray(flat, dtype=np.int32)
+        self.tag_indptr = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        self._tag_rows = np.repeat(np.arange(n, dtype=np.int64), counts)
+
+        # id -> row, both as a dict (single lookups) and sorted arrays (vectorized lookups)
+        self.id_to_row: Dict[int, int] = {int(eid): i for i, eid in enumerate(self.event_ids)}
+        self._sorted = np.argsort(self.event_ids, kind="stable")
+        self._sorted_ids = self.event_ids[self._sorted]
+
+        self.dates = EventDateIndex()
+        self.dates.update(self.event_ids, self.end_dates)
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "EventCatalog":
+        """Build from EventRepository.load_events() output (tags parsed, clusters assigned)."""
+        return cls(
+            event_ids=df["event_id"].to_numpy(),
+            clusters=df["cluster"].tolist(),
+            start_dates=df["start_date"],
+            end_dates=df["end_date"],
+            tags=df["tags"].tolist(),
+            strings={col: df[col].tolist() for col in STRING_COLUMNS if col in df.columns},
+        )
+
+    def patched(self, df: pd.DataFrame) -> "EventCatalog":
+        """
+        A new catalog with df's events (from_frame-shaped rows) replacing the
+        rows with the same event_id or appended after the others. Only the
+        changed events go through the per-row parsing; the rest is array
+        copies, so this catalog stays valid for requests already holding it.
+        """
+        delta = EventCatalog.from_frame(df.drop_duplicates(subset="event_id", keep="last"))
+        rows = self.rows_for(delta.event_ids)
+        added = rows < 0
+        n = len(self) + int(added.sum())
+        target = rows.copy()
+        target[added] = np.arange(len(self), n)
+
+        def patch(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+            out = np.concatenate([old, new[added]])
+            out[target] = new
+            return out
+
+        def merge_vocab(index: Dict[str, int], new_names: List[str]) -> np.ndarray:
+            """Codes of new_names in index, adding the names it does not have yet."""
+            return np.asarray([index.setdefault(name, len(index)) for name in new_names], dtype=np.int32)
+
+        out = EventCatalog.__new__(EventCatalog)
+        out.event_ids = patch(self.event_ids, delta.event_ids)
+
+        cluster_index = {name: i for i, name in enumerate(self.cluster_names)}
+        cluster_map = merge_vocab(cluster_index, delta.cluster_names)
+        out.cluster_names = list(cluster_index)
+        out.cluster_codes = patch(self.cluster_codes, cluster_map[delta.cluster_codes])
+
+        out.start_dates = patch(self.start_dates, delta.start_dates)
+        out.end_dates = patch(self.end_dates, delta.end_dates)
+        out.start_date_strings = patch(self.start_date_strings, delta.start_date_strings)
+        out.end_date_strings = patch(self.end_date_strings, delta.end_date_strings)
+        out.strings = {col: patch(values, delta.strings[col]) for col, values in self.strings.items()}
+
+        # Drop the replaced rows' tags, add the delta's, and regroup the CSR by row
+        out.tag_index = dict(self.tag_index)
+        tag_map = merge_vocab(out.tag_index, delta.tag_names)
+        out.tag_names = list(out.tag_index)
+        keep = ~np.isin(self._tag_rows, rows[~added])
+        tag_rows = np.concatenate([self._tag_rows[keep], target[delta._tag_rows]])
+        tag_codes = np.concatenate([self.tag_codes[keep], tag_map[delta.tag_codes]])
+        order = np.argsort(tag_rows, kind="stable")
+        out._tag_rows = tag_rows[order]
+        out.tag_codes = tag_codes[order].astype(np.int32, copy=False)
+        out.tag_indptr = np.concatenate(([0], np.cumsum(np.bincount(out._tag_rows, minlength=n)))).astype(np.int64)
+
+        out.id_to_row = dict(self.id_to_row)
+        out.id_to_row.update((int(eid), int(row)) for eid, row in zip(delta.event_ids, target))
+        out._sorted = np.argsort(out.event_ids, kind="stable")
+        out._sorted_ids = out.event_ids[out._sorted]
+
+        out.dates = EventDateIndex()
+        out.dates.update(out.event_ids, out.end_dates)
+        # Still counts from the last full load, which is what periodic reloads go by
+        out.loaded_at = self.loaded_at
+        return out
+
+    def __len__(self) -> int:
+        return len(self.event_ids)
+
+    # --- Lookups ---
+
+    def row(self, event_id) -> Optional[int]:
+        return self.id_to_row.get(int(event_id))
+
+    def rows_for(self, event_ids) -> np.ndarray:
+        """Catalog row of each id, -1 where the id is not in the catalog."""
+        ids = np.asarray(event_ids, dtype=np.int64)
+        if len(self._sorted_ids) == 0 or len(ids) == 0:
+            return np.full(len(ids), -1, dtype=np.int64)
+        pos = np.searchsorted(self._sorted_ids, ids)
+        pos = np.minimum(pos, len(self._sorted_ids) - 1)
+        found = self._sorted_ids[pos] == ids
+        return np.where(found, self._sorted[pos], -1)
+
+    def tags_of(self, row: int) -> List[str]:
+        codes = self.tag_codes[self.tag_indptr[row]:self.tag_indptr[row + 1]]
+        return [self.tag_names[c] for c in codes]
+
+    # --- Scoring ---
+
+    def upcoming_mask(self) -> np.ndarray:
+        """True for events that have not ended (refreshed at day rollover)."""
+        return self.dates.upcoming_mask()
+
+    def tag_scores(self, user_tag_profile: Counter) -> np.ndarray:
+        """
+        Tag score of every row: the sum of the user's weights for the event's
+        tags over the user's total weight.
+        """
+        if not user_tag_profile or len(self.tag_codes) == 0:
+            return np.zeros(len(self), dtype=np.float64)
+        weights = np.zeros(len(self.tag_names), dtype=np.float64)
+        for tag, w in user_tag_profile.items():
+            code = self.tag_index.get(tag)
+            if code is not None:
+                weights[code] = w
+        max_possible = sum(user_tag_profile.values()) or 1.0
+        sums = np.bincount(self._tag_rows, weights=weights[self.tag_codes], minlength=len(self))
+        return sums / max_possible
+
+    # --- Materialization ---
+
+    def record(self, row: int) -> Dict:
+        """A JSON-ready dict: plain str/int/list values, dates as 'YYYY-MM-DD' or None."""
+        rec = {
+            "event_id": int(self.event_ids[row]),
+            "start_date": self.start_date_strings[row],
+            "end_date": self.end_date_strings[row],
+            "tags": self.tags_of(row),
+            "cluster": self.cluster_names[self.cluster_codes[row]],
+        }
+        for col, values in self.strings.items():
+            rec[col] = values[row]
+        return rec
+
+    def records(self, rows: Sequence[int], scores: Dict[str, np.ndarray] = None) -> List[Dict]:
+        """Dicts for the given rows, with each scores[name][i] attached to the i-th record."""
+        out = []
+        for i, row in enumerate(rows):
+            rec = self.record(int(row))
+            for name, values in (scores or {}).items():
+                rec[name] = float(values[i])
+            out.append(rec)
+        return out
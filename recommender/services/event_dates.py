@@ -0,0 +1,67 @@
+import threading
+from datetime import date
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def to_days(end_dates: Iterable) -> np.ndarray:
+    """End dates as datetime64[D] (NaT where missing), using each value's own wall-clock date."""
+    stamps = pd.to_datetime(pd.Series(end_dates), errors="coerce")
+    if getattr(stamps.dt, "tz", None) is not None:
+        stamps = stamps.dt.tz_localize(None)
+    return stamps.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]")
+
+
+class EventDateIndex:
+    """
+    End dates of the catalog, sorted once, with the upcoming mask cached per
+    calendar day.
+
+    An event is upcoming while end_date >= today (or it has no end date). With
+    the dates sorted, the expired events are a prefix found by one binary
+    search; the mask is rebuilt only when the day rolls over or the catalog's
+    ids/end dates change.
+    """
+
+    def __init__(self, clock: Callable[[], date] = date.today) -> None:
+        self.clock = clock
+        self.event_ids = np.zeros(0, dtype=np.int64)
+        self._days = np.zeros(0, dtype="datetime64[D]")
+        self._order = np.zeros(0, dtype=np.int64)     # positions of dated events, by end date
+        self._sorted_days = np.zeros(0, dtype="datetime64[D]")
+        self._mask: Optional[np.ndarray] = None
+        self._mask_day: Optional[date] = None
+        self._lock = threading.Lock()
+
+    def update(self, event_ids: Iterable, end_dates: Iterable) -> bool:
+        """Index a catalog (positions follow the given order). Returns False if nothing changed."""
+        ids = np.asarray(list(event_ids), dtype=np.int64)
+        days = to_days(end_dates)
+        with self._lock:
+            if np.array_equal(ids, self.event_ids) and np.array_equal(days.view("i8"), self._days.view("i8")):
+                return False
+            dated = np.flatnonzero(~np.isnat(days))
+            order = dated[np.argsort(days[dated], kind="stable")]
+            self.event_ids, self._days = ids, days
+            self._order, self._sorted_days = order, days[order]
+            self._mask, self._mask_day = None, None
+        return True
+
+    def _expired_count(self, day: date) -> int:
+        return int(np.searchsorted(self._sorted_days, np.datetime64(day, "D"), side="left"))
+
+    def upcoming_mask(self) -> np.ndarray:
+        """Boolean mask over the indexed events: True where end_date >= today or missing."""
+        today = self.clock()
+        with self._lock:
+            if self._mask is None or self._mask_day != today:
+                mask = np.ones(len(self.event_ids), dtype=bool)
+                mask[self._order[:self._expired_count(today)]] = False
+                mask.flags.writeable = False
+                self._mask, self._mask_day = mask, today
+            return self._mask
+
+    def __len__(self) -> int:
+        return len(self.event_ids)
@@ -0,0 +1,75 @@
+import json
+import os
+import threading
+import time
+from typing import Optional, Tuple
+
+try:
+    import fcntl  # POSIX only; used to serialize writers across processes
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_GENERATION_PATH = os.getenv(
+    "INDEX_GENERATION_FILE", os.path.join(BASE_DIR, "models", "index_generation.json")
+)
+
+
+class IndexGeneration:
+    """
+    Write counter of the OpenSearch event index, shared between processes
+    through a small JSON file ({"generation": n, "bumped_at": unix time}).
+
+    indexer.py and ingest.py bump it after every write; the API compares it
+    with the generation its cached search results were computed at. Each bump
+    replaces the file, so readers notice a change with one stat() and only
+    re-read the file then.
+    """
+
+    def __init__(self, path: str = DEFAULT_GENERATION_PATH) -> None:
+        self.path = path
+        self._stat: Optional[Tuple[int, int]] = None
+        self._value: Tuple[int, float] = (0, 0.0)
+        self._lock = threading.Lock()
+
+    def read(self) -> Tuple[int, float]:
+        """(generation, bumped_at); (0, 0.0) until the index has been written through a bumping writer."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return 0, 0.0
+        key = (st.st_ino, st.st_mtime_ns)
+        if key != self._stat:
+            with self._lock:
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                    self._value = (int(data.get("generation", 0)), float(data.get("bumped_at", 0.0)))
+                    self._stat = key
+                except (OSError, ValueError):
+                    pass
+        return self._value
+
+    @property
+    def current(self) -> int:
+        return self.read()[0]
+
+    def bump(self) -> int:
+        """Record a write to the index; returns the new generation."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(f"{self.path}.lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                self._stat = None
+                generation = self.read()[0] + 1
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"generation": generation, "bumped_at": time.time()}, f)
+                os.replace(tmp_path, self.path)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        return generation
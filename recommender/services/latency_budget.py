@@ -0,0 +1,129 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Serving tiers, best first; the response reports the one that produced the list
+TIER_FULL = "full"              # personalized ranking (+ query filter when asked)
+TIER_UNFILTERED = "unfiltered"  # personalized ranking, query filter skipped
+TIER_TAG_ONLY = "tag_only"      # tag-profile scores only
+TIER_POPULAR = "popular"        # precomputed popular list, not personalized
+TIERS = (TIER_FULL, TIER_UNFILTERED, TIER_TAG_ONLY, TIER_POPULAR)
+
+
+def degrade(tier: str, to: str) -> str:
+    """The worse of two tiers (skipping the query filter does not upgrade a tag-only list)."""
+    return max(tier, to, key=TIERS.index)
+
+
+class BudgetExceeded(Exception):
+    """A stage did not finish within the request's remaining budget."""
+
+    def __init__(self, stage: str, elapsed: float) -> None:
+        super().__init__(f"latency budget exceeded in {stage} after {elapsed * 1000:.0f}ms")
+        self.stage = stage
+
+
+class StageCosts:
+    """Moving average of how long each stage has taken in this process, in seconds."""
+
+    def __init__(self, alpha: float = 0.2) -> None:
+        self.alpha = alpha
+        self._costs: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            previous = self._costs.get(stage)
+            self._costs[stage] = seconds if previous is None else previous + self.alpha * (seconds - previous)
+
+    def estimate(self, stage: str) -> float:
+        """0.0 for a stage never seen, so it is tried once before it can be skipped."""
+        return self._costs.get(stage, 0.0)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {stage: round(cost * 1000, 2) for stage, cost in self._costs.items()}
+
+
+class LatencyBudget:
+    """
+    Time allowance of one request, spent across its stages.
+
+    Blocking stages (database reads, model loads) go through call(), which
+    runs them on a small shared pool and stops waiting once the budget is
+    spent; the stage keeps running in the background and its result (a loaded
+    catalog, a model snapshot) serves later requests. CPU stages can not be
+    interrupted, so the caller asks affords() first and degrades to a cheaper
+    tier when the stage's usual cost no longer fits. A budget of None or <= 0
+    never runs out and call() runs stages inline.
+    """
+
+    _pool: Optional[ThreadPoolExecutor] = None
+    _pool_lock = threading.Lock()
+    POOL_WORKERS = 8
+
+    def __init__(self, seconds: Optional[float], costs: Optional[StageCosts] = None) -> None:
+        self.seconds = seconds if seconds and seconds > 0 else None
+        self.costs = costs or StageCosts()
+        self.started = time.monotonic()
+        self.stages: Dict[str, float] = {}
+
+    @classmethod
+    def _executor(cls) -> ThreadPoolExecutor:
+        if cls._pool is None:
+            with cls._pool_lock:
+                if cls._pool is None:
+                    cls._pool = ThreadPoolExecutor(max_workers=cls.POOL_WORKERS, thread_name_prefix="budget")
+        return cls._pool
+
+    @property
+    def limited(self) -> bool:
+        return self.seconds is not None
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining(self) -> float:
+        return float("inf") if self.seconds is None else self.seconds - self.elapsed()
+
+    def affords(self, stage: str) -> bool:
+        """Whether the stage's usual cost still fits in what is left."""
+        return self.remaining() > self.costs.estimate(stage)
+
+    def _record(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = round(seconds * 1000, 2)
+        self.costs.observe(stage, seconds)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time an inline stage."""
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            self._record(name, time.monotonic() - t0)
+
+    def call(self, stage: str, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Run a blocking stage; raises BudgetExceeded if it does not finish within the remaining budget."""
+        if self.seconds is None:
+            with self.stage(stage):
+                return fn(*args, **kwargs)
+
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise BudgetExceeded(stage, self.elapsed())
+        t0 = time.monotonic()
+        future = self._executor().submit(fn, *args, **kwargs)
+        try:
+            result = future.result(timeout=remaining)
+        except FutureTimeout:
+            if not future.cancel():
+                # Still running: learn its full cost when it finishes
+                future.add_done_callback(lambda _: self.costs.observe(stage, time.monotonic() - t0))
+            raise BudgetExceeded(stage, self.elapsed()) from None
+        self._record(stage, time.monotonic() - t0)
+        return result
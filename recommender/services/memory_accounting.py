@@ -0,0 +1,168 @@
+import mmap
+import sys
+import threading
+import tracemalloc
+import types
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import scipy.sparse as sp
+except ImportError:  # pragma: no cover - scipy is optional here
+    sp = None
+
+# Never followed: code, classes and synchronization objects are not data a structure owns
+_OPAQUE = (
+    type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+    types.CodeType, type(threading.Lock()), type(threading.RLock()), threading.Thread,
+    threading.Condition, threading.Event,
+)
+
+
+def _is_torch_module(obj: Any) -> bool:
+    return any(c.__name__ == "Module" and c.__module__.startswith("torch.nn") for c in type(obj).__mro__)
+
+
+def _torch_bytes(module) -> int:
+    tensors = list(module.parameters()) + list(module.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class MemoryAccountant:
+    """
+    Approximate deep sizes of in-process structures.
+
+    Objects are counted once per accountant, under the first structure that
+    reaches them, so measuring the catalog before the ranked-list cache keeps
+    the cached lists from being charged for the catalog they point to. Arrays
+    backed by a file mapping (the similarity matrix, the embedding store) are
+    reported separately as mapped bytes: they live in the page cache and are
+    shared by every worker rather than owned by this process.
+    """
+
+    def __init__(self) -> None:
+        self._seen = set()
+
+    def measure(self, obj: Any) -> Tuple[int, int]:
+        """(owned bytes, mapped bytes) reachable from obj and not measured before."""
+        owned = mapped = 0
+        stack = [obj]
+        while stack:
+            o = stack.pop()
+            if o is None or isinstance(o, _OPAQUE) or id(o) in self._seen:
+                continue
+            self._seen.add(id(o))
+
+            if isinstance(o, np.ndarray):
+                if o.base is not None:
+                    # A view (np.memmap included): the memory belongs to whatever it views
+                    stack.append(o.base)
+                    continue
+                owned += o.nbytes
+                if o.dtype == object:
+                    stack.extend(o.ravel().tolist())
+            elif isinstance(o, mmap.mmap):
+                mapped += len(o)
+            elif isinstance(o, (pd.DataFrame, pd.Series, pd.Index)):
+                usage = o.memory_usage(deep=True)
+                owned += int(usage.sum() if hasattr(usage, "sum") else usage)
+            elif sp is not None and sp.issparse(o):
+                owned += sum(getattr(o, a).nbytes for a in ("data", "indices", "indptr", "row", "col") if hasattr(o, a))
+            elif _is_torch_module(o):
+                # torch.nn.Module (SentenceTransformer): weights, not the Python object graph
+                owned += _torch_bytes(o)
+            elif isinstance(o, dict):
+                owned += sys.getsizeof(o)
+                stack.extend(o.keys())
+                stack.extend(o.values())
+            elif isinstance(o, (list, tuple, set, frozenset, deque)):
+                owned += sys.getsizeof(o)
+                stack.extend(o)
+            elif isinstance(o, (str, bytes, bytearray, int, float, complex, bool)):
+                owned += sys.getsizeof(o)
+            else:
+                owned += sys.getsizeof(o)
+                if hasattr(o, "__dict__"):
+                    stack.append(vars(o))
+                for slot in getattr(type(o), "__slots__", ()):
+                    stack.append(getattr(o, slot, None))
+        return owned, mapped
+
+
+def _mb(n: int) -> float:
+    return round(n / 1024.0 / 1024.0, 2)
+
+
+def _sizes(accountant: MemoryAccountant, obj: Any) -> Dict[str, float]:
+    owned, mapped = accountant.measure(obj)
+    return {"owned_mb": _mb(owned), "mapped_mb": _mb(mapped)}
+
+
+def cache_stats(cache: Any) -> Dict[str, Any]:
+    """Entries, bounds and hit/miss counters of a cache (attributes it does not have are left out)."""
+    stats: Dict[str, Any] = {"entries": len(cache)}
+    for attr in ("capacity", "ttl"):
+        if hasattr(cache, attr):
+            stats[attr] = getattr(cache, attr)
+    if hasattr(cache, "hits"):
+        lookups = cache.hits + cache.misses
+        stats.update(hits=cache.hits, misses=cache.misses, hit_rate=round(cache.hits / lookups, 4) if lookups else None)
+    return stats
+
+
+def memory_report(structures: Dict[str, Any], caches: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Sizes of named structures, then of caches (with their hit/miss stats),
+    measured in that order with one MemoryAccountant; None = not loaded.
+    """
+    accountant = MemoryAccountant()
+    out: Dict[str, Any] = {"structures": {}, "caches": {}}
+    for name, obj in structures.items():
+        out["structures"][name] = _sizes(accountant, obj) if obj is not None else None
+    for name, cache in caches.items():
+        out["caches"][name] = {**cache_stats(cache), **_sizes(accountant, cache)} if cache is not None else None
+    total = [v for group in out.values() for v in group.values() if v]
+    out["total_owned_mb"] = round(sum(v["owned_mb"] for v in total), 2)
+    out["total_mapped_mb"] = round(sum(v["mapped_mb"] for v in total), 2)
+    return out
+
+
+# --- tracemalloc ---
+
+def start_tracing(frames: int = 1) -> bool:
+    """Start tracemalloc (allocations made before this are not attributed). False if already tracing."""
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(frames)
+    return True
+
+
+def stop_tracing() -> bool:
+    if not tracemalloc.is_tracing():
+        return False
+    tracemalloc.stop()
+    return True
+
+
+def top_allocators(limit: int = 20, group_by: str = "lineno") -> Optional[Dict[str, Any]]:
+    """Largest live allocation sites since tracing started; None when tracemalloc is off."""
+    if not tracemalloc.is_tracing():
+        return None
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    stats = snapshot.statistics(group_by)
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "traced_mb": _mb(current),
+        "peak_mb": _mb(peak),
+        "overhead_mb": _mb(tracemalloc.get_tracemalloc_memory()),
+        "top": [
+            {"site": str(s.traceback[0]) if s.traceback else "?", "size_mb": _mb(s.size), "count": s.count}
+            for s in stats[:limit]
+        ],
+    }
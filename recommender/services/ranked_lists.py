@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+from services.event_catalog import EventCatalog
+from services.latency_budget import TIER_FULL
+
+
+class RankedList:
+    """
+    A user's ranked recommendations as catalog rows plus per-row scores.
+    Records are only materialized for the slice a page asks for, so serving
+    page n of a cached list costs O(page size) whatever its depth.
+    `tier` names how the list was produced (services.latency_budget.TIERS).
+    """
+
+    def __init__(
+        self, catalog: EventCatalog, rows: np.ndarray, scores: Dict[str, np.ndarray], tier: str = TIER_FULL
+    ) -> None:
+        self.catalog = catalog
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.scores = {name: np.asarray(values, dtype=np.float64) for name, values in scores.items()}
+        self.tier = tier
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def page(self, start: int, size: int) -> List[Dict]:
+        stop = start + size
+        return self.catalog.records(
+            self.rows[start:stop], {name: values[start:stop] for name, values in self.scores.items()}
+        )
+
+    def select(self, positions: Sequence[int], scores: Dict[str, Sequence[float]] = None) -> "RankedList":
+        """A new list of the given positions, in that order, optionally overriding some scores."""
+        positions = np.asarray(positions, dtype=np.int64)
+        selected = {name: values[positions] for name, values in self.scores.items()}
+        selected.update(scores or {})
+        return RankedList(self.catalog, self.rows[positions], selected, self.tier)
+
+    def with_tier(self, tier: str) -> "RankedList":
+        return RankedList(self.catalog, self.rows, self.scores, tier)
+
+
+class RankedListCache:
+    """
+    Ranked lists kept for a short TTL so later pages are slices of the list
+    the first page came from, instead of a fresh (differently shuffled) ranking.
+
+    In-process and per worker: a cursor that lands on another worker, or comes
+    back after its list expired or was discarded, misses and the caller re-ranks.
+    """
+
+    def __init__(self, ttl: float = 300.0, capacity: int = 2000) -> None:
+        self.ttl = ttl
+        self.capacity = capacity
+        self._lists: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[RankedList]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._lists.get(key)
+            if entry is None or now - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._lists[key]
+                self.misses += 1
+                return None
+            self._lists.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, ranked: RankedList) -> None:
+        if self.ttl <= 0 or self.capacity <= 0:
+            return
+        with self._lock:
+            self._lists[key] = (time.monotonic(), ranked)
+            self._lists.move_to_end(key)
+            while len(self._lists) > self.capacity:
+                self._lists.popitem(last=False)
+
+    def discard(self, match: Callable[[Hashable], bool]) -> int:
+        """Drop the lists whose key matches; returns how many were dropped."""
+        with self._lock:
+            stale = [key for key in self._lists if match(key)]
+            for key in stale:
+                del self._lists[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lists.clear()
+
+    def __len__(self) -> int:
+        return len(self._lists)
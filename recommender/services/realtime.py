@@ -0,0 +1,202 @@
+import json
+import os
+import select
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+# Channel the triggers in sql/realtime_triggers.sql notify on
+CHANNEL = "recommender_changes"
+
+# (table, rows) -> None; rows are dicts shaped like the table's columns
+ChangeHandler = Callable[[str, List[dict]], None]
+
+
+class InteractionLog:
+    """
+    In-process copy of public."User_Event": loaded once, then kept current by
+    change notifications instead of re-reading the table on every request.
+
+    Changed rows are buffered and merged into the frame the next time it is
+    read. Rows are matched on `id` (an UPDATE replaces the old row); tables
+    without an `id` column can only be appended to.
+    """
+
+    def __init__(self, repo) -> None:
+        self.repo = repo
+        self._frame: Optional[pd.DataFrame] = None
+        self._pending: List[dict] = []
+        self._lock = threading.Lock()
+
+    def load(self) -> pd.DataFrame:
+        frame = self.repo.load_all(parse_meta=False)
+        with self._lock:
+            self._frame = frame
+            self._pending = []
+        return frame
+
+    def is_loaded(self) -> bool:
+        return self._frame is not None
+
+    def upsert(self, rows: List[dict]) -> None:
+        with self._lock:
+            self._pending.extend(rows)
+
+    def frame(self) -> pd.DataFrame:
+        if self._frame is None:
+            return self.load()
+        with self._lock:
+            if self._pending:
+                delta = self.repo.prepare(pd.DataFrame(self._pending), parse_meta=False)
+                base = self._frame
+                if "id" in delta.columns and "id" in base.columns:
+                    delta = delta.drop_duplicates(subset="id", keep="last")
+                    base = base[~base["id"].isin(delta["id"])]
+                self._frame = pd.concat([base, delta], ignore_index=True)
+                self._pending = []
+            return self._frame
+
+    def __len__(self) -> int:
+        return 0 if self._frame is None else len(self._frame) + len(self._pending)
+
+
+class ChangeListener:
+    """
+    LISTENs on the Postgres channel the change triggers notify and hands each
+    batch of changed rows to the handlers subscribed to its table.
+
+    Notifications carry the whole row; rows too large for a NOTIFY payload
+    carry only their key and are fetched with the table's `fetchers` entry.
+    Notifications sent before LISTEN is issued are lost, including those
+    between the caller's initial load and the first connect, so the resync
+    handlers run (reload from the tables) every time LISTEN is established.
+    """
+
+    def __init__(
+        self,
+        db_config,
+        channel: str = CHANNEL,
+        fetchers: Dict[str, Callable[[List], List[dict]]] = None,
+        batch_window: float = 0.05,
+        reconnect_delay: float = 1.0,
+    ) -> None:
+        self.db_config = db_config
+        self.channel = channel
+        self.fetchers = fetchers or {}
+        self.batch_window = batch_window
+        self.reconnect_delay = reconnect_delay
+
+        self.handlers: Dict[str, List[ChangeHandler]] = defaultdict(list)
+        self.resync_handlers: List[Callable[[], None]] = []
+        self.notifications = 0
+        self.last_change_at: Optional[float] = None
+        self.connected = False
+
+        self._pid: Optional[int] = None
+        self._stop = threading.Event()
+
+    def subscribe(self, table: str, handler: ChangeHandler) -> None:
+        self.handlers[table].append(handler)
+
+    def on_resync(self, handler: Callable[[], None]) -> None:
+        self.resync_handlers.append(handler)
+
+    # --- Lifecycle ---
+
+    def ensure_started(self) -> None:
+        # Threads do not survive fork(), so each worker process starts its own
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._stop.clear()
+            threading.Thread(target=self._run, name="change-listener", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _connect(self):
+        conn = self.db_config.get_connection()
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f'LISTEN "{self.channel}";')
+        return conn
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                self.connected = True
+                print(f"📡 Listening for changes on '{self.channel}'")
+                self._resync()
+                self._listen(conn)
+            except Exception as e:
+                print(f"⚠️ Change listener disconnected: {e}")
+            finally:
+                self.connected = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            self._stop.wait(self.reconnect_delay)
+
+    def _listen(self, conn) -> None:
+        while not self._stop.is_set():
+            if select.select([conn], [], [], 1.0) == ([], [], []):
+                continue
+            conn.poll()
+            if not conn.notifies:
+                continue
+            # Let a burst (e.g. a multi-row INSERT) arrive, then handle it as one batch
+            time.sleep(self.batch_window)
+            conn.poll()
+            payloads = [n.payload for n in conn.notifies]
+            conn.notifies.clear()
+            self._dispatch(payloads)
+
+    # --- Delivery ---
+
+    def _dispatch(self, payloads: List[str]) -> None:
+        rows: Dict[str, List[dict]] = defaultdict(list)
+        keys: Dict[str, List] = defaultdict(list)
+        for payload in payloads:
+            try:
+                change = json.loads(payload)
+            except ValueError:
+                print(f"⚠️ Ignoring malformed change notification: {payload[:200]}")
+                continue
+            table = change.get("table")
+            if change.get("row") is not None:
+                rows[table].append(change["row"])
+            elif change.get("key") is not None:
+                keys[table].append(change["key"])
+            else:
+                # A row we can neither read nor fetch: fall back to a reload
+                self._resync()
+                return
+
+        for table, table_keys in keys.items():
+            fetch = self.fetchers.get(table)
+            if fetch is None:
+                self._resync()
+                return
+            rows[table].extend(fetch(table_keys))
+
+        self.notifications += len(payloads)
+        self.last_change_at = time.time()
+        for table, table_rows in rows.items():
+            for handler in self.handlers.get(table, []):
+                try:
+                    handler(table, table_rows)
+                except Exception as e:
+                    print(f"⚠️ Change handler for {table} failed: {e}")
+
+    def _resync(self) -> None:
+        for handler in self.resync_handlers:
+            try:
+                handler()
+            except Exception as e:
+                print(f"⚠️ Resync after missed changes failed: {e}")
@@ -1,3 +1,8 @@
+import os
+import re
+import ast
+import time
+import threading
 import pandas as pd
 import psycopg2
 import json
@@ -7,6 +12,16 @@ import numpy as np
 from datetime import datetime
 from collections import defaultdict, Counter
 
+from services.cpu_pool import STAGE_SCORE, weighted_similarity
+from services.event_catalog import EventCatalog
+from services.event_dates import EventDateIndex
+from services.latency_budget import (
+    TIER_FULL, TIER_POPULAR, TIER_TAG_ONLY, BudgetExceeded, LatencyBudget, StageCosts
+)
+from services.ranked_lists import RankedList, RankedListCache
+from services.similarity_builder import FORMAT_DENSE, FORMAT_TOPN, binary_paths
+from services.suggest import event_popularity
+
 #  CONFIG & CONSTANTS
 TAG_CLUSTER_MAP = {
     "Ai": "Tech", "Blockchain": "Tech", "Cybersecurity": "Tech", "Data Analysis": "Tech",
@@ -25,6 +40,12 @@ TAG_CLUSTER_MAP = {
     "Startup": "Startup"
 }
 
+# Per-interaction weights used by the similarity and collaborative paths
+INTERACTION_WEIGHTS = {"view": 1, "tag_click": 2, "register": 5}
+# public."User_Event" stamps rows in interaction_time (and re-stamps a tag_click row when its meta
+# is updated); the others are accepted for other sources
+TIMESTAMP_COLUMNS = ("interaction_time", "timestamp", "created_at", "createdAt")
+
 
 #  LOW-LEVEL HELPERS
 
@@ -37,8 +58,10 @@ def safe_parse_meta(m):
     try:
         return json.loads(m)
     except Exception:
+        # Python-literal style meta ("{'tags': [...]}"); literal_eval never runs code
         try:
-            return eval(m)
+            parsed = ast.literal_eval(m)
+            return parsed if isinstance(parsed, dict) else {}
         except Exception:
             return {}
 
@@ -72,43 +95,20 @@ def assign_cluster_from_tags(tags):
     return "Other"
 
 
-def compute_tag_score_for_events(events_df: pd.DataFrame, user_tag_profile: Counter):
-    """
-    Compute normalized tag score per event based on overlap of event tags with user_tag_profile.
-    Returns a pandas Series aligned with events_df.index.
-    """
-    if not user_tag_profile:
-        return pd.Series(0.0, index=events_df.index)
+def _upsert_events(frame: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    """frame with delta's rows replacing (or added to) the rows with the same event_id."""
+    kept = frame[~frame['event_id'].isin(delta['event_id'])]
+    return pd.concat([kept, delta], ignore_index=True)
 
-    user_tag_weights = dict(user_tag_profile)
-    max_possible = sum(user_tag_weights.values()) or 1.0
 
-    scores = []
-    for tags in events_df['tags']:
-        s = 0.0
-        for t in tags:
-            s += user_tag_weights.get(t, 0.0)
-        scores.append(s / max_possible)
-    return pd.Series(scores, index=events_df.index)
-
-
-def clean_recommendations(recommendations):
-    cleaned = []
-    for rec in recommendations:
-        cleaned_rec = {}
-        for k, v in rec.items():
-            if isinstance(v, float) and math.isnan(v):
-                cleaned_rec[k] = "Free" if k == "price" else ""
-            elif v is None:
-                cleaned_rec[k] = ""
-            elif isinstance(v, (pd.Timestamp, datetime)):
-                cleaned_rec[k] = v.strftime('%Y-%m-%d') if pd.notna(v) else None
-            else:
-                cleaned_rec[k] = v
-        if 'tags' in cleaned_rec and not isinstance(cleaned_rec['tags'], list):
-            cleaned_rec['tags'] = []
-        cleaned.append(cleaned_rec)
-    return cleaned
+def top_k_positions(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest scores, best first (ties keep their original order)."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
 
 #  DATABASE CONFIG & REPOS
 class DatabaseConfig:
@@ -130,14 +130,55 @@ class DatabaseConfig:
 class EventRepository:
     def __init__(self, db_config: DatabaseConfig):
         self.db_config = db_config
+        self.dates = EventDateIndex()
 
-    def load_events(self) -> pd.DataFrame:
+    def _fetch_all(self) -> pd.DataFrame:
         conn = self.db_config.get_connection()
         df = pd.read_sql('SELECT * FROM public."Event";', conn)
         conn.close()
+        return df
+
+    def _fetch_by_ids(self, ids) -> pd.DataFrame:
+        placeholders = ",".join(["%s"] * len(ids))
+        sql = f'SELECT * FROM public."Event" WHERE event_id IN ({placeholders})'
+        conn = self.db_config.get_connection()
+        try:
+            return pd.read_sql(sql, conn, params=list(ids))
+        finally:
+            conn.close()
+
+    def load_by_ids(self, ids) -> list:
+        """Raw event rows (as dicts) for the given ids, in no particular order."""
+        if not ids:
+            return []
+        df = self._fetch_by_ids(ids)
+        columns = []
+        for col in df.columns:
+            values = df[col].tolist()
+            # NULLs come back as NaN/NaT from pandas; hand them out as None (JSON-safe),
+            # touching only the columns that have any
+            missing = df[col].isna()
+            if missing.any():
+                values = [None if m else v for v, m in zip(values, missing.tolist())]
+            columns.append(values)
+        names = list(df.columns)
+        return [dict(zip(names, row)) for row in zip(*columns)]
+
+    def load_events(self) -> pd.DataFrame:
+        df = self._fetch_all()
 
         print(f"✅ Loaded {len(df)} events from database")
+        df = self.prepare(df)
+
+        # Mark expired (sorted date index; re-sorted only when the catalog's dates change)
+        self.dates.update(df['event_id'], df['end_date'])
+        df['is_expired'] = ~self.dates.upcoming_mask()
+
+        print(f"📊 Cluster distribution: {df['cluster'].value_counts().to_dict()}")
+        return df
 
+    def prepare(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Normalize raw Event rows (a full load or a few changed rows) for ranking."""
         # Parse tags
         df['tags'] = df['tags'].apply(parse_tags_field)
 
@@ -149,20 +190,14 @@ class EventRepository:
         df['location'] = df['location'].fillna("")
         df['url'] = df['url'].fillna("")
 
-        # Mark expired
-        today = datetime.today().date()
-        df['is_expired'] = df['end_date'].apply(lambda d: d.date() < today if pd.notna(d) else False)
-
         # Cluster
         if 'cluster' not in df.columns:
             df['cluster'] = df['tags'].apply(assign_cluster_from_tags)
         else:
-            df['cluster'] = df.apply(
-                lambda r: r['cluster'] if pd.notna(r.get('cluster')) and r.get('cluster') != '' else assign_cluster_from_tags(r['tags']),
-                axis=1
-            )
-
-        print(f"📊 Cluster distribution: {df['cluster'].value_counts().to_dict()}")
+            df['cluster'] = [
+                c if pd.notna(c) and c != '' else assign_cluster_from_tags(tags)
+                for c, tags in zip(df['cluster'], df['tags'])
+            ]
         return df
 
 
@@ -176,22 +211,46 @@ class UserInteractionRepository:
         except Exception:
             return None
 
-    def load_all(self) -> pd.DataFrame:
+    def _fetch_all(self) -> pd.DataFrame:
         conn = self.db_config.get_connection()
         df = pd.read_sql('SELECT * FROM public."User_Event";', conn)
         conn.close()
+        return df
+
+    def load_by_ids(self, ids) -> list:
+        """Raw User_Event rows (as dicts) by `id`, for rows too large to arrive in a notification."""
+        if not ids:
+            return []
+        placeholders = ",".join(["%s"] * len(ids))
+        conn = self.db_config.get_connection()
+        try:
+            df = pd.read_sql(f'SELECT * FROM public."User_Event" WHERE id IN ({placeholders})', conn, params=list(ids))
+        finally:
+            conn.close()
+        return df.astype(object).where(pd.notna(df), None).to_dict(orient='records')
+
+    def load_all(self, parse_meta: bool = True) -> pd.DataFrame:
+        """
+        All User_Event rows. With parse_meta=False the `meta_parsed` column is
+        skipped; incremental consumers parse meta for new rows only.
+        """
+        df = self._fetch_all()
 
         print(f"✅ Loaded {len(df)} user interactions from database")
+        return self.prepare(df, parse_meta)
 
+    def prepare(self, df: pd.DataFrame, parse_meta: bool = True) -> pd.DataFrame:
+        """Normalize raw User_Event rows (a full load or a few changed rows)."""
         # event_id to int
         if 'event_id' in df.columns:
             df["event_id"] = df["event_id"].apply(self._safe_int)
 
         # parse meta
-        if 'meta' in df.columns:
-            df['meta_parsed'] = df['meta'].apply(safe_parse_meta)
-        else:
-            df['meta_parsed'] = [{} for _ in range(len(df))]
+        if parse_meta:
+            if 'meta' in df.columns:
+                df['meta_parsed'] = df['meta'].apply(safe_parse_meta)
+            else:
+                df['meta_parsed'] = [{} for _ in range(len(df))]
 
         # normalize interaction_type
         if 'interaction_type' in df.columns:
@@ -201,67 +260,390 @@ class UserInteractionRepository:
 
         return df
 
-    def load_for_user(self, user_id: int) -> pd.DataFrame:
-        all_df = self.load_all()
-        return all_df[all_df["user_id"] == user_id]
 
 
 
+class InteractionWatermark:
+    """
+    Tracks which User_Event rows an incremental consumer has already seen:
+    by the `id` column when the table has one, otherwise by row position.
+    """
+
+    def __init__(self):
+        self.value = None
+
+    def reset(self):
+        self.value = None
+
+    def new_rows(self, interactions_df: pd.DataFrame) -> pd.DataFrame:
+        """Rows past the watermark; advances it to cover `interactions_df`."""
+        if "id" in interactions_df.columns:
+            ids = pd.to_numeric(interactions_df["id"], errors="coerce")
+            new = interactions_df if self.value is None else interactions_df[ids > self.value]
+            if ids.notna().any():
+                # Never backwards: a request may sync an older frame after a newer one
+                self.value = max(float(ids.max()), self.value or float("-inf"))
+            return new
+        start = int(self.value or 0)
+        self.value = float(max(len(interactions_df), start))
+        return interactions_df.iloc[start:]
+
+
 #  USER PROFILE & MODEL
 
 class UserProfiler:
     def __init__(self, tag_click_weight: float = 2.0):
         self.tag_click_weight = tag_click_weight
 
-    def build_tag_profile(self, interactions_df: pd.DataFrame, user_id: int) -> Counter:
-        user_inter = interactions_df[interactions_df['user_id'] == user_id]
-        tags_counter = Counter()
-
-        # Tag click interactions (including onboarding tag selections)
-        tag_clicks = user_inter[user_inter['interaction_type'] == 'tag_click']
-        for _, row in tag_clicks.iterrows():
-            meta = row.get('meta_parsed', {}) or {}
+    def interaction_tags(self, interaction_type: str, meta) -> tuple:
+        """(tags, weight) one interaction adds to its user's tag profile."""
+        meta = meta or {}
+        if interaction_type == 'tag_click':
+            # Tag click interactions (including onboarding tag selections)
             tags = meta.get('tags') or meta.get('tag') or meta.get('clicked_tags') or []
             if isinstance(tags, str):
                 tags = [t.strip() for t in tags.split(",") if t.strip()]
+            return [t for t in tags if t], self.tag_click_weight
+        if interaction_type in ('view', 'register'):
+            # Views / registrations contribute from event tags
+            event_tags = meta.get('tags')
+            return (event_tags if isinstance(event_tags, list) else []), 1.0
+        return [], 0.0
+
+    def build_tag_profile(self, interactions_df: pd.DataFrame, user_id: int) -> Counter:
+        user_inter = interactions_df[interactions_df['user_id'] == user_id]
+        tags_counter = Counter()
+        metas = user_inter['meta_parsed'] if 'meta_parsed' in user_inter.columns else user_inter['meta'].map(safe_parse_meta)
+        for interaction_type, meta in zip(user_inter['interaction_type'], metas):
+            tags, weight = self.interaction_tags(interaction_type, meta)
             for t in tags:
-                if t:
-                    tags_counter[t] += self.tag_click_weight
+                tags_counter[t] += weight
+        return tags_counter
 
-        # Views / registrations contribute from event tags
-        view_events = user_inter[user_inter['interaction_type'].isin(['view', 'register'])]
-        for _, row in view_events.iterrows():
-            event_tags = row.get('meta_parsed', {}).get('tags')
-            if isinstance(event_tags, list):
-                for t in event_tags:
-                    tags_counter[t] += 1.0
 
-        return tags_counter
+def _same_meta(a, b) -> bool:
+    missing_a = a is None or (isinstance(a, float) and math.isnan(a))
+    missing_b = b is None or (isinstance(b, float) and math.isnan(b))
+    return missing_a and missing_b if (missing_a or missing_b) else a == b
+
+
+class TagProfileStore:
+    """
+    Per-user tag weights kept up to date from User_Event rows past a
+    watermark, so building a request's profile is one dict lookup instead of
+    a scan (and meta parse) of the user's history.
+
+    The backend keeps one tag_click row per user and UPDATEs its meta (and
+    interaction_time) when more tags are clicked, so when rows carry an `id`
+    the store also remembers each tag_click row's meta. A second watermark on
+    the timestamp finds the tag_click rows stamped since the last sync, and
+    only those are compared and re-applied when their meta changed.
+    """
+
+    PROFILE_TYPES = ('tag_click', 'view', 'register')
+
+    def __init__(self, profiler: UserProfiler = None):
+        self.profiler = profiler or UserProfiler()
+        self._profiles = defaultdict(Counter)
+        self._clicks = {}  # tag_click row id -> (raw meta, user_id, tags, weight)
+        self._clicks_stamped = None  # latest timestamp of a tag_click row already compared
+        self.watermark = InteractionWatermark()
+        self._lock = threading.Lock()
+
+    def _add(self, user_id: int, tags, weight: float) -> None:
+        profile = self._profiles[user_id]
+        for t in tags:
+            profile[t] += weight
+            if abs(profile[t]) < 1e-9:
+                del profile[t]
+
+    def observe(self, user_id: int, interaction_type: str, meta, row_id=None, raw_meta=None) -> bool:
+        user_id = int(user_id)
+        tags, weight = self.profiler.interaction_tags(interaction_type, meta)
+        if interaction_type == 'tag_click' and row_id is not None:
+            previous = self._clicks.get(row_id)
+            if previous is not None:
+                self._add(previous[1], previous[2], -previous[3])
+            self._clicks[row_id] = (raw_meta, user_id, tags, weight)
+        if not tags:
+            return False
+        self._add(user_id, tags, weight)
+        return True
+
+    @staticmethod
+    def _metas(rows: pd.DataFrame):
+        if 'meta_parsed' in rows.columns:
+            return rows['meta_parsed']
+        if 'meta' in rows.columns:
+            return rows['meta'].map(safe_parse_meta)
+        return [{}] * len(rows)
+
+    def _apply_rows(self, rows: pd.DataFrame) -> int:
+        ids = rows['id'] if 'id' in rows.columns else [None] * len(rows)
+        raws = rows['meta'] if 'meta' in rows.columns else [None] * len(rows)
+        applied = 0
+        for row_id, user_id, interaction_type, meta, raw in zip(
+            ids, rows['user_id'], rows['interaction_type'], self._metas(rows), raws
+        ):
+            if pd.notna(user_id):
+                applied += self.observe(user_id, interaction_type, meta, row_id, raw)
+        return applied
+
+    def sync(self, interactions_df: pd.DataFrame) -> int:
+        """Fold in rows past the watermark and tag_click rows whose meta changed."""
+        with self._lock:
+            new_rows = self.watermark.new_rows(interactions_df)
+            new_rows = new_rows[new_rows['interaction_type'].isin(self.PROFILE_TYPES)]
+            applied = self._apply_rows(new_rows) if not new_rows.empty else 0
+
+            edited = self._edited_clicks(interactions_df)
+            if edited is not None and not edited.empty:
+                applied += self._apply_rows(edited)
+        if applied:
+            print(f"🔁 Tag profiles updated with {applied} interactions")
+        return applied
+
+    def _edited_clicks(self, interactions_df: pd.DataFrame):
+        """tag_click rows already applied whose meta changed, among those stamped since the last sync."""
+        ts_col = next((c for c in TIMESTAMP_COLUMNS if c in interactions_df.columns), None)
+        if not self._clicks or ts_col is None or not {'id', 'meta'} <= set(interactions_df.columns):
+            return None
+        stamps = interactions_df[ts_col]
+        if not pd.api.types.is_datetime64_any_dtype(stamps):
+            stamps = pd.to_datetime(stamps, errors='coerce', utc=True)
+        if self._clicks_stamped is not None:
+            recent = stamps > self._clicks_stamped
+            interactions_df, stamps = interactions_df[recent], stamps[recent]
+        is_click = (interactions_df['interaction_type'] == 'tag_click').to_numpy()
+        clicks = interactions_df[is_click]
+        if clicks.empty:
+            return None
+        latest = stamps[is_click].max()
+        if pd.notna(latest):
+            self._clicks_stamped = latest
+        changed = [
+            i for i, (row_id, raw) in enumerate(zip(clicks['id'], clicks['meta']))
+            if row_id in self._clicks and not _same_meta(self._clicks[row_id][0], raw)
+        ]
+        return clicks.iloc[changed]
+
+    def profile(self, user_id: int) -> Counter:
+        with self._lock:
+            return Counter(self._profiles.get(int(user_id), ()))
+
+    def totals(self) -> Counter:
+        """Every user's profile summed: how much interest each tag has drawn overall."""
+        with self._lock:
+            total = Counter()
+            for profile in self._profiles.values():
+                total.update(profile)
+            return total
+
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+
+class TopNSimilarity:
+    """
+    Similarity model stored as each event's N most similar events (column
+    indices + scores, memory-mapped). Indexing with row indices returns those
+    rows as dense float32 arrays, zero outside the top N, so it can stand in
+    for the n×n matrix wherever rows of it are read.
+    """
+
+    def __init__(self, columns: np.ndarray, scores: np.ndarray):
+        self.columns = columns
+        self.scores = scores
+        self.shape = (len(columns), len(columns))
+
+    def __getitem__(self, rows) -> np.ndarray:
+        rows = np.atleast_1d(np.asarray(rows))
+        dense = np.zeros((len(rows), self.shape[1]), dtype=np.float32)
+        np.put_along_axis(dense, np.asarray(self.columns[rows], dtype=np.intp), self.scores[rows], axis=1)
+        return dense
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+
+class ModelSnapshot:
+    """One immutable, fully loaded version of the similarity model."""
+
+    def __init__(self, version: str, event_ids, similarity_matrix, source_key):
+        self.version = version
+        self.event_ids = event_ids
+        self.similarity_matrix = similarity_matrix
+        self.event_id_to_index = {eid: idx for idx, eid in enumerate(event_ids)}
+        self.source_key = source_key
+        self.loaded_at = datetime.now()
 
 
 class SimilarityModel:
-    def __init__(self, model_path: str = "models/similarity_model.json"):
+    """
+    Similarity model (event ids + n×n matrix) as written by build_model.py.
+
+    build_model.py writes the matrix (or each row's top N, see TopNSimilarity)
+    as `.npy` files next to a small JSON manifest naming their version; a JSON
+    that embeds the matrix itself is compiled once per version into the same
+    files. Those are memory-mapped read-only, so every worker process shares
+    one copy of the matrix through the page cache.
+
+    Requests take `current()` once and keep using that snapshot. A new model
+    (build_model.py renames it into place atomically) is picked up by a
+    background watcher thread or reload(); the new snapshot is fully loaded
+    before the reference is swapped, so in-flight requests finish on the old one.
+    """
+
+    VERSION_PATTERN = re.compile(r'"version"\s*:\s*"([^"]+)"')
+
+    def __init__(self, model_path: str = "models/similarity_model.json", watch_interval: float = 0.0):
         self.model_path = model_path
-        self.event_ids = None
-        self.similarity_matrix = None
-        self.event_id_to_index = None
-        self.loaded = False
+        self.watch_interval = watch_interval
+        self._snapshot = None
+        self._reload_lock = threading.Lock()
+        self._watcher_pid = None
+
+    # --- Files ---
+
+    def _source_key(self):
+        st = os.stat(self.model_path)
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _peek_version(self, source_key) -> str:
+        """build_model.py writes "version" first, so it is in the first bytes of the file."""
+        with open(self.model_path, "r", encoding="utf-8") as f:
+            match = self.VERSION_PATTERN.search(f.read(512))
+        return match.group(1) if match else f"legacy-{source_key[1]}"
+
+    def _binary_paths(self, version: str, fmt: str = FORMAT_DENSE):
+        return binary_paths(self.model_path, version, fmt)
+
+    def _compile_binary(self, source_key) -> str:
+        """JSON -> {ids,matrix}.npy (float32) for its version, written atomically."""
+        with open(self.model_path, "r") as f:
+            model = json.load(f)
+        version = model.get("version") or f"legacy-{source_key[1]}"
+        if "similarity_matrix" not in model:
+            raise FileNotFoundError(f"model {version} has no similarity_matrix and its .npy files are missing")
+        ids = np.asarray([int(eid) for eid in model["event_ids"]], dtype=np.int64)
+        matrix = np.asarray(model["similarity_matrix"], dtype=np.float32).reshape(len(ids), len(ids))
+        paths = self._binary_paths(version)
+        for path, arr in ((paths["ids"], ids), (paths["matrix"], matrix)):
+            tmp_path = f"{path}.tmp.{os.getpid()}"
+            with open(tmp_path, "wb") as f:
+                np.save(f, arr)
+            os.replace(tmp_path, path)
+        print(f"🗜️ Compiled similarity model {version} to {paths['matrix']}")
+        return version
+
+    def _remove_stale_binaries(self, keep_version: str) -> None:
+        # Unlinking is safe while other processes still map the old files
+        stem = os.path.basename(os.path.splitext(self.model_path)[0])
+        folder = os.path.dirname(self.model_path) or "."
+        for name in os.listdir(folder):
+            if name.startswith(f"{stem}.") and name.endswith(".npy") and not name.startswith(f"{stem}.{keep_version}."):
+                try:
+                    os.remove(os.path.join(folder, name))
+                except OSError:
+                    pass
+
+    def _find_binaries(self, version: str):
+        """(format, paths) of the files present for a version, or (None, None)."""
+        for fmt in (FORMAT_DENSE, FORMAT_TOPN):
+            paths = self._binary_paths(version, fmt)
+            if all(os.path.exists(p) for p in paths.values()):
+                return fmt, paths
+        return None, None
+
+    def _open_snapshot(self) -> ModelSnapshot:
+        source_key = self._source_key()
+        version = self._peek_version(source_key)
+        fmt, paths = self._find_binaries(version)
+        if fmt is None:
+            version = self._compile_binary(source_key)
+            fmt, paths = FORMAT_DENSE, self._binary_paths(version)
+            self._remove_stale_binaries(version)
+
+        if fmt == FORMAT_DENSE:
+            matrix = np.load(paths["matrix"], mmap_mode="r")
+        else:
+            matrix = TopNSimilarity(
+                np.load(paths["topn_columns"], mmap_mode="r"),
+                np.load(paths["topn_scores"], mmap_mode="r"),
+            )
+        return ModelSnapshot(
+            version=version,
+            event_ids=[int(eid) for eid in np.load(paths["ids"])],
+            similarity_matrix=matrix,
+            source_key=source_key,
+        )
+
+    # --- Loading / hot reload ---
+
+    def reload(self, force: bool = False) -> bool:
+        """Load a new snapshot if the file changed, then swap it in. Returns True if swapped."""
+        with self._reload_lock:
+            try:
+                current = self._snapshot
+                if not force and current is not None and current.source_key == self._source_key():
+                    return False
+                snapshot = self._open_snapshot()
+            except Exception as e:
+                print(f"❌ Failed to load similarity model: {e}")
+                return False
+            self._snapshot = snapshot
+            print(f"✅ Similarity model {snapshot.version} loaded successfully")
+            return True
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(self.watch_interval)
+            self.reload()
+
+    def _ensure_watcher(self) -> None:
+        # Threads do not survive fork(), so each worker process starts its own
+        if self.watch_interval > 0 and self._watcher_pid != os.getpid():
+            self._watcher_pid = os.getpid()
+            threading.Thread(target=self._watch, name="similarity-model-watcher", daemon=True).start()
 
     def load(self):
-        try:
-            with open(self.model_path, "r") as f:
-                model = json.load(f)
-            self.event_ids = [int(eid) for eid in model["event_ids"]]
-            self.similarity_matrix = np.array(model["similarity_matrix"])
-            self.event_id_to_index = {eid: idx for idx, eid in enumerate(self.event_ids)}
-            self.loaded = True
-            print("✅ Similarity model loaded successfully")
-        except Exception as e:
-            print(f"❌ Failed to load similarity model: {e}")
-            self.loaded = False
+        """Make sure a snapshot is loaded (and, without a watcher, that it is current)."""
+        if self._snapshot is None or self.watch_interval <= 0:
+            self.reload()
+        self._ensure_watcher()
+
+    def current(self):
+        """The snapshot to use for one request, or None if no model could be loaded."""
+        self.load()
+        return self._snapshot
 
     def is_loaded(self) -> bool:
-        return self.loaded
+        return self._snapshot is not None
+
+    @property
+    def snapshot(self):
+        """Currently served snapshot without triggering a load."""
+        return self._snapshot
+
+    @property
+    def loaded(self) -> bool:
+        return self.is_loaded()
+
+    @property
+    def version(self):
+        return self._snapshot.version if self._snapshot else None
+
+    @property
+    def event_ids(self):
+        return self._snapshot.event_ids if self._snapshot else None
+
+    @property
+    def similarity_matrix(self):
+        return self._snapshot.similarity_matrix if self._snapshot else None
+
+    @property
+    def event_id_to_index(self):
+        return self._snapshot.event_id_to_index if self._snapshot else None
 
 
 #  RECOMMENDATION ENGINE
@@ -271,52 +653,383 @@ class RecommendationEngine:
         self,
         db_config: DatabaseConfig,
         similarity_model_path: str = "models/similarity_model.json",
+        model_watch_interval: float = 0.0,
         similarity_weight: float = 0.75,
-        tag_weight: float = 0.25
+        tag_weight: float = 0.25,
+        event_repo: EventRepository = None,
+        inter_repo: UserInteractionRepository = None,
+        cf_model=None,
+        cf_weight: float = 0.0,
+        user_vectors=None,
+        vector_search=None,
+        catalog_refresh_interval: float = 60.0,
+        interaction_log=None,
+        change_listener=None,
+        ranked_list_ttl: float = 300.0,
+        ranked_list_capacity: int = 2000,
+        popular_depth: int = 500,
+        popular_refresh_interval: float = 300.0,
+        cpu_pool=None,
+        trending=None
     ):
         self.db_config = db_config
-        self.event_repo = EventRepository(db_config)
-        self.inter_repo = UserInteractionRepository(db_config)
+        self.event_repo = event_repo or EventRepository(db_config)
+        self.inter_repo = inter_repo or UserInteractionRepository(db_config)
         self.profiler = UserProfiler()
-        self.model = SimilarityModel(similarity_model_path)
+        self.tag_profiles = TagProfileStore(self.profiler)
+        self.model = SimilarityModel(similarity_model_path, watch_interval=model_watch_interval)
         self.similarity_weight = similarity_weight
         self.tag_weight = tag_weight
+        # Optional item-item collaborative model (services.collaborative.ItemCooccurrenceModel)
+        self.cf_model = cf_model
+        self.cf_weight = cf_weight
+        # Optional per-user embedding profiles (services.user_vectors.UserVectorStore);
+        # vector_search(vector, k) -> [(event_id, score)], defaults to exact local kNN
+        self.user_vectors = user_vectors
+        self.vector_search = vector_search
+        # Columnar event catalog, rebuilt in the background once older than the interval
+        self.catalog_refresh_interval = catalog_refresh_interval
+        self._catalog: EventCatalog = None
+        self._catalog_lock = threading.Lock()
+        self._catalog_refreshing = False
+        # Event deltas that arrive while a refresh is loading
+        self._events_lock = threading.Lock()
+        self._events_replay = None
+
+        # Optional change feed (services.realtime): User_Event rows come from an
+        # in-process InteractionLog and Event/User_Event deltas are pushed in
+        self.interaction_log = interaction_log
+        self.change_listener = change_listener
+        self.change_hooks = []  # hook(table, rows) after a delta is applied; table None = full resync
+        # Deep ranked lists behind paginated requests (filled and read by the API)
+        self.ranked_lists = RankedListCache(ranked_list_ttl, ranked_list_capacity)
+        # Per-stage cost estimates behind latency budgets, and the list served when even tag-only does not fit
+        self.stage_costs = StageCosts()
+        self.popular_depth = popular_depth
+        self.popular_refresh_interval = popular_refresh_interval
+        self._popular: RankedList = None
+        self._popular_at = 0.0
+        self._popular_refreshing = False
+        # Optional time-decayed popularity (services.trending.TrendingEvents): ranks the
+        # popular list and serves users with no history from it
+        self.trending = trending
+        self._trending = None
+        # Optional process pool (services.cpu_pool.CpuPool) for large similarity aggregations
+        self.cpu_pool = cpu_pool
+        if change_listener is not None:
+            change_listener.subscribe('Event', self.apply_event_changes)
+            change_listener.subscribe('User_Event', self.apply_interaction_changes)
+            change_listener.on_resync(self.resync)
+
+    # ----- Event catalog -----
+
+    def refresh_catalog(self) -> EventCatalog:
+        """Load events and swap in a new catalog; requests holding the old one keep using it."""
+        with self._events_lock:
+            self._events_replay = []
+        frame = self.event_repo.load_events()
+        with self._events_lock:
+            # The load may have read the table before these changes committed
+            for delta in self._events_replay:
+                frame = _upsert_events(frame, delta)
+            self._events_replay = None
+            catalog = EventCatalog.from_frame(frame)
+            self._catalog = catalog
+        return catalog
+
+    def _refresh_catalog_in_background(self) -> None:
+        try:
+            self.refresh_catalog()
+        except Exception as e:
+            print(f"⚠️ Event catalog refresh failed, keeping the current one: {e}")
+        finally:
+            self._catalog_refreshing = False
+
+    def get_catalog(self) -> EventCatalog:
+        """
+        The catalog for one request. The first call loads it; after that a
+        stale catalog is still served while one background thread rebuilds it.
+        While the change listener is connected the catalog is patched from its
+        notifications instead, and every (re)connect reloads it, so it never goes stale.
+        """
+        catalog = self._catalog
+        if catalog is None:
+            with self._catalog_lock:
+                if self._catalog is None:
+                    return self.refresh_catalog()
+                return self._catalog
+
+        if self.catalog_refresh_interval <= 0 or time.monotonic() - catalog.loaded_at < self.catalog_refresh_interval:
+            return catalog
+        if self.change_listener is not None and self.change_listener.connected:
+            return catalog
+        with self._catalog_lock:
+            if not self._catalog_refreshing:
+                self._catalog_refreshing = True
+                threading.Thread(target=self._refresh_catalog_in_background, daemon=True).start()
+        return catalog
+
+    # ----- Popular fallback -----
+
+    def refresh_popular(self, catalog: EventCatalog = None, interactions_df: pd.DataFrame = None) -> RankedList:
+        """
+        Rank upcoming events by weighted interaction count (the budget's
+        last-resort tier), or by trending counts when the engine has them.
+        """
+        catalog = catalog if catalog is not None else self.get_catalog()
+        interactions_df = interactions_df if interactions_df is not None else self.load_interactions()
+
+        if self.trending is not None:
+            self.trending.sync(interactions_df)
+            trending = self.trending.rank(catalog)
+            popular = trending.top(self.popular_depth)
+            self._trending, self._popular, self._popular_at = trending, popular, time.monotonic()
+            return popular
+
+        popularity = event_popularity(interactions_df, INTERACTION_WEIGHTS)
+        scores = np.zeros(len(catalog), dtype=np.float64)
+        if popularity:
+            rows = catalog.rows_for(list(popularity))
+            values = np.fromiter(popularity.values(), dtype=np.float64, count=len(popularity))
+            scores[rows[rows >= 0]] = values[rows >= 0]
+
+        rows = np.flatnonzero(catalog.upcoming_mask())
+        if len(rows) == 0:
+            rows = np.arange(len(catalog))
+        rows = rows[top_k_positions(scores[rows], self.popular_depth)]
+        popular = RankedList(catalog, rows, {
+            "similarity_score": np.zeros(len(rows)),
+            "tag_score": np.zeros(len(rows)),
+            "final_score": scores[rows],
+        }, tier=TIER_POPULAR)
+        self._popular, self._popular_at = popular, time.monotonic()
+        return popular
+
+    def _refresh_popular_in_background(self, catalog: EventCatalog, interactions_df: pd.DataFrame) -> None:
+        try:
+            self.refresh_popular(catalog, interactions_df)
+        except Exception as e:
+            print(f"⚠️ Popular list refresh failed, keeping the current one: {e}")
+        finally:
+            self._popular_refreshing = False
+
+    def _maybe_refresh_popular(self, catalog: EventCatalog, interactions_df: pd.DataFrame) -> None:
+        popular = self._popular
+        fresh = (
+            popular is not None
+            and popular.catalog is catalog
+            and time.monotonic() - self._popular_at < self.popular_refresh_interval
+        )
+        if fresh or self._popular_refreshing:
+            return
+        self._popular_refreshing = True
+        threading.Thread(
+            target=self._refresh_popular_in_background, args=(catalog, interactions_df), daemon=True
+        ).start()
+
+    def popular_events(self, depth: int):
+        """The first `depth` events of the popular list, or None before it has been computed."""
+        popular = self._popular
+        if popular is None:
+            return None
+        return popular.select(np.arange(min(depth, len(popular))))
+
+    def _trending_recommendations(self, depth: int, max_per_cluster: int = None):
+        """The trending list for a user with no history, or None before it has been computed."""
+        trending = self._trending
+        if trending is None:
+            return None
+        print("🔥 Serving trending events")
+        return trending.top(depth, max_per_cluster)
+
+    def _popular_fallback(self, exceeded: BudgetExceeded, depth: int) -> RankedList:
+        popular = self.popular_events(depth)
+        if popular is None:
+            raise exceeded
+        print(f"⏱️ {exceeded}, serving the popular list")
+        return popular
+
+    # ----- Change feed -----
+
+    def memory_structures(self) -> dict:
+        """The engine's large in-process structures by name (None = not loaded yet), for /debug/memory."""
+        return {
+            "similarity_model": self.model.snapshot,
+            "catalog": self._catalog,
+            "interactions": self.interaction_log,
+            "tag_profiles": self.tag_profiles,
+            "collaborative_model": self.cf_model,
+            "user_vectors": self.user_vectors,
+            "popular_list": self._popular,
+            "trending": self.trending,
+            "trending_ranking": self._trending,
+        }
+
+    def load_interactions(self) -> pd.DataFrame:
+        if self.interaction_log is not None:
+            return self.interaction_log.frame()
+        return self.inter_repo.load_all(parse_meta=False)
+
+    def _run_change_hooks(self, table, rows) -> None:
+        for hook in self.change_hooks:
+            hook(table, rows)
+
+    def apply_event_changes(self, table: str, rows: list) -> None:
+        """Upsert changed Event rows into the catalog without reloading the table."""
+        delta = self.event_repo.prepare(pd.DataFrame(rows))
+        with self._events_lock:
+            if self._events_replay is not None:
+                self._events_replay.append(delta)
+            if self._catalog is not None:
+                self._catalog = self._catalog.patched(delta)
+        print(f"⚡ Catalog updated with {len(delta)} changed events")
+        self._run_change_hooks(table, rows)
+
+    def apply_interaction_changes(self, table: str, rows: list) -> None:
+        """Add new/changed User_Event rows to the interaction log and the tag profiles."""
+        if self.interaction_log is None:
+            return
+        self.interaction_log.upsert(rows)
+        # Profiles and trending counts are updated now; CF and user vectors fold the rows in on their next sync
+        self.tag_profiles.sync(self.interaction_log.frame())
+        if self.trending is not None:
+            self.trending.sync(self.interaction_log.frame())
+        self._run_change_hooks(table, rows)
+
+    def resync(self) -> None:
+        """Reload interactions and events after changes may have been missed."""
+        print("🔄 Resyncing interactions and event catalog")
+        if self.interaction_log is not None:
+            self.interaction_log.load()
+            self.tag_profiles.sync(self.interaction_log.frame())
+            if self.trending is not None:
+                self.trending.sync(self.interaction_log.frame())
+        self.refresh_catalog()
+        self._run_change_hooks(None, [])
 
     # ----- Public API -----
 
     def recommend_events(self, user_id: int, top_k: int = 15, max_per_cluster: int = 5):
-        print(f"🚀 Starting recommendations for user {user_id}, top_k={top_k}, max_per_cluster={max_per_cluster}")
-
-        events_df = self.event_repo.load_events()
-        interactions_df = self.inter_repo.load_all()
+        recs = self.rank_events(user_id, depth=top_k, max_per_cluster=max_per_cluster).page(0, top_k)
+        print(f"🎁 Final recommendations returned: {len(recs)} events")
+        return recs
 
-        user_tag_profile = self.profiler.build_tag_profile(interactions_df, user_id)
+    def rank_events(
+        self,
+        user_id: int,
+        depth: int = 15,
+        max_per_cluster: int = 5,
+        page_size: int = None,
+        rng: random.Random = None,
+        budget: LatencyBudget = None
+    ) -> RankedList:
+        """
+        Rank up to `depth` events for the user. The list is diversified one
+        page_size window at a time (default: the whole list is one page), so
+        every page of a deep list looks like a single recommend_events() call.
+        `rng` drives the in-page shuffle; a seeded one reproduces the list.
+
+        With a `budget`, stages that do not fit in it are skipped and the list
+        comes from a cheaper tier (RankedList.tier): tag-only scores when the
+        interactions, the model or the hybrid scoring would overrun it, the
+        popular list when the catalog or the user's profile is not available
+        in time.
+
+        Users with no interactions at all get the trending list (when the
+        engine has one) instead of a tag-only ranking with nothing to rank
+        by. The trending store already knows every user with an interaction
+        (as of its last sync, or live with the change feed on), so these
+        users are recognized before loading any.
+        """
+        page_size = page_size or depth
+        rng = rng or random
+        budget = budget or LatencyBudget(None, self.stage_costs)
+        print(f"🚀 Starting recommendations for user {user_id}, depth={depth}, page_size={page_size}, max_per_cluster={max_per_cluster}")
+
+        if self.change_listener is not None:
+            self.change_listener.ensure_started()
+        try:
+            catalog = budget.call("catalog", self.get_catalog)
+        except BudgetExceeded as e:
+            return self._popular_fallback(e, depth)
+        if self.trending is not None and self.trending.is_cold(user_id):
+            ranked = self._trending_recommendations(depth, max_per_cluster)
+            if ranked is not None:
+                self._maybe_refresh_popular(catalog, None)
+                return ranked
+        try:
+            interactions_df = budget.call("interactions", self.load_interactions)
+        except BudgetExceeded as e:
+            # Profiles synced by earlier requests still give tag-only scores
+            user_tag_profile = self.tag_profiles.profile(user_id)
+            if not user_tag_profile:
+                return self._popular_fallback(e, depth)
+            print(f"⏱️ {e}, using tag-only recommendations from the last synced profile")
+            return self._tag_only_recommendations(catalog, user_tag_profile, depth)
+        self._maybe_refresh_popular(catalog, interactions_df)
+        if self.trending is not None:
+            self.trending.sync(interactions_df)
+            if self.trending.is_cold(user_id):
+                ranked = self._trending_recommendations(depth, max_per_cluster)
+                if ranked is not None:
+                    return ranked
+
+        if self.cf_model is not None and self.cf_weight > 0:
+            # Fits once, then only folds in interactions newer than the last sync
+            self.cf_model.sync(interactions_df)
+
+        self.tag_profiles.sync(interactions_df)
+        user_tag_profile = self.tag_profiles.profile(user_id)
         print(f"🧾 User tag profile (top 10): {user_tag_profile.most_common(10)}")
 
-        can_proceed = self._diagnose_user_interactions(user_id, interactions_df)
+        if self.user_vectors is not None and budget.affords("vector"):
+            self.user_vectors.sync(interactions_df)
+            user_vec = self.user_vectors.vector(user_id)
+            if user_vec is not None:
+                with budget.stage("vector"):
+                    ranked = self._vector_recommendations(
+                        user_id, user_vec, catalog, interactions_df, user_tag_profile, depth, page_size
+                    )
+                if ranked is not None:
+                    return ranked
+
+        # One model snapshot for the whole request, even if a reload swaps in a new one
+        try:
+            model = budget.call("model", self.model.current)
+        except BudgetExceeded as e:
+            print(f"⏱️ {e}, using tag-only recommendations")
+            return self._tag_only_recommendations(catalog, user_tag_profile, depth)
+
+        can_proceed = self._diagnose_user_interactions(user_id, interactions_df, model)
         if not can_proceed:
             print("❌ Not enough interaction data for similarity model, using tag-only recommendations")
-            return self._tag_only_recommendations(events_df, user_tag_profile, top_k)
+            return self._tag_only_recommendations(catalog, user_tag_profile, depth)
 
-        # Load similarity model
-        self.model.load()
-        if not self.model.is_loaded():
+        if model is None:
             print("❌ Similarity model not loaded, using tag-only recommendations")
-            return self._tag_only_recommendations(events_df, user_tag_profile, top_k)
+            return self._tag_only_recommendations(catalog, user_tag_profile, depth)
+
+        if not budget.affords("hybrid"):
+            print(f"⏱️ {budget.remaining() * 1000:.0f}ms left, hybrid scoring takes ~{self.stage_costs.estimate('hybrid') * 1000:.0f}ms, using tag-only recommendations")
+            return self._tag_only_recommendations(catalog, user_tag_profile, depth)
 
         # Use hybrid similarity + tag scoring
-        return self._hybrid_recommendations(
-            user_id=user_id,
-            events_df=events_df,
-            interactions_df=interactions_df,
-            user_tag_profile=user_tag_profile,
-            top_k=top_k,
-            max_per_cluster=max_per_cluster
-        )
+        with budget.stage("hybrid"):
+            return self._hybrid_recommendations(
+                model=model,
+                user_id=user_id,
+                catalog=catalog,
+                interactions_df=interactions_df,
+                user_tag_profile=user_tag_profile,
+                depth=depth,
+                page_size=page_size,
+                max_per_cluster=max_per_cluster,
+                rng=rng
+            )
 
     # ----- Internal helpers -----
 
-    def _diagnose_user_interactions(self, user_id: int, interactions_df: pd.DataFrame) -> bool:
+    def _diagnose_user_interactions(self, user_id: int, interactions_df: pd.DataFrame, model: ModelSnapshot = None) -> bool:
         print(f"\n🔍 DIAGNOSING USER {user_id} INTERACTIONS (OOP)")
         user_interactions = interactions_df[interactions_df["user_id"] == user_id]
 
@@ -324,17 +1037,17 @@ class RecommendationEngine:
         if user_interactions.empty:
             print("  (no interactions found)")
         else:
-            print(user_interactions[['event_id', 'interaction_type', 'meta_parsed']].to_string())
+            meta_col = 'meta_parsed' if 'meta_parsed' in user_interactions.columns else 'meta'
+            print(user_interactions[['event_id', 'interaction_type', meta_col]].to_string())
 
         try:
             # Try to see overlap with model if possible
-            with open(self.model.model_path, "r") as f:
-                model = json.load(f)
+            if model is None:
+                raise RuntimeError("similarity model unavailable")
 
-            model_event_ids = [int(eid) for eid in model["event_ids"]]
             user_event_ids = user_interactions['event_id'].dropna().astype(int).tolist()
 
-            overlap = set(user_event_ids) & set(model_event_ids)
+            overlap = set(user_event_ids) & model.event_id_to_index.keys()
             print(f"✅ Overlap between user events and model: {overlap}")
 
             valid_types = ["view", "register", "tag_click"]
@@ -350,51 +1063,93 @@ class RecommendationEngine:
             # If we have tag_click data, we can still rely on tag-only
             return has_tag_click
 
-    def _tag_only_recommendations(self, events_df: pd.DataFrame, user_tag_profile: Counter, top_k: int):
+    def _tag_only_recommendations(self, catalog: EventCatalog, user_tag_profile: Counter, top_k: int) -> RankedList:
+        if not user_tag_profile:
+            # Every tag score would be 0: trending order beats an arbitrary one
+            ranked = self._trending_recommendations(top_k)
+            if ranked is not None:
+                return ranked
         print("⚠️ Using tag-only ranking")
-        events_df = events_df.copy()
+        tag_scores = catalog.tag_scores(user_tag_profile)
 
-        # Ensure tags column is parsed
-        events_df['tags'] = events_df['tags'].apply(
-            lambda x: x if isinstance(x, list) else parse_tags_field(x)
+        # Prefer upcoming events; if none, use all
+        rows = np.flatnonzero(catalog.upcoming_mask())
+        if len(rows) == 0:
+            rows = np.arange(len(catalog))
+
+        top = top_k_positions(tag_scores[rows], top_k)
+        rows = rows[top]
+        return self._ranked(
+            catalog, rows, {"tag_score": tag_scores[rows], "final_score": tag_scores[rows]}, tier=TIER_TAG_ONLY
         )
 
-        tag_scores = compute_tag_score_for_events(events_df, user_tag_profile)
-        events_df['tag_score'] = tag_scores
-        events_df['final_score'] = events_df['tag_score']
+    def _vector_recommendations(
+        self,
+        user_id: int,
+        user_vec: np.ndarray,
+        catalog: EventCatalog,
+        interactions_df: pd.DataFrame,
+        user_tag_profile: Counter,
+        top_k: int,
+        page_size: int
+    ):
+        print("🧭 Using personalized kNN retrieval")
+        search = self.vector_search or self.user_vectors.event_vectors.knn
 
-        today = datetime.today().date()
-        ranked = events_df.sort_values(by='final_score', ascending=False)
+        # Over-fetch so already-seen and expired events can be dropped
+        hits = search(user_vec, top_k * 4)
+        seen = set(
+            interactions_df.loc[interactions_df["user_id"] == user_id, "event_id"].dropna().astype(int).tolist()
+        )
+        hits = [(eid, score) for eid, score in hits if eid not in seen]
+        if not hits:
+            return None
 
-        # Prefer upcoming events; if none, use all
-        upcoming = ranked[ranked['end_date'].apply(lambda d: d.date() >= today if pd.notna(d) else True)]
-        if upcoming.empty:
-            upcoming = ranked
+        rows = catalog.rows_for([eid for eid, _ in hits])
+        similarity = np.asarray([score for _, score in hits], dtype=np.float64)
+        keep = rows >= 0
+        rows, similarity = rows[keep], similarity[keep]
+
+        # A deep list may run short; it only has to fill the first page
+        upcoming = catalog.upcoming_mask()[rows]
+        if upcoming.sum() < page_size:
+            print(f"⚠️ kNN returned {int(upcoming.sum())} usable events (< {page_size}), using full ranking")
+            return None
+        rows, similarity = rows[upcoming], similarity[upcoming]
+
+        tag = catalog.tag_scores(user_tag_profile)[rows]
+        final = self.similarity_weight * similarity + self.tag_weight * tag
 
-        recs = upcoming.head(top_k).to_dict(orient='records')
-        return self._finalize_recommendations(recs)
+        top = top_k_positions(final, top_k)
+        return self._ranked(
+            catalog,
+            rows[top],
+            {"similarity_score": similarity[top], "tag_score": tag[top], "final_score": final[top]},
+        )
 
     def _hybrid_recommendations(
         self,
+        model: ModelSnapshot,
         user_id: int,
-        events_df: pd.DataFrame,
+        catalog: EventCatalog,
         interactions_df: pd.DataFrame,
         user_tag_profile: Counter,
-        top_k: int,
-        max_per_cluster: int
-    ):
+        depth: int,
+        page_size: int,
+        max_per_cluster: int,
+        rng=random
+    ) -> RankedList:
         print("🔄 Computing hybrid (similarity + tag) recommendations")
 
-        event_ids = self.model.event_ids
-        similarity_matrix = self.model.similarity_matrix
-        event_id_to_index = self.model.event_id_to_index
+        event_ids = model.event_ids
+        similarity_matrix = model.similarity_matrix
+        event_id_to_index = model.event_id_to_index
 
         user_interactions = interactions_df[interactions_df["user_id"] == user_id].copy()
         valid_types = ["view", "register", "tag_click"]
         interacted_df = user_interactions[user_interactions["interaction_type"].isin(valid_types)].copy()
 
-        interaction_weights = {"view": 1, "tag_click": 2, "register": 5}
-        interacted_df["weight"] = interacted_df["interaction_type"].map(interaction_weights).fillna(1.0)
+        interacted_df["weight"] = interacted_df["interaction_type"].map(INTERACTION_WEIGHTS).fillna(1.0)
 
         weight_map = defaultdict(float)
         found_in_model = []
@@ -418,98 +1173,95 @@ class RecommendationEngine:
 
         if len(interacted_indices) == 0:
             print("❌ No matching interacted events in similarity model, falling back to tag-only")
-            return self._tag_only_recommendations(events_df, user_tag_profile, top_k)
+            return self._tag_only_recommendations(catalog, user_tag_profile, depth)
 
-        weighted_sim = np.average(similarity_matrix[interacted_indices], axis=0, weights=weights)
+        weighted_sim = self._weighted_similarity(similarity_matrix, interacted_indices, weights)
 
-        scores_df = pd.DataFrame({
-            "event_id": event_ids,
-            "similarity_score": weighted_sim
-        })
+        # Score only model events that are still in the catalog
+        rows = catalog.rows_for(event_ids)
+        in_catalog = rows >= 0
+        rows, similarity = rows[in_catalog], weighted_sim[in_catalog]
 
-        interacted_event_ids = set(interacted_df['event_id'].dropna().astype(int).tolist())
+        interacted_event_ids = interacted_df['event_id'].dropna().astype(np.int64).unique()
         # Downweight already interacted events
-        scores_df["similarity_score"] = scores_df.apply(
-            lambda row: row["similarity_score"] * 0.3 if int(row["event_id"]) in interacted_event_ids else row["similarity_score"],
-            axis=1
-        )
-
-        merged_df = scores_df.merge(events_df, on="event_id", how="left")
-
-        # Ensure tags are parsed
-        merged_df['tags'] = merged_df['tags'].apply(
-            lambda x: x if isinstance(x, list) else parse_tags_field(x)
-        )
-
-        # Tag scores
-        tag_scores_series = compute_tag_score_for_events(merged_df, user_tag_profile)
-        merged_df['tag_score'] = tag_scores_series.values
+        similarity = np.where(np.isin(catalog.event_ids[rows], interacted_event_ids), similarity * 0.3, similarity)
 
         # Hybrid final score
-        merged_df['final_score'] = (
-            self.similarity_weight * merged_df['similarity_score'] +
-            self.tag_weight * merged_df['tag_score']
-        )
-
-        today = datetime.today().date()
-        upcoming_events = merged_df[merged_df['end_date'].apply(lambda d: d.date() >= today if pd.notna(d) else True)]
-        if upcoming_events.empty:
-            upcoming_events = merged_df
-
-        top_recommendations = []
-        clusters = upcoming_events['cluster'].unique()
-        for cluster_id in clusters:
-            cluster_events = upcoming_events[upcoming_events['cluster'] == cluster_id].sort_values(
-                by="final_score", ascending=False
-            )
-            n = min(len(cluster_events), max_per_cluster)
-            if n > 0:
-                top_recommendations.extend(cluster_events.head(n).to_dict(orient='records'))
-
-        if len(top_recommendations) < top_k:
-            existing_ids = {r['event_id'] for r in top_recommendations}
-            remaining_events = upcoming_events[~upcoming_events['event_id'].isin(existing_ids)].sort_values(
-                by="final_score", ascending=False
-            )
-            remaining_needed = top_k - len(top_recommendations)
-            if not remaining_events.empty:
-                top_recommendations.extend(remaining_events.head(remaining_needed).to_dict(orient='records'))
-
-        random.shuffle(top_recommendations)
-        return self._finalize_recommendations(top_recommendations[:top_k])
-
-    def _finalize_recommendations(self, recs_raw):
-        recs = clean_recommendations(recs_raw)
-
-        required_fields = {
-            'event_id': 0,
-            'title': 'Unknown Event',
-            'image': '',
-            'start_date': None,
-            'end_date': None,
-            'location': '',
-            'tags': [],
-            'price': 'Free',
-            'url': '',
-            'similarity_score': 0.0,
-            'tag_score': 0.0,
-            'final_score': 0.0,
-            'cluster': 'Other'
+        tag = catalog.tag_scores(user_tag_profile)[rows]
+        final = self.similarity_weight * similarity + self.tag_weight * tag
+        if self.cf_model is not None and self.cf_weight > 0:
+            cf_scores = self.cf_model.score_user(user_id)
+            cf = np.zeros(len(catalog), dtype=np.float64)
+            if cf_scores:
+                cf_rows = catalog.rows_for(list(cf_scores))
+                cf_values = np.fromiter(cf_scores.values(), dtype=np.float64, count=len(cf_scores))
+                cf[cf_rows[cf_rows >= 0]] = cf_values[cf_rows >= 0]
+            final = final + self.cf_weight * cf[rows]
+
+        upcoming = catalog.upcoming_mask()[rows]
+        pool = np.flatnonzero(upcoming) if upcoming.any() else np.arange(len(rows))
+
+        # Sort by (cluster, -score) once; each page then takes the best
+        # max_per_cluster events of every cluster among those not yet placed
+        clusters = catalog.cluster_codes[rows[pool]]
+        order = np.lexsort((-final[pool], clusters))
+        sorted_clusters = clusters[order]
+        alive = np.ones(len(order), dtype=bool)
+        placed = []
+        while len(placed) < depth and alive.any():
+            live = np.flatnonzero(alive)
+            live_clusters = sorted_clusters[live]
+            group_start = np.flatnonzero(np.r_[True, live_clusters[1:] != live_clusters[:-1]])
+            rank_in_cluster = np.arange(len(live)) - np.repeat(group_start, np.diff(np.r_[group_start, len(live)]))
+            heads = rank_in_cluster < max_per_cluster
+            page = live[heads]
+            want = min(page_size, depth - len(placed))
+
+            if len(page) < want:
+                rest = live[~heads]
+                rest = rest[top_k_positions(final[pool[order[rest]]], want - len(page))]
+                page = np.concatenate([page, rest])
+
+            page = page.tolist()
+            rng.shuffle(page)
+            page = page[:want]
+            alive[page] = False
+            placed.extend(page)
+
+        picked = pool[order[np.asarray(placed, dtype=np.int64)]]
+
+        scores = {"similarity_score": similarity[picked], "tag_score": tag[picked], "final_score": final[picked]}
+        if self.cf_model is not None and self.cf_weight > 0:
+            scores["cf_score"] = cf[rows[picked]]
+        return self._ranked(catalog, rows[picked], scores)
+
+    def _weighted_similarity(self, similarity_matrix: np.ndarray, rows: list, weights: list) -> np.ndarray:
+        """
+        Weighted average of the interacted events' similarity rows. Big enough
+        ones go to the CPU pool, whose workers map the same .npy file.
+        """
+        pool = self.cpu_pool
+        path = getattr(similarity_matrix, "filename", None)
+        if (
+            pool is not None
+            and pool.offloads(STAGE_SCORE)
+            and path
+            and len(rows) * similarity_matrix.shape[1] >= pool.min_score_cells
+        ):
+            return pool.run(STAGE_SCORE, weighted_similarity, path, rows, weights)
+        return np.average(similarity_matrix[rows], axis=0, weights=weights)
+
+    def _ranked(self, catalog: EventCatalog, rows: np.ndarray, scores: dict, tier: str = TIER_FULL) -> RankedList:
+        """
+        The ranked rows with the scores every recommendation carries. The
+        catalog's columns are already clean (no NaN/NaT, dates as strings), so
+        records come out of RankedList.page() in their final shape.
+        """
+        scores = {
+            "similarity_score": np.zeros(len(rows)),
+            "tag_score": np.zeros(len(rows)),
+            "final_score": np.zeros(len(rows)),
+            **scores,
         }
-
-        for rec in recs:
-            for field, default_value in required_fields.items():
-                if field not in rec or rec[field] is None:
-                    rec[field] = default_value
-            try:
-                rec['event_id'] = int(float(rec.get('event_id', 0)))
-            except Exception:
-                rec['event_id'] = 0
-            for field in ['similarity_score', 'tag_score', 'final_score']:
-                try:
-                    rec[field] = float(rec.get(field, 0.0))
-                except Exception:
-                    rec[field] = 0.0
-
-        print(f"🎁 Final recommendations returned: {len(recs)} events")
-        return recs
+        print(f"📚 Ranked {len(rows)} events ({tier})")
+        return RankedList(catalog, rows, scores, tier)
@@ -0,0 +1,52 @@
+from typing import Dict, List, Tuple
+
+
+def normalize_hits(hits) -> Dict[str, float]:
+    """Min–max normalize scores into {_id: score}."""
+    if not hits:
+        return {}
+    vals = [h.get("_score", 0.0) for h in hits]
+    lo, hi = min(vals), max(vals)
+    return {
+        h["_id"]: ((h.get("_score", 0.0) - lo) / (hi - lo) if hi > lo else 0.0)
+        for h in hits
+    }
+
+
+def fuse_hits(bm_hits, kn_hits, size: int, knn_weight: float = 0.6) -> List[Tuple[str, float]]:
+    """
+    Linear fusion of normalized BM25 and kNN scores.
+    Returns [(_id, score)] best first, truncated to `size`.
+    """
+    bm_norm, kn_norm = normalize_hits(bm_hits), normalize_hits(kn_hits)
+    all_ids = set(bm_norm) | set(kn_norm)
+
+    return sorted(
+        ((i, knn_weight * kn_norm.get(i, 0.0) + (1 - knn_weight) * bm_norm.get(i, 0.0)) for i in all_ids),
+        key=lambda x: x[1],
+        reverse=True,
+    )[:size]
+
+
+def hydrate_rows(ids_in_order, rows, scores_by_id) -> List[dict]:
+    """Order raw event rows by search rank, parse tags and attach the score."""
+    by_id = {int(r["event_id"]): r for r in rows}
+    results = []
+
+    for eid in ids_in_order:
+        row = by_id.get(int(eid))
+        if not row:
+            continue
+
+        tags_val = row.get("tags")
+        if isinstance(tags_val, str):
+            row["tags"] = [t.strip() for t in tags_val.strip("{} ").split(",") if t.strip()]
+        elif isinstance(tags_val, list):
+            row["tags"] = tags_val
+        else:
+            row["tags"] = []
+
+        row["score"] = float(scores_by_id.get(str(eid), 0.0))
+        results.append(row)
+
+    return results
@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from services.index_generation import IndexGeneration
+
+# (ids in rank order, {str(id): score}), as returned by the search ranking
+Ranking = Tuple[List[int], Dict[str, float]]
+
+
+def normalize_query(q: str) -> str:
+    """Case and whitespace differences ('Chess  Club ' / 'chess club') share one entry."""
+    return " ".join(q.casefold().split())
+
+
+class SearchResultCache:
+    """
+    Bounded LRU of fused search rankings keyed by (normalized query, size).
+
+    Entries remember the index generation they were computed at and are only
+    served while it is still current, so a reindex invalidates them all at
+    once. Rankings computed within `settle` seconds of a bump are not stored:
+    OpenSearch only makes writes searchable at its next refresh (1s by
+    default), so such a ranking may not include the write yet.
+    """
+
+    def __init__(
+        self,
+        generation: IndexGeneration,
+        capacity: int = 1024,
+        ttl: float = 600.0,
+        settle: float = 1.0,
+    ) -> None:
+        self.generation = generation
+        self.capacity = capacity
+        self.ttl = ttl
+        self.settle = settle
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, q: str, size: int) -> Optional[Ranking]:
+        key = (normalize_query(q), size)
+        generation = self.generation.current
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != generation or time.monotonic() - entry[1] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, q: str, size: int, generation: int, ranking: Ranking) -> None:
+        """Store a ranking computed while `generation` was current (read it before querying)."""
+        if self.capacity <= 0:
+            return
+        current, bumped_at = self.generation.read()
+        if generation != current or time.time() - bumped_at < self.settle:
+            return
+        key = (normalize_query(q), size)
+        with self._lock:
+            self._entries[key] = (generation, time.monotonic(), ranking)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
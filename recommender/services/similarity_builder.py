@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+# Model formats; the JSON written by build_model.py names one in "format"
+FORMAT_DENSE = "dense"  # n x n float32 matrix
+FORMAT_TOPN = "topn"    # per row, the N most similar columns and their scores
+
+
+def binary_paths(model_path: str, version: str, fmt: str = FORMAT_DENSE) -> Dict[str, str]:
+    """Files of one model version, next to the model JSON ({stem}.{version}.{name}.npy)."""
+    stem = os.path.splitext(model_path)[0]
+    names = ("ids", "matrix") if fmt == FORMAT_DENSE else ("ids", "topn_columns", "topn_scores")
+    return {name: f"{stem}.{version}.{name}.npy" for name in names}
+
+
+def normalized_rows(counts: sp.spmatrix) -> sp.csr_matrix:
+    """L2-normalized float32 CSR rows, so X @ X.T is the cosine similarity (empty rows stay zero)."""
+    x = sp.csr_matrix(counts, dtype=np.float32)
+    norms = np.sqrt(np.asarray(x.multiply(x).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sp.csr_matrix(sp.diags(1.0 / norms).astype(np.float32) @ x)
+
+
+# ---------- Worker side ----------
+#
+# Each process loads the normalized vectors once and opens the output files
+# read-write; row blocks write disjoint rows, so no locking is needed.
+
+_state: Dict[str, object] = {}
+
+
+def _init_worker(vectors_path: str, outputs: Dict[str, str], top_n: Optional[int], tile: int) -> None:
+    x = sp.load_npz(vectors_path).tocsr()
+    _state.update(
+        x=x,
+        xt=sp.csr_matrix(x.T),
+        outputs={name: np.load(path, mmap_mode="r+") for name, path in outputs.items()},
+        top_n=top_n,
+        tile=tile,
+    )
+
+
+def _tile(i0: int, i1: int, j0: int, j1: int) -> np.ndarray:
+    x, xt = _state["x"], _state["xt"]
+    return (x[i0:i1] @ xt[:, j0:j1]).toarray().astype(np.float32, copy=False)
+
+
+def _build_block(i0: int, i1: int) -> int:
+    """Similarities of rows i0:i1 against every column, one tile_size-wide tile at a time."""
+    n = _state["x"].shape[0]
+    tile = _state["tile"]
+    top_n = _state["top_n"]
+    outputs = _state["outputs"]
+
+    if top_n is None:
+        matrix = outputs["matrix"]
+        for j0 in range(0, n, tile):
+            matrix[i0:i1, j0:j0 + tile] = _tile(i0, i1, j0, min(j0 + tile, n))
+        matrix.flush()
+        return i0
+
+    # Running top-N per row, merged with each tile
+    rows = i1 - i0
+    best_scores = np.full((rows, 0), -np.inf, dtype=np.float32)
+    best_columns = np.zeros((rows, 0), dtype=np.int32)
+    for j0 in range(0, n, tile):
+        j1 = min(j0 + tile, n)
+        scores = np.concatenate([best_scores, _tile(i0, i1, j0, j1)], axis=1)
+        columns = np.concatenate(
+            [best_columns, np.broadcast_to(np.arange(j0, j1, dtype=np.int32), (rows, j1 - j0))], axis=1
+        )
+        if scores.shape[1] > top_n:
+            keep = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+            scores = np.take_along_axis(scores, keep, axis=1)
+            columns = np.take_along_axis(columns, keep, axis=1)
+        best_scores, best_columns = scores, columns
+
+    order = np.argsort(-best_scores, axis=1, kind="stable")
+    outputs["topn_scores"][i0:i1] = np.take_along_axis(best_scores, order, axis=1)
+    outputs["topn_columns"][i0:i1] = np.take_along_axis(best_columns, order, axis=1)
+    for array in outputs.values():
+        array.flush()
+    return i0
+
+
+# ---------- Driver ----------
+
+class BlockedSimilarityBuilder:
+    """
+    Out-of-core cosine similarity over sparse event vectors.
+
+    The output (the full n x n float32 matrix, or the top_n most similar
+    columns of every row) is a set of .npy files memory-mapped in `work_dir`.
+    Row blocks of tile_size rows are computed by worker processes one
+    tile_size x tile_size tile at a time and written straight into the mapped
+    files, so memory per worker is bounded by a few tiles whatever n is.
+
+    Finished blocks are logged to done.txt after their rows are flushed, and
+    state.json records what the work directory is building. Running the same
+    build again (same vectors, ids and settings) after a crash resumes with
+    the blocks that are not done yet and keeps the version it started with.
+    """
+
+    def __init__(self, work_dir: str, tile_size: int = 2048, top_n: Optional[int] = None, workers: int = 0) -> None:
+        self.work_dir = work_dir
+        self.tile_size = tile_size
+        self.top_n = top_n
+        self.workers = workers or os.cpu_count() or 1
+
+    @property
+    def fmt(self) -> str:
+        return FORMAT_DENSE if self.top_n is None else FORMAT_TOPN
+
+    def _fingerprint(self, event_ids: np.ndarray, x: sp.csr_matrix) -> str:
+        h = hashlib.sha256()
+        for part in (event_ids, x.indptr, x.indices, x.data):
+            h.update(np.ascontiguousarray(part).tobytes())
+        h.update(json.dumps([self.fmt, self.top_n, self.tile_size]).encode())
+        return h.hexdigest()
+
+    def _prepare(self, event_ids: np.ndarray, x: sp.csr_matrix) -> Tuple[str, set]:
+        """(version, done block starts); starts over unless the work dir holds this same build."""
+        fingerprint = self._fingerprint(event_ids, x)
+        state_path = os.path.join(self.work_dir, "state.json")
+        try:
+            with open(state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("fingerprint") == fingerprint:
+                with open(os.path.join(self.work_dir, "done.txt"), "r") as f:
+                    done = {int(line) for line in f.read().split("\n")[:-1]}  # a torn last line is not done
+                print(f"♻️ Resuming similarity build {state['version']}: {len(done)} row blocks already done")
+                return state["version"], done
+        except (OSError, ValueError, KeyError):
+            pass
+
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+        os.makedirs(self.work_dir)
+        version = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{uuid.uuid4().hex[:8]}"
+        n = len(event_ids)
+        np.save(os.path.join(self.work_dir, "ids.npy"), event_ids)
+        sp.save_npz(os.path.join(self.work_dir, "vectors.npz"), x)
+        if self.top_n is None:
+            np.lib.format.open_memmap(self._work_path("matrix"), mode="w+", dtype=np.float32, shape=(n, n)).flush()
+        else:
+            width = min(self.top_n, n)
+            np.lib.format.open_memmap(self._work_path("topn_scores"), mode="w+", dtype=np.float32, shape=(n, width)).flush()
+            np.lib.format.open_memmap(self._work_path("topn_columns"), mode="w+", dtype=np.int32, shape=(n, width)).flush()
+        open(os.path.join(self.work_dir, "done.txt"), "w").close()
+        # Written last: a work dir without state.json is never resumed
+        with open(state_path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "version": version, "format": self.fmt, "events": n}, f)
+        return version, set()
+
+    def _work_path(self, name: str) -> str:
+        return os.path.join(self.work_dir, f"{name}.npy")
+
+    def build(self, event_ids: Sequence[int], counts: sp.spmatrix) -> Tuple[str, Dict[str, str]]:
+        """
+        Compute the similarities of the rows of `counts` (one per event id).
+        Returns (version, {file name: path in work_dir}) for the caller to publish.
+        """
+        event_ids = np.asarray(event_ids, dtype=np.int64)
+        x = normalized_rows(counts)
+        n = len(event_ids)
+        version, done = self._prepare(event_ids, x)
+
+        outputs = {name: self._work_path(name) for name in binary_paths("", "", self.fmt) if name != "ids"}
+        blocks = [(i0, min(i0 + self.tile_size, n)) for i0 in range(0, n, self.tile_size) if i0 not in done]
+        total = (n + self.tile_size - 1) // self.tile_size
+        print(f"🧱 Similarity {self.fmt} {n}x{n if self.top_n is None else min(self.top_n, n)}: "
+              f"{len(blocks)}/{total} row blocks of {self.tile_size} to compute with {self.workers} workers")
+
+        t0 = time.perf_counter()
+        initargs = (os.path.join(self.work_dir, "vectors.npz"), outputs, self.top_n, self.tile_size)
+        with open(os.path.join(self.work_dir, "done.txt"), "a") as log:
+            def mark_done(i0: int) -> None:
+                log.write(f"{i0}\n")
+                log.flush()
+                os.fsync(log.fileno())
+                done.add(i0)
+                print(f"   ✅ block {len(done)}/{total} ({time.perf_counter() - t0:.1f}s)")
+
+            if self.workers <= 1 or len(blocks) <= 1:
+                _init_worker(*initargs)
+                for i0, i1 in blocks:
+                    mark_done(_build_block(i0, i1))
+                _state.clear()
+            else:
+                with ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=initargs) as pool:
+                    futures = [pool.submit(_build_block, i0, i1) for i0, i1 in blocks]
+                    for future in as_completed(futures):
+                        mark_done(future.result())
+
+        return version, {"ids": self._work_path("ids"), **outputs}
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.work_dir, ignore_errors=True)
@@ -0,0 +1,190 @@
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from services.event_catalog import EventCatalog
+
+_WORD = re.compile(r"\w+")
+# Prefixes this short match a large share of the index, so their answers are precomputed
+HEAD_PREFIX_LEN = 2
+MAX_LIMIT = 20
+
+
+def normalize(text: str) -> str:
+    """Casefolded words joined by single spaces ('  Startup-Pitch ' -> 'startup pitch')."""
+    return " ".join(_WORD.findall(str(text).casefold()))
+
+
+def event_popularity(interactions_df: pd.DataFrame, weights: Dict[str, float]) -> Dict[int, float]:
+    """Weighted interaction count per event_id (interactions without an event are skipped)."""
+    if interactions_df is None or interactions_df.empty:
+        return {}
+    rows = interactions_df[interactions_df["event_id"].notna()]
+    w = rows["interaction_type"].map(weights).fillna(1.0)
+    totals = w.groupby(rows["event_id"].astype(np.int64)).sum()
+    return {int(eid): float(v) for eid, v in totals.items()}
+
+
+class PrefixIndex:
+    """
+    Sorted-array prefix index over suggestion texts.
+
+    Every word-suffix of a text is a key ('startup pitch night' is found by
+    'sta', 'pit' and 'nig'), and keys are kept in one sorted list, so the keys
+    under a prefix are the contiguous range found by two binary searches.
+    The best texts of a range are picked by weight; for prefixes of up to
+    HEAD_PREFIX_LEN characters, whose ranges are large, they are precomputed.
+    """
+
+    def __init__(self, texts: Sequence[str], weights: Sequence[float]) -> None:
+        self.texts = list(texts)
+        self.weights = np.asarray(weights, dtype=np.float64)
+
+        entries = sorted(
+            {(key, i) for i, text in enumerate(self.texts) for key in self._suffixes(normalize(text))}
+        )
+        self._keys: List[str] = [key for key, _ in entries]
+        self._entry_text = np.fromiter((i for _, i in entries), dtype=np.int64, count=len(entries))
+
+        self._head: Dict[str, List[int]] = {}
+        for length in range(1, HEAD_PREFIX_LEN + 1):
+            groups = defaultdict(list)
+            for pos, key in enumerate(self._keys):
+                if len(key) >= length:
+                    groups[key[:length]].append(pos)
+            for prefix, positions in groups.items():
+                self._head[prefix] = self._best(self._entry_text[positions], MAX_LIMIT)
+
+    @staticmethod
+    def _suffixes(key: str) -> List[str]:
+        words = key.split(" ")
+        return [" ".join(words[i:]) for i in range(len(words)) if words[i]]
+
+    def _best(self, text_ids: np.ndarray, limit: int) -> List[int]:
+        ids = np.unique(text_ids)
+        if len(ids) > limit:
+            ids = ids[np.argpartition(-self.weights[ids], limit - 1)[:limit]]
+        return sorted(ids.tolist(), key=lambda i: (-self.weights[i], self.texts[i]))
+
+    def top(self, prefix: str, limit: int = 10) -> List[int]:
+        """Ids of the heaviest texts with a word starting with `prefix` (already normalized)."""
+        if not prefix or limit <= 0:
+            return []
+        head = self._head.get(prefix)
+        if head is not None and limit <= MAX_LIMIT:
+            return head[:limit]
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + "\U0010ffff", lo)
+        return self._best(self._entry_text[lo:hi], limit) if hi > lo else []
+
+    def complete(self, key: str, limit: int = 10) -> List[int]:
+        """
+        For a key whose last word is finished: texts that end with it (a tag or
+        title typed in full) first, then those continuing with a next word.
+        """
+        if not key or limit <= 0:
+            return []
+        lo = bisect_left(self._keys, key)
+        exact = self._best(self._entry_text[lo:bisect_right(self._keys, key, lo)], limit)
+        following = self.top(key + " ", limit)
+        return (exact + [i for i in following if i not in exact])[:limit]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class SuggestIndex:
+    """
+    Autocomplete over the catalog's upcoming events: titles weighted by how
+    often their events are interacted with, tags by the interest users have
+    shown in them (summed tag profiles) plus the popularity of their events.
+    """
+
+    def __init__(self, catalog: EventCatalog, popularity: Dict[int, float], tag_interest: Counter) -> None:
+        self.catalog = catalog
+        rows = np.flatnonzero(catalog.upcoming_mask())
+
+        title_weight: Dict[str, float] = defaultdict(float)
+        title_event: Dict[str, tuple] = {}
+        tag_weight: Dict[str, float] = defaultdict(float, tag_interest)
+        titles = catalog.strings["title"]
+        for row in rows.tolist():
+            event_id = int(catalog.event_ids[row])
+            weight = 1.0 + popularity.get(event_id, 0.0)
+            title = titles[row]
+            if title:
+                title_weight[title] += weight
+                # Point a title at its most popular event
+                if title not in title_event or weight > title_event[title][1]:
+                    title_event[title] = (event_id, weight)
+            for tag in catalog.tags_of(row):
+                tag_weight[tag] += weight
+
+        self.titles = PrefixIndex(list(title_weight), list(title_weight.values()))
+        self.title_events = [title_event[t][0] for t in self.titles.texts]
+        self.tags = PrefixIndex(list(tag_weight), list(tag_weight.values()))
+
+    def suggest(self, query: str, limit: int = 8) -> Dict[str, List[Dict]]:
+        prefix = normalize(query)
+        # A trailing space means the last word is complete: match it whole, then complete the next word
+        if prefix and query[-1:].isspace():
+            title_ids, tag_ids = self.titles.complete(prefix, limit), self.tags.complete(prefix, limit)
+        else:
+            title_ids, tag_ids = self.titles.top(prefix, limit), self.tags.top(prefix, limit)
+        return {
+            "titles": [
+                {"text": self.titles.texts[i], "event_id": self.title_events[i], "score": float(self.titles.weights[i])}
+                for i in title_ids
+            ],
+            "tags": [
+                {"text": self.tags.texts[i], "score": float(self.tags.weights[i])}
+                for i in tag_ids
+            ],
+        }
+
+
+class Suggester:
+    """
+    Holds the SuggestIndex for the current event catalog. When the catalog is
+    replaced (refresh or change feed) the index is rebuilt in a background
+    thread and the previous one keeps answering until the swap.
+    """
+
+    def __init__(
+        self,
+        get_catalog: Callable[[], EventCatalog],
+        build: Callable[[EventCatalog], SuggestIndex],
+    ) -> None:
+        self.get_catalog = get_catalog
+        self.build = build
+        self._index: Optional[SuggestIndex] = None
+        self._lock = threading.Lock()
+        self._building = False
+
+    def _rebuild(self, catalog: EventCatalog) -> None:
+        try:
+            self._index = self.build(catalog)
+        except Exception as e:
+            print(f"⚠️ Suggest index rebuild failed, keeping the current one: {e}")
+        finally:
+            self._building = False
+
+    def index(self) -> SuggestIndex:
+        catalog = self.get_catalog()
+        index = self._index
+        if index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self.build(catalog)
+                return self._index
+        if index.catalog is not catalog:
+            with self._lock:
+                if not self._building:
+                    self._building = True
+                    threading.Thread(target=self._rebuild, args=(catalog,), daemon=True).start()
+        return index
@@ -0,0 +1,169 @@
+import math
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from services.event_catalog import EventCatalog
+from services.latency_budget import TIER_POPULAR
+from services.ranked_lists import RankedList
+from services.recommender import INTERACTION_WEIGHTS, TIMESTAMP_COLUMNS, InteractionWatermark
+
+
+class TrendingRanking:
+    """
+    A catalog's upcoming events in trending order: highest decayed count
+    first, events nobody has interacted with yet soonest first. Each event's
+    position within its cluster is precomputed, and the order with at most
+    max_per_cluster events per cluster in front is built once per cap, so
+    top() is a slice, O(depth).
+    """
+
+    def __init__(self, catalog: EventCatalog, scores: np.ndarray) -> None:
+        self.catalog = catalog
+        rows = np.flatnonzero(catalog.upcoming_mask())
+        if len(rows) == 0:
+            rows = np.arange(len(catalog))
+        self.rows = rows[np.lexsort((catalog.start_dates[rows], -scores[rows]))]
+        self.scores = scores[self.rows]
+
+        # Rank of every event within its cluster, in trending order
+        clusters = catalog.cluster_codes[self.rows]
+        by_cluster = np.argsort(clusters, kind="stable")
+        grouped = clusters[by_cluster]
+        starts = np.flatnonzero(np.r_[True, grouped[1:] != grouped[:-1]]) if len(grouped) else np.zeros(0, dtype=np.int64)
+        self.cluster_rank = np.empty(len(self.rows), dtype=np.int64)
+        self.cluster_rank[by_cluster] = np.arange(len(grouped)) - np.repeat(starts, np.diff(np.r_[starts, len(grouped)]))
+
+        self._orders: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _order(self, max_per_cluster: int) -> np.ndarray:
+        order = self._orders.get(max_per_cluster)
+        if order is None:
+            if max_per_cluster > 0:
+                # Every cluster's top max_per_cluster first, the rest after them
+                heads = self.cluster_rank < max_per_cluster
+                order = np.concatenate([np.flatnonzero(heads), np.flatnonzero(~heads)])
+            else:
+                order = np.arange(len(self.rows))
+            with self._lock:
+                self._orders[max_per_cluster] = order
+        return order
+
+    def top(self, depth: int, max_per_cluster: Optional[int] = None) -> RankedList:
+        positions = self._order(max_per_cluster or 0)[:depth]
+        zeros = np.zeros(len(positions))
+        return RankedList(self.catalog, self.rows[positions], {
+            "similarity_score": zeros,
+            "tag_score": zeros,
+            "final_score": self.scores[positions],
+        }, tier=TIER_POPULAR)
+
+
+class TrendingEvents:
+    """
+    Time-decayed view / registration counts per event, kept up to date from
+    User_Event rows past a watermark, for ranking events for users with no
+    history (and for the latency budget's popular tier).
+
+    Counts are kept relative to a reference time: an interaction at time t
+    adds w·2^((t - t_ref)/half_life). Decaying every count to "now" would
+    multiply them all by the same factor, so the order never changes just
+    because time passes and each interaction is an O(1) update; when counts
+    grow too large, t_ref moves forward and they are all scaled down.
+
+    The store also remembers every user with any interaction (tag clicks
+    included), which is what tells a cold-start user apart.
+    """
+
+    # 2^600 leaves room for the sum of many counts below float max (~2^1024)
+    MAX_EXPONENT = 600.0
+
+    def __init__(self, half_life_days: float = 7.0, weights: Dict[str, float] = None) -> None:
+        self.half_life_s = half_life_days * 86400.0
+        all_weights = weights or INTERACTION_WEIGHTS
+        self.weights = {t: float(all_weights[t]) for t in ("view", "register") if t in all_weights}
+
+        self._counts: Dict[int, float] = {}
+        self._t_ref: Optional[float] = None
+        self.users = set()
+        self.synced = False
+        self.watermark = InteractionWatermark()
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def _growth(self, ts: float) -> float:
+        if self.half_life_s <= 0:
+            return 1.0
+        if self._t_ref is None:
+            self._t_ref = ts
+        exponent = (ts - self._t_ref) / self.half_life_s
+        if exponent > self.MAX_EXPONENT:
+            scale = math.pow(2.0, -exponent)
+            for event_id in self._counts:
+                self._counts[event_id] *= scale
+            self._t_ref, exponent = ts, 0.0
+        return math.pow(2.0, exponent)
+
+    def observe(self, user_id, event_id, interaction_type: str, ts: Optional[float] = None) -> bool:
+        with self._lock:
+            if user_id is not None and pd.notna(user_id):
+                self.users.add(int(user_id))
+            w = self.weights.get(interaction_type)
+            if not w or event_id is None or pd.isna(event_id):
+                return False
+            event_id = int(event_id)
+            self._counts[event_id] = self._counts.get(event_id, 0.0) + w * self._growth(time.time() if ts is None else ts)
+            return True
+
+    def sync(self, interactions_df: pd.DataFrame) -> int:
+        """Fold User_Event rows past the watermark into the counts."""
+        with self._sync_lock:
+            applied = self._apply_rows(self.watermark.new_rows(interactions_df))
+            self.synced = True
+        if applied:
+            print(f"🔥 Trending counts updated with {applied} interactions")
+        return applied
+
+    def _apply_rows(self, new_rows: pd.DataFrame) -> int:
+        if new_rows.empty:
+            return 0
+        ts_col = next((c for c in TIMESTAMP_COLUMNS if c in new_rows.columns), None)
+        if ts_col:
+            stamps = pd.to_datetime(new_rows[ts_col], errors="coerce", utc=True)
+            epoch = [t.timestamp() if pd.notna(t) else None for t in stamps]
+        else:
+            epoch = [None] * len(new_rows)
+
+        applied = 0
+        for (uid, eid, itype), ts in zip(
+            new_rows[["user_id", "event_id", "interaction_type"]].itertuples(index=False), epoch
+        ):
+            applied += self.observe(uid, eid, itype, ts)
+        return applied
+
+    def is_cold(self, user_id: int) -> bool:
+        """True once synced, for a user with no interaction of any type."""
+        return self.synced and int(user_id) not in self.users
+
+    def scores(self, event_ids, now: Optional[float] = None) -> np.ndarray:
+        """Decayed count of each event id as of `now` (default: the current time)."""
+        with self._lock:
+            counts = np.fromiter((self._counts.get(int(eid), 0.0) for eid in event_ids), dtype=np.float64, count=len(event_ids))
+            t_ref = self._t_ref
+        if t_ref is None or self.half_life_s <= 0:
+            return counts
+        now = time.time() if now is None else now
+        return counts * math.pow(2.0, -(now - t_ref) / self.half_life_s)
+
+    def rank(self, catalog: EventCatalog) -> TrendingRanking:
+        return TrendingRanking(catalog, self.scores(catalog.event_ids))
+
+    def __len__(self) -> int:
+        return len(self._counts)
@@ -0,0 +1,203 @@
+import math
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.embedding_cache import EmbeddingCache
+from services.recommender import INTERACTION_WEIGHTS, TIMESTAMP_COLUMNS, InteractionWatermark
+
+# (vector, k) -> [(event_id, score)], best first
+VectorSearch = Callable[[np.ndarray, int], List[Tuple[int, float]]]
+
+
+class VectorSnapshot(NamedTuple):
+    """One consistent load of the event vectors: ids, their vectors (row i = event_ids[i]), id -> row."""
+    event_ids: np.ndarray
+    matrix: np.ndarray
+    index: Dict[int, int]
+    mtime: Optional[float]
+
+
+_EMPTY = VectorSnapshot(np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.float32), {}, None)
+
+
+class EventVectorIndex:
+    """
+    event_id -> embedding, in the 384-d space ingest.py indexes into OpenSearch.
+    Read from the embedding cache labels ingest.py writes, and reloaded when a
+    new ingest relabels events. The labelled rows are copied out of the cache
+    (which also holds search-query embeddings) into one event matrix per
+    load, so kNN scores events only; loaded before workers fork, the copy is
+    shared by all of them.
+    """
+
+    NAMESPACE = "events"
+
+    def __init__(self, cache: EmbeddingCache) -> None:
+        self.cache = cache
+        # Replaced as a whole on reload; readers take it once and never see a half-updated index
+        self.snapshot: VectorSnapshot = _EMPTY
+        self._lock = threading.Lock()
+
+    @property
+    def event_ids(self) -> np.ndarray:
+        return self.snapshot.event_ids
+
+    def refresh(self) -> None:
+        mtime = self.cache.labels_mtime(self.NAMESPACE)
+        if mtime is None or mtime == self.snapshot.mtime:
+            return
+        with self._lock:
+            if mtime == self.snapshot.mtime:
+                return
+            labels, rows, vectors = self.cache.labelled_rows(self.NAMESPACE)
+            event_ids = np.asarray([int(x) for x in labels], dtype=np.int64)
+            index = {int(eid): i for i, eid in enumerate(event_ids)}
+            matrix = np.ascontiguousarray(vectors[rows]) if vectors is not None else np.zeros((0, 0), dtype=np.float32)
+            matrix.flags.writeable = False
+            self.snapshot = VectorSnapshot(event_ids, matrix, index, mtime)
+            print(f"✅ Loaded {len(event_ids)} event vectors")
+
+    def vector(self, event_id: int) -> Optional[np.ndarray]:
+        snap = self.snapshot
+        i = snap.index.get(int(event_id))
+        return None if i is None else snap.matrix[i]
+
+    def knn(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Exact cosine kNN over local vectors (fallback when OpenSearch is unavailable)."""
+        snap = self.snapshot
+        if len(snap.event_ids) == 0 or k <= 0:
+            return []
+        scores = snap.matrix @ query.astype(np.float32)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(snap.event_ids[i]), float(scores[i])) for i in top]
+
+
+class UserVectorStore:
+    """
+    Per-user profile vectors in event-embedding space: a time-decayed,
+    weighted mean of the events a user viewed or registered for.
+
+    Each user keeps S = Σ w·2^(-(t_now - t)/half_life)·v and the matching decayed
+    weight total W, both referenced to the user's latest interaction, so a new
+    interaction is an O(dim) update. The profile is S / W, L2-normalized.
+
+    Interactions with an event that has no vector yet (not ingested) are kept
+    per event and applied once a reload of the event vectors includes it.
+    """
+
+    def __init__(
+        self,
+        event_vectors: EventVectorIndex,
+        half_life_days: float = 30.0,
+        weights: Dict[str, float] = None,
+    ) -> None:
+        self.event_vectors = event_vectors
+        self.half_life_s = half_life_days * 86400.0
+        all_weights = weights or INTERACTION_WEIGHTS
+        # Only interactions tied to a concrete event contribute a vector
+        self.weights = {t: float(all_weights[t]) for t in ("view", "register") if t in all_weights}
+
+        self._sums: Dict[int, np.ndarray] = {}
+        self._totals: Dict[int, float] = {}
+        self._last_ts: Dict[int, float] = {}
+        # event_id -> [(user_id, interaction_type, ts)] waiting for the event's vector
+        self._pending: Dict[int, List[Tuple[int, str, Optional[float]]]] = defaultdict(list)
+        self._pending_snapshot: Optional[VectorSnapshot] = None
+        self.watermark = InteractionWatermark()
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def _decay(self, dt: float) -> float:
+        return math.pow(2.0, -dt / self.half_life_s) if self.half_life_s > 0 else 1.0
+
+    def observe(self, user_id: int, event_id: int, interaction_type: str, ts: Optional[float] = None) -> bool:
+        w = self.weights.get(interaction_type)
+        vec = self.event_vectors.vector(event_id) if w else None
+        if vec is None:
+            return False
+        ts = time.time() if ts is None else ts
+
+        with self._lock:
+            last = self._last_ts.get(user_id)
+            if last is None:
+                self._sums[user_id] = w * vec.astype(np.float32)
+                self._totals[user_id] = w
+                self._last_ts[user_id] = ts
+            elif ts >= last:
+                f = self._decay(ts - last)
+                self._sums[user_id] = self._sums[user_id] * f + w * vec
+                self._totals[user_id] = self._totals[user_id] * f + w
+                self._last_ts[user_id] = ts
+            else:
+                # Late row: decay it to the user's reference time instead
+                f = self._decay(last - ts)
+                self._sums[user_id] = self._sums[user_id] + (w * f) * vec
+                self._totals[user_id] = self._totals[user_id] + w * f
+        return True
+
+    def sync(self, interactions_df: pd.DataFrame) -> int:
+        """Fold User_Event rows past the watermark into the profiles."""
+        self.event_vectors.refresh()
+        if len(self.event_vectors.event_ids) == 0:
+            return 0
+        # Held from reading the watermark to applying the rows, so concurrent syncs never apply a row twice
+        with self._sync_lock:
+            applied = self._apply_pending()
+            new_rows = self.watermark.new_rows(interactions_df)
+            new_rows = new_rows[new_rows["interaction_type"].isin(list(self.weights))].dropna(subset=["event_id"])
+            if new_rows.empty:
+                return self._report(applied)
+
+            ts_col = next((c for c in TIMESTAMP_COLUMNS if c in new_rows.columns), None)
+            if ts_col:
+                stamps = pd.to_datetime(new_rows[ts_col], errors="coerce", utc=True)
+                new_rows = new_rows.assign(_ts=stamps).sort_values("_ts")
+                epoch = [t.timestamp() if pd.notna(t) else None for t in new_rows["_ts"]]
+            else:
+                epoch = [None] * len(new_rows)
+
+            for (uid, eid, itype), ts in zip(
+                new_rows[["user_id", "event_id", "interaction_type"]].itertuples(index=False), epoch
+            ):
+                if self.observe(int(uid), int(eid), itype, ts):
+                    applied += 1
+                else:
+                    self._pending[int(eid)].append((int(uid), itype, time.time() if ts is None else ts))
+        return self._report(applied)
+
+    def _apply_pending(self) -> int:
+        """Apply the waiting interactions of events the current vectors now include."""
+        snap = self.event_vectors.snapshot
+        if not self._pending or snap is self._pending_snapshot:
+            return 0
+        self._pending_snapshot = snap
+        applied = 0
+        for eid in [eid for eid in self._pending if eid in snap.index]:
+            for uid, itype, ts in self._pending.pop(eid):
+                applied += self.observe(uid, eid, itype, ts)
+        return applied
+
+    def _report(self, applied: int) -> int:
+        if applied:
+            print(f"🔁 User vectors updated with {applied} interactions")
+        return applied
+
+    def vector(self, user_id: int) -> Optional[np.ndarray]:
+        with self._lock:
+            s = self._sums.get(user_id)
+            total = self._totals.get(user_id, 0.0)
+        if s is None or total <= 0:
+            return None
+        v = s / total
+        norm = float(np.linalg.norm(v))
+        return v / norm if norm > 0 else None
+
+    def __len__(self) -> int:
+        return len(self._sums)
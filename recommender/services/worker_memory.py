@@ -0,0 +1,66 @@
+import os
+from typing import Dict, List, Optional
+
+# Fields of /proc/<pid>/smaps_rollup we report (values in kB)
+SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def process_memory(pid: int) -> Optional[Dict[str, float]]:
+    """
+    RSS breakdown for one process, in MB (Linux only).
+
+    Pss splits every shared page evenly between the processes mapping it, so
+    when workers share the model, Σ Pss across workers stays far below Σ Rss.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+
+    out: Dict[str, float] = {"pid": pid}
+    for line in lines:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].rstrip(":") in SMAPS_FIELDS:
+            out[parts[0].rstrip(":").lower() + "_mb"] = round(int(parts[1]) / 1024.0, 1)
+    return out
+
+
+def child_pids(pid: int) -> List[int]:
+    pids: List[int] = []
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children", "r") as f:
+                pids.extend(int(p) for p in f.read().split())
+    except OSError:
+        pass
+    return pids
+
+
+def worker_report(master_pid: Optional[int] = None) -> Dict[str, object]:
+    """Memory of the serving master and each of its worker processes."""
+    master_pid = master_pid or os.getppid()
+    workers = [m for m in (process_memory(p) for p in child_pids(master_pid)) if m]
+    total_rss = sum(w.get("rss_mb", 0.0) for w in workers)
+    total_pss = sum(w.get("pss_mb", 0.0) for w in workers)
+    return {
+        "master": process_memory(master_pid),
+        "workers": workers,
+        "total_rss_mb": round(total_rss, 1),
+        "total_pss_mb": round(total_pss, 1),
+        # Memory that would be duplicated without sharing, i.e. what sharing saves
+        "shared_savings_mb": round(total_rss - total_pss, 1),
+    }
+
+
+def print_worker_report(master_pid: Optional[int] = None) -> None:
+    report = worker_report(master_pid)
+    print(f"{'pid':>8} {'rss MB':>9} {'pss MB':>9} {'shared MB':>10} {'private MB':>11}")
+    for w in report["workers"]:
+        shared = w.get("shared_clean_mb", 0.0) + w.get("shared_dirty_mb", 0.0)
+        private = w.get("private_clean_mb", 0.0) + w.get("private_dirty_mb", 0.0)
+        print(f"{w['pid']:>8} {w.get('rss_mb', 0.0):>9.1f} {w.get('pss_mb', 0.0):>9.1f} {shared:>10.1f} {private:>11.1f}")
+    print(
+        f"📊 Workers: Σrss={report['total_rss_mb']} MB, Σpss={report['total_pss_mb']} MB, "
+        f"shared savings={report['shared_savings_mb']} MB"
+    )
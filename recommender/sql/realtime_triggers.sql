@@ -0,0 +1,32 @@
+-- Change feed for the recommender (services/realtime.py).
+--
+--   psql -d eventdb -f sql/realtime_triggers.sql
+--
+-- Every INSERT/UPDATE on "Event" and "User_Event" sends a NOTIFY on
+-- 'recommender_changes' with {"table", "op", "row"}. NOTIFY payloads are
+-- capped at 8000 bytes, so larger rows are sent as {"table", "op", "key"}
+-- and the listener fetches them. Notifications are delivered on commit.
+
+CREATE OR REPLACE FUNCTION public.recommender_notify_change() RETURNS trigger AS $$
+DECLARE
+    payload text;
+BEGIN
+    payload := json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'row', to_jsonb(NEW))::text;
+    IF octet_length(payload) > 7900 THEN
+        -- TG_ARGV[0] names the key column the listener fetches by
+        payload := json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'key', to_jsonb(NEW) -> TG_ARGV[0])::text;
+    END IF;
+    PERFORM pg_notify('recommender_changes', payload);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS recommender_event_change ON public."Event";
+CREATE TRIGGER recommender_event_change
+    AFTER INSERT OR UPDATE ON public."Event"
+    FOR EACH ROW EXECUTE FUNCTION public.recommender_notify_change('event_id');
+
+DROP TRIGGER IF EXISTS recommender_user_event_change ON public."User_Event";
+CREATE TRIGGER recommender_user_event_change
+    AFTER INSERT OR UPDATE ON public."User_Event"
+    FOR EACH ROW EXECUTE FUNCTION public.recommender_notify_change('id');